@@ -2,18 +2,36 @@
 # Author class that stores an author's name and all documents written by them.
 # It keeps track of how many documents the author has and provides a simple
 # interface to register new documents.
+# When the corpus keeps its documents in a DocumentStore, only the document
+# ids are stored here and production hands out views from the store.
+
+from array import array
+
 
 class Author:
-    def __init__(self, name):
+    def __init__(self, name, store=None):
         # Basic attributes for tracking an author's production
         self.name = name
         self.ndoc = 0                # number of documents
-        self.production = {}         # id_doc → Document object
+        self.doc_ids = array("i")    # ids of the author's documents
+        self.store = store           # DocumentStore holding them (optional)
+        self._documents = {}         # id_doc → Document object (without store)
 
     def add(self, id_doc, document):
         # Register a new document for the author
-        self.production[id_doc] = document
-        self.ndoc = len(self.production)  # update count
+        if self.store is None:
+            self._documents[id_doc] = document
+        # ids arrive in increasing order from the corpus
+        if not self.doc_ids or self.doc_ids[-1] != id_doc:
+            self.doc_ids.append(id_doc)
+        self.ndoc = len(self.doc_ids)  # update count
+
+    @property
+    def production(self):
+        # id_doc → Document object (views built on access with a store)
+        if self.store is None:
+            return dict(self._documents)
+        return {i: self.store[i] for i in self.doc_ids}
 
     def __str__(self):
         # String representation showing name + number of documents
@@ -0,0 +1,101 @@
+# Concordance.py
+# Index-backed concordancer (KWIC: key word in context) for a Corpus.
+# Occurrences are streamed document by document, so callers can page
+# through them, and every hit reports the document it comes from.
+#
+# A keyword made only of letters is resolved with the corpus' positional
+# index (TokenStore.positions): the words of the vocabulary containing it are
+# found in one pass over the vocabulary, then their token positions give the
+# matching documents directly; character offsets are only recomputed for the
+# documents actually returned. Any other pattern falls back to a
+# per-document regex scan.
+
+import itertools
+import re
+import numpy as np
+from TokenStore import TOKEN_RE
+
+
+class Concordance:
+    def __init__(self, corpus):
+        self.corpus = corpus
+        self._blob = ""                           # "\n".join(vocabulary)
+        self._blob_starts = np.zeros(1, dtype=np.int64)
+
+    # ---------------------- recherche des occurrences ----------------------
+    def find(self, motif):
+        # Generator of (doc_id, start, end): case-insensitive occurrences of
+        # motif, in document order then position order.
+        motif_bas = str(motif).lower()
+        if motif_bas and len(motif_bas) == len(motif) and TOKEN_RE.fullmatch(motif_bas):
+            return self._find_indexed(motif_bas)
+        return self._find_scan(motif)
+
+    def _find_scan(self, motif):
+        pattern = re.compile(re.escape(motif), re.IGNORECASE)
+        for doc_id in range(self.corpus.ndoc):
+            texte = str(self.corpus.id2doc[doc_id].texte)
+            for match in pattern.finditer(texte):
+                yield doc_id, match.start(), match.end()
+
+    def _terms_containing(self, motif):
+        # ids of the vocabulary words that contain motif
+        tokens = self.corpus.tokens
+        if len(self._blob_starts) != len(tokens.terms) + 1:
+            self._blob = "\n".join(tokens.terms)
+            lengths = np.fromiter((len(t) + 1 for t in tokens.terms), dtype=np.int64,
+                                  count=len(tokens.terms))
+            self._blob_starts = np.concatenate([[0], np.cumsum(lengths)])
+
+        pos = [m.start() for m in re.finditer(re.escape(motif), self._blob)]
+        return np.unique(np.searchsorted(self._blob_starts, pos, side="right") - 1)
+
+    def _find_indexed(self, motif):
+        tokens = self.corpus.tokens
+        term_ids = self._terms_containing(motif)
+        if term_ids.size == 0:
+            return
+        hits = np.sort(np.concatenate([tokens.term_positions(j) for j in term_ids]))
+        docs = tokens.token_doc(hits)
+        ids = tokens.ids[hits]
+        rangs = hits - tokens.offsets[docs]      # token position inside its document
+        n = len(motif)
+
+        doc_courant, texte, verifie, starts = -1, "", True, []
+        for doc_id, j, rang in zip(docs.tolist(), ids.tolist(), rangs.tolist()):
+            if doc_id != doc_courant:
+                doc_courant = doc_id
+                texte = str(self.corpus.id2doc[doc_id].texte)
+                starts = tokens.doc_starts(texte)
+                # offsets were computed on texte.lower(); if lowering changed
+                # the length of this text, scan it with the regex instead
+                verifie = len(texte.lower()) == len(texte)
+                if not verifie:
+                    pattern = re.compile(re.escape(motif), re.IGNORECASE)
+                    for match in pattern.finditer(texte):
+                        yield doc_id, match.start(), match.end()
+            if not verifie:
+                continue
+
+            mot = tokens.terms[j]
+            start = starts[rang]
+            o = mot.find(motif)
+            while o != -1:
+                yield doc_id, start + o, start + o + n
+                o = mot.find(motif, o + n)
+
+    # ---------------------- contextes ----------------------
+    def kwic(self, motif, size=10):
+        # Generator of (doc_id, left context, match, right context)
+        doc_courant, texte = -1, ""
+        for doc_id, start, end in self.find(motif):
+            if doc_id != doc_courant:
+                doc_courant = doc_id
+                texte = str(self.corpus.id2doc[doc_id].texte)
+            yield (doc_id, texte[max(0, start - size):start],
+                   texte[start:end], texte[end:end + size])
+
+    def page(self, motif, size=10, page=0, page_size=50):
+        # One page of kwic() results (page numbers start at 0)
+        return list(itertools.islice(self.kwic(motif, size), page * page_size,
+                                     (page + 1) * page_size))
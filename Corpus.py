@@ -3,11 +3,30 @@
 # TD6 : chargement / stats / recherche simple
 # TD7 : ajout du vocabulaire pour moteur de recherche (SearchEngine)
 
+from concurrent.futures import ProcessPoolExecutor
+import weakref
 import pandas as pd
-import datetime
+import numpy as np
+import itertools
 import re
 from Author import Author
-from Factory import factoryClass
+from TokenStore import TokenStore, analyser
+from DocumentStore import DocumentStore
+from Concordance import Concordance
+from Dedup import NearDuplicates
+from TermDictionary import TermDictionary
+import loaders
+from Metrics import registry
+
+
+def top_n(valeurs, n):
+    # indices des n plus grandes valeurs, décroissantes (à égalité : id croissant)
+    n = min(n, valeurs.size)
+    if n <= 0:
+        return np.empty(0, dtype=np.int64)
+    seuil = valeurs[np.argpartition(valeurs, valeurs.size - n)[valeurs.size - n]]
+    ids = np.flatnonzero(valeurs >= seuil)
+    return ids[np.lexsort((ids, -valeurs[ids]))][:n]
 
 
 class Corpus:
@@ -23,66 +42,167 @@ class Corpus:
         # Initialize attributes only once
         if not hasattr(self, "initialized"):
             self.nom = nom
-            self.id2doc = {}     # id → document
+            self.id2doc = DocumentStore()   # id → document (columnar storage, see DocumentStore.py)
             self.authors = {}    # author name → Author object
             self.ndoc = 0        # number of documents
             #self.naut = 0        # number of authors (not used)
             self.initialized = True
             self.allText = None
+            self.tokens = TokenStore()   # textes analysés une seule fois (ids des mots)
+            self.listeners = weakref.WeakSet()   # index à prévenir des ajouts (SearchEngine), oubliés quand ils ne servent plus
+            self.concordance = Concordance(self)
+            self._stats = {}             # statistiques déjà calculées, par clé → (ndoc, résultat)
+            self.duplicates = None       # détecteur de quasi-doublons (detect_duplicates)
             
             
     def add_document(self, doc):
-        # Store document with an incremental ID
-        doc_id = self.ndoc
-        self.id2doc[doc_id] = doc
+        # Analyse the text once; vocab, stats and SearchEngine reuse the tokens
+        with registry.timer("analyze"):
+            mots = analyser(str(doc.texte))
+        if self.duplicates is not None and not self.check_duplicates([mots])[0]:
+            return None     # quasi-doublon non stocké (mode "drop")
+
+        doc_id = self.store_document(doc)
+        self.tokens.add_words(mots)
+
+        # Incremental indexing: live search engines index the new document
+        for listener in self.listeners:
+            listener.document_added(doc_id)
+        return doc_id
+
+
+    def store_document(self, doc):
+        # Store document with an incremental ID (fields copied into the columns)
+        doc_id = self.id2doc.add(doc)
         self.ndoc += 1
+        self.allText = None
 
         # Register author if not already present, then attach document
         aut = doc.auteur
         if aut not in self.authors:
-            self.authors[aut] = Author(aut)
-        self.authors[aut].add(doc_id, doc)
-
-
-    def load(self, chemin="corpus.csv"):
-        # Load documents from a CSV and reconstruct objects via factoryClass
-        df = pd.read_csv(chemin, sep="\t")
-
-        for _, row in df.iterrows():
-            # Convert date string into datetime
-            date_obj = datetime.datetime.strptime(row["date"], "%Y-%m-%d")
-
-            # Create correct document type depending on source
-            if row["type"].lower() == "reddit":
-                doc = factoryClass.create(
-                    "reddit",
-                    row["titre"],
-                    row["auteur"],
-                    date_obj,
-                    row["url"],
-                    row["texte"],
-                    int(row["extra"])     # number of comments
-                )
-
-            elif row["type"].lower() == "arxiv":
-                # extra column contains all authors concatenated
-                authors = str(row["extra"]).split("|")
-                authors = [a.strip() for a in authors if a.strip()]
-                doc = factoryClass.create(
-                    "arxiv",
-                    row["titre"],
-                    authors,              # list of authors
-                    date_obj,
-                    row["url"],
-                    row["texte"]
-                )
-
-            # Add reconstructed document to corpus
-            self.add_document(doc)
+            self.authors[aut] = Author(aut, self.id2doc)
+        self.authors[aut].add(doc_id, self.id2doc[doc_id])
+        return doc_id
+
+
+    def add_documents(self, docs, workers=None, pool=None):
+        # Add a batch of documents (e.g. one chunk of a CSV file).
+        # With workers > 1 (or a process pool) the texts of the batch are
+        # analysed in parallel, shard by shard (see TokenStore.add_many).
+        # With duplicate detection the batch is analysed here, in one pass
+        # (the detector needs the words before the documents are stored).
+        # Returns the id of every document (None: near-duplicate not stored).
+        if self.duplicates is None and pool is None and (not workers or workers <= 1):
+            return [self.add_document(doc) for doc in docs]
+
+        docs = list(docs)
+        if self.duplicates is not None:
+            with registry.timer("analyze"):
+                mots = [analyser(str(doc.texte)) for doc in docs]
+            garde = self.check_duplicates(mots)
+            doc_ids = [self.store_document(doc) if g else None for doc, g in zip(docs, garde)]
+            self.tokens.add_words_many(list(itertools.compress(mots, garde)))
+        else:
+            doc_ids = [self.store_document(doc) for doc in docs]
+            with registry.timer("analyze"):
+                self.tokens.add_many([str(doc.texte) for doc in docs], workers, pool)
+        for doc_id in doc_ids:
+            if doc_id is None:
+                continue
+            for listener in self.listeners:
+                listener.document_added(doc_id)
+        return doc_ids
+
+
+    def load(self, chemin="corpus.csv", chunksize=10000, sep=None, workers=None):
+        # Load documents from a CSV and reconstruct objects via factoryClass.
+        # The file is read chunk by chunk (see loaders.py): dates are parsed
+        # per chunk in one vectorised pass and documents are built by type,
+        # then streamed into the corpus (and any live SearchEngine).
+        # workers > 1: the texts are analysed by a pool of worker processes.
+        if workers and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for docs in loaders.iter_documents(chemin, chunksize, sep):
+                    self.add_documents(docs, workers, pool)
+        else:
+            for docs in loaders.iter_documents(chemin, chunksize, sep):
+                self.add_documents(docs)
 
         print("\nCorpus loaded from", chemin)
 
 
+    def add_speeches(self, titres, auteurs, dates, urls, textes, parent, debut, fin,
+                     workers=None, pool=None):
+        # Add speeches as sentence documents (SpeechDocument), in bulk: the
+        # speech i is (titres[i], auteurs[i], dates[i], urls[i], textes[i]),
+        # sentence s is textes[parent[s]][debut[s]:fin[s]] (see loaders.iter_speeches).
+        # Speech texts are stored once, sentences as offsets into them.
+        phrases = [str(textes[p])[a:b] for p, a, b in zip(parent.tolist(), debut.tolist(), fin.tolist())]
+        mots = None
+        if self.duplicates is not None:
+            with registry.timer("analyze"):
+                mots = [analyser(phrase) for phrase in phrases]
+            garde = self.check_duplicates(mots)
+            if not garde.all():
+                parent, debut, fin = parent[garde], debut[garde], fin[garde]
+                mots = list(itertools.compress(mots, garde))
+
+        first = self.id2doc.add_speeches(titres, auteurs, dates, urls, textes, parent, debut, fin)
+        n = len(parent)
+        self.ndoc += n
+        self.allText = None
+
+        for aut in auteurs:
+            if aut not in self.authors:
+                self.authors[aut] = Author(aut, self.id2doc)
+        for doc_id, p in zip(range(first, first + n), parent.tolist()):
+            self.authors[auteurs[p]].add(doc_id, self.id2doc[doc_id])
+
+        if mots is not None:
+            self.tokens.add_words_many(mots)
+        else:
+            with registry.timer("analyze"):
+                self.tokens.add_many(phrases, workers, pool)
+        for doc_id in range(first, first + n):
+            for listener in self.listeners:
+                listener.document_added(doc_id)
+
+
+    def load_speeches(self, chemin="discours_US.csv", chunksize=100, sep=None, min_length=20, workers=None):
+        # Load a speech CSV (e.g. discours_US.csv) as one document per
+        # sentence of at least min_length characters, chunk by chunk.
+        if workers and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for speeches in loaders.iter_speeches(chemin, chunksize, sep, min_length):
+                    self.add_speeches(**speeches, workers=workers, pool=pool)
+        else:
+            for speeches in loaders.iter_speeches(chemin, chunksize, sep, min_length):
+                self.add_speeches(**speeches)
+
+        print("\nCorpus loaded from", chemin)
+
+
+    # ---------------------- quasi-doublons ----------------------
+    def detect_duplicates(self, mode="cluster", threshold=0.8, num_perm=64, bands=16, shingle=3):
+        # Active la détection des quasi-doublons (MinHash / LSH, voir Dedup.py)
+        # sur tous les documents ajoutés ensuite. mode="cluster" : stockés et
+        # regroupés (SearchEngine.search(..., collapse=True) n'en garde qu'un
+        # par groupe) ; mode="drop" : les doublons ne sont pas stockés.
+        # Les documents déjà présents sont regroupés, jamais supprimés.
+        self.duplicates = NearDuplicates(mode, threshold, num_perm, bands, shingle)
+        if self.ndoc:
+            with registry.timer("dedup"):
+                self.duplicates.add_batch([self.tokens.doc_words(d) for d in range(self.ndoc)],
+                                          drop=False)
+        return self.duplicates
+
+
+    def check_duplicates(self, mots):
+        # masque des documents (listes de mots) à stocker
+        with registry.timer("dedup"):
+            return self.duplicates.add_batch(mots)
+
+
     def show_by_date(self):
         # Display all documents sorted by their date attribute
         docs = sorted(self.id2doc.values(), key=lambda d: d.date)
@@ -96,37 +216,30 @@ class Corpus:
         return self.allText
     
            
-    def search(self, keysword):
-        # TD6 : petite recherche textuelle globale
-        allText = self.get_all_text()
-        pattern = re.compile(re.escape(keysword), re.IGNORECASE)
+    def search(self, keysword, limit=None):
+        # TD6 : petite recherche textuelle globale (contexte de 10 caractères)
+        # Les occurrences viennent du concordancier indexé, document par document.
+        hits = self.concordance.kwic(keysword, 10)
         results = []
-
-        for match in pattern.finditer(allText):
-            start_index = max(0, match.start() - 10)
-            end_index = min(len(allText), match.end() + 10)
-
-            snippet = allText[start_index:end_index].replace('\n', ' ')
-            results.append(f"...{snippet}...")            
+        for _, leftContext, motif, rightContext in itertools.islice(hits, limit):
+            snippet = (leftContext + motif + rightContext).replace('\n', ' ')
+            results.append(f"...{snippet}...")
         return results
     
     
-    def concorde(self, keysword, size=10):
-        allText = self.get_all_text()
-        pattern = re.compile(re.escape(keysword), re.IGNORECASE)
-        data = []
-
-        for match in pattern.finditer(allText):
-            start_index = max(0, match.start() - size)
-            end_index = min(len(allText), match.end() + size)
-
-            leftContext = allText[start_index:match.start()]
-            rightContext = allText[match.end():end_index]
-            snippet = allText[match.start():match.end()].replace('\n', ' ')
+    def concorde(self, keysword, size=10, page=None, page_size=50):
+        # Concordancier : une ligne par occurrence, avec le document d'origine.
+        # page=None → toutes les occurrences, sinon seulement la page demandée.
+        if page is None:
+            hits = self.concordance.kwic(keysword, size)
+        else:
+            hits = self.concordance.page(keysword, size, page, page_size)
 
-            data.append([f"...{leftContext} ", f"    {snippet}   ", f"       {rightContext}...."])
-            df = pd.DataFrame(data, columns=["Context de gauche", "motif trouvé", "Context de droite" ])            
-        return df
+        data = []
+        for doc_id, leftContext, motif, rightContext in hits:
+            snippet = motif.replace('\n', ' ')
+            data.append([doc_id, f"...{leftContext} ", f"    {snippet}   ", f"       {rightContext}...."])
+        return pd.DataFrame(data, columns=["doc_id", "Context de gauche", "motif trouvé", "Context de droite"])
     
     
     # ---------- TD7 : nettoyage utilisé par stats + moteur de recherche ----------
@@ -139,57 +252,92 @@ class Corpus:
         return texte
     
     
-    def stats(self, n_top=10):
-        vocabulaire = set() # Pour éliminer les doublons
-        mots_comptes = {}   # Pour stocker le nombre d'occurrences (Term Frequency)
-        doc_compte = {}     # Pour stocker le nombre de documents (Document Frequency)
-        
-        for doc in self.id2doc.values():
-            texte_nettoye = self.nettoyer_texte(str(doc.texte))
-            mots = texte_nettoye.split()
-            
-            doc_vocab = set(mots)
-            vocabulaire.update(doc_vocab)
-            
-            for mot in mots:
-                if mot in mots_comptes:
-                    mots_comptes[mot] += 1
-                else:
-                    mots_comptes[mot] = 1
-
-            for mot in doc_vocab:
-                if mot in doc_compte:
-                    doc_compte[mot] += 1
-                else:
-                    doc_compte[mot] = 1
-
-        print(f"--- Statistiques du Corpus '{self.nom}' ---")
-        print(f"Nombre de mots différents (Taille du vocabulaire) : {len(vocabulaire)}")
-        
-        freq_series = pd.Series(mots_comptes)
-        df_freq = pd.DataFrame(freq_series, columns=['Term Frequency (TF)'])
-        df_freq.index.name = 'Mot'
-        
-        df_freq['Document Frequency (DF)'] = pd.Series(doc_compte)
-        df_top_n = df_freq.sort_values(by='Term Frequency (TF)', ascending=False).head(n_top)
-        
-        print(f"\n--- {n_top} mots les plus fréquents ---")
-        print(df_top_n)
-        
-        return df_freq
+    def stats(self, n_top=10, auteur=None, doc_type=None):
+        # Term Frequency / Document Frequency des n_top mots les plus
+        # fréquents, lues dans les comptes du TokenStore (tenus à jour à
+        # l'ajout des documents) ; auteur / doc_type : statistiques des seuls
+        # documents sélectionnés. L'affichage est laissé à l'appelant.
+        return self.top_terms(n_top, auteur, doc_type)
+
+    def vocab_size(self, auteur=None, doc_type=None):
+        # Nombre de mots différents (des documents sélectionnés)
+        tf, _ = self.term_frequencies(auteur, doc_type)
+        return int(np.count_nonzero(tf))
+
+
+    def term_frequencies(self, auteur=None, doc_type=None):
+        # (TF, DF) de chaque mot (par id) : tout le corpus ou les documents
+        # d'un auteur / d'un type (seuls leurs tokens sont comptés)
+        if auteur is None and doc_type is None:
+            return self.tokens.term_counts(), self.tokens.doc_counts()
+        return self.cached(("tf", str(auteur), str(doc_type)), lambda: self.tokens.counts_of(
+            self.id2doc.select(auteur, doc_type)))
+
+
+    def top_terms(self, n=10, auteur=None, doc_type=None, by="tf"):
+        # Les n mots les plus fréquents (by="tf") ou présents dans le plus de
+        # documents (by="df"), par sélection partielle au lieu d'un tri complet
+        return self.cached(("top", n, by, str(auteur), str(doc_type)),
+                           lambda: self._top_terms(n, auteur, doc_type, by))
+
+    def _top_terms(self, n, auteur, doc_type, by):
+        tf, df = self.term_frequencies(auteur, doc_type)
+        ids = top_n(tf if by == "tf" else df, n)
+        return pd.DataFrame({'Term Frequency (TF)': tf[ids], 'Document Frequency (DF)': df[ids]},
+                            index=pd.Index([self.tokens.terms[j] for j in ids], name='Mot'))
+
+
+    def breakdown(self, by="auteur", n_top=3):
+        # Statistiques par auteur (by="auteur") ou par type de document
+        # (by="type") : documents, tokens, vocabulaire, mots les plus fréquents
+        return self.cached(("breakdown", by, n_top), lambda: self._breakdown(by, n_top))
+
+    def _breakdown(self, by, n_top):
+        store = self.id2doc
+        if by == "auteur":
+            noms, codes = store.author_names, np.array(store.auteurs, dtype=np.int64)
+        elif by == "type":
+            noms, codes = store.type_names, np.array(store.types, dtype=np.int64)
+        else:
+            raise ValueError(f"Unknown breakdown: {by}")
+        nb_groupes, nb_mots = len(noms), max(len(self.tokens.terms), 1)
+        longueurs = self.tokens.doc_lengths()
+
+        # comptes (groupe, mot) en une passe sur les tokens
+        cles, comptes = np.unique(np.repeat(codes, longueurs) * nb_mots + self.tokens.ids,
+                                  return_counts=True)
+        groupes, mots = cles // nb_mots, cles % nb_mots
+        ordre = np.lexsort((mots, -comptes, groupes))
+        debut = np.searchsorted(groupes[ordre], np.arange(nb_groupes))
+        fin = np.minimum(np.searchsorted(groupes[ordre], np.arange(nb_groupes), side="right"), debut + n_top)
+        frequents = [", ".join(self.tokens.terms[j] for j in mots[ordre[a:b]]) for a, b in zip(debut, fin)]
+
+        docs = np.bincount(codes, minlength=nb_groupes)
+        tokens = np.bincount(codes, weights=longueurs, minlength=nb_groupes).astype(np.int64)
+        resultat = pd.DataFrame({"Documents": docs,
+                                 "Tokens": tokens,
+                                 "Tokens / document": tokens / np.maximum(docs, 1),
+                                 "Vocabulaire": np.bincount(groupes, minlength=nb_groupes),
+                                 "Mots fréquents": frequents},
+                                index=pd.Index(noms, name="Auteur" if by == "auteur" else "Type"))
+        # co-auteurs arXiv sans document propre
+        return resultat[resultat["Documents"] > 0]
+
+
+    def cached(self, cle, calcul):
+        # résultat mémorisé tant qu'aucun document n'est ajouté
+        entree = self._stats.get(cle)
+        if entree is None or entree[0] != self.ndoc:
+            entree = self._stats[cle] = (self.ndoc, calcul())
+        return entree[1]
 
     
     # ---------- TD7 : vocabulaire (Partie 1.1) ----------
     def vocab(self):
-        vocab = {}
-        index = 0
-
-        for doc in self.id2doc.values():
-            texte = self.nettoyer_texte(str(doc.texte))
-            for mot in texte.split():
-                if mot not in vocab:
-                    vocab[mot] = {"id": index, "total_occ": 0, "doc_occ": 0}
-                    index += 1
-
-        print("Nombre de mots du vocabulaire :", len(vocab))
-        return vocab
\ No newline at end of file
+        # dictionnaire compact des mots (voir TermDictionary.py), ids attribués
+        # dans l'ordre de première apparition (cf. TokenStore)
+        vocab = TermDictionary(self.tokens.terms)
+        vocab.set_stats(self.tokens.term_counts(), self.tokens.doc_counts())
+
+        registry.event(f"Nombre de mots du vocabulaire : {len(vocab)}")
+        return vocab
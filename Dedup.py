@@ -0,0 +1,208 @@
+# Dedup.py
+# Near-duplicate detection with MinHash signatures and LSH banding.
+# Every document is reduced to the set of its word shingles (runs of
+# `shingle` consecutive cleaned words); the MinHash signature of that set
+# (num_perm minimums of random hash functions) estimates the Jaccard
+# similarity of two documents as the share of equal signature values.
+# Signatures are cut into `bands` bands: documents sharing one band land in
+# the same LSH bucket and are the only ones compared, so detection is
+# sub-quadratic. A document whose estimated similarity with an earlier
+# cluster representative reaches `threshold` joins that cluster.
+#
+# The Corpus runs the detector on every added document (add_document,
+# add_documents, add_speeches, load...) once enabled:
+#
+#     corpus.detect_duplicates(mode="cluster")     # or "drop": never stored
+#     corpus.duplicates.clusters()                 # representative → doc ids
+#     engine.search("tax cuts", collapse=True)     # one result per cluster
+
+from array import array
+import itertools
+import zlib
+import numpy as np
+
+
+PRIME = 4294967291           # largest prime below 2**32: shingle hashes modulo PRIME
+EMPTY = np.uint64(2 ** 32 - 1)
+
+
+class NearDuplicates:
+    def __init__(self, mode="cluster", threshold=0.8, num_perm=64, bands=16, shingle=3, seed=1):
+        if mode not in ("cluster", "drop"):
+            raise ValueError(f"Unknown duplicate mode: {mode}")
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.mode = mode              # "cluster": keep and group, "drop": do not store duplicates
+        self.threshold = threshold    # estimated Jaccard similarity of near-duplicates
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle = shingle
+
+        # hash functions h(x) = (a × x + b) >> 32 on 64 bits (multiply-shift)
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+        self.band_mult = rng.integers(1, 2 ** 63, num_perm // bands, dtype=np.uint64) | np.uint64(1)
+
+        self._signatures = np.zeros((1024, num_perm), dtype=np.uint32)   # doc id → signature
+        self.canonical = array("i")   # doc id → cluster representative (itself if unique)
+        self.buckets = {}             # band key → representative, or list of them
+        self.dropped = 0              # documents not stored (mode "drop")
+        self.word_hash = {}           # word → CRC32, computed once per word
+
+    @property
+    def signatures(self):
+        return self._signatures[:len(self.canonical)]
+
+    # ---------------------- signatures ----------------------
+    def signatures_of(self, docs_mots, block=1 << 22):
+        # MinHash signatures of a batch of documents (lists of words),
+        # num_perm × uint32 per document; empty documents get no shingle
+        # (all values EMPTY) and are never duplicates. Words are hashed once
+        # per distinct word of the batch.
+        n = len(docs_mots)
+        longueurs = np.fromiter(map(len, docs_mots), dtype=np.int64, count=n)
+        tous = list(itertools.chain.from_iterable(docs_mots))
+        nouveaux = [mot for mot in dict.fromkeys(tous) if mot not in self.word_hash]
+        if nouveaux:
+            self.word_hash.update((mot, zlib.crc32(mot.encode())) for mot in nouveaux)
+        w = np.fromiter(map(self.word_hash.__getitem__, tous), dtype=np.uint64, count=len(tous))
+        doc = np.repeat(np.arange(n), longueurs)
+        fin = np.repeat(np.cumsum(longueurs), longueurs)
+
+        # shingle starting at every word, shorter at the end of a document;
+        # documents shorter than `shingle` words keep their first one only
+        pos = np.arange(w.size)
+        sh = w.copy()
+        for i in range(1, self.shingle):
+            suivant = np.zeros_like(w)
+            dedans = pos + i < fin
+            suivant[dedans] = w[pos[dedans] + i]
+            sh = (sh * np.uint64(1000003) + suivant) % np.uint64(PRIME)
+        debut = np.repeat(np.cumsum(longueurs) - longueurs, longueurs)
+        garde = (pos + self.shingle <= fin) | (pos == debut)
+        sh, doc = sh[garde], doc[garde]
+
+        # minimum of every hash function over the shingles of each document,
+        # by blocks of shingles (bounded memory); hashes are num_perm × shingles
+        # so that the reduction runs along contiguous rows
+        sigs = np.full((self.num_perm, n), EMPTY, dtype=np.uint64)
+        pas = max(1, block // self.num_perm)
+        for a in range(0, sh.size, pas):
+            h = (self.a[:, None] * sh[a:a + pas] + self.b[:, None]) >> np.uint64(32)
+            d, starts = np.unique(doc[a:a + pas], return_index=True)
+            sigs[:, d] = np.minimum(sigs[:, d], np.minimum.reduceat(h, starts, axis=1))
+        return np.ascontiguousarray(sigs.T, dtype=np.uint32)
+
+    def band_keys(self, sigs):
+        # LSH key of every band of every signature (band number mixed in)
+        r = self.num_perm // self.bands
+        bandes = sigs.reshape(len(sigs), self.bands, r).astype(np.uint64)
+        keys = (bandes * self.band_mult).sum(axis=2)
+        return keys ^ (np.arange(self.bands, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15))
+
+    # ---------------------- détection ----------------------
+    def add_batch(self, docs_mots, drop=None):
+        # Assign the documents of a batch, in order, to clusters. Documents
+        # kept get the next consecutive ids. Returns the mask of the
+        # documents to store (all of them in mode "cluster" or if drop=False).
+        drop = self.mode == "drop" if drop is None else drop
+        first_id = len(self.canonical)
+        n = len(docs_mots)
+        sigs = self.signatures_of(docs_mots)
+        keys = self.band_keys(sigs)
+
+        # Documents sharing no band key with an earlier document (previous
+        # batches or earlier in this one) have no candidate: they start their
+        # own cluster and are bucketed in bulk. Only the others are compared.
+        plat = keys.ravel()
+        connus = np.fromiter(map(self.buckets.__contains__, plat.tolist()), dtype=bool, count=plat.size)
+        _, premier, inverse = np.unique(plat, return_index=True, return_inverse=True)
+        connus |= premier[inverse] // self.bands < np.arange(plat.size) // self.bands
+        vides = np.fromiter(map(len, docs_mots), dtype=np.int64, count=n) == 0
+        a_comparer = np.flatnonzero(connus.reshape(n, self.bands).any(axis=1) & ~vides).tolist()
+
+        garde = np.ones(n, dtype=bool)
+        canon = np.arange(n, dtype=np.int64)
+        positions = []          # doc id - first_id → position in the batch
+        debut = 0
+        for i in a_comparer + [n]:
+            # documents debut..i-1: clusters of their own
+            ids = np.arange(first_id + len(positions), first_id + len(positions) + i - debut)
+            canon[debut:i] = ids
+            pleins = ~vides[debut:i]
+            self.buckets.update(zip(keys[debut:i][pleins].ravel().tolist(),
+                                    np.repeat(ids[pleins], self.bands).tolist()))
+            positions.extend(range(debut, i))
+            if i == n:
+                break
+
+            rep = self.find(sigs, keys[i].tolist(), sigs[i], positions, first_id)
+            if rep >= 0 and drop:
+                garde[i] = False
+                self.dropped += 1
+            else:
+                doc_id = first_id + len(positions)
+                if rep < 0:
+                    rep = doc_id
+                    for key in keys[i].tolist():
+                        reps = self.buckets.get(key)
+                        if reps is None:
+                            self.buckets[key] = doc_id
+                        elif isinstance(reps, int):
+                            self.buckets[key] = [reps, doc_id]
+                        else:
+                            reps.append(doc_id)
+                positions.append(i)
+            canon[i] = rep
+            debut = i + 1
+
+        debut, fin = len(self.canonical), len(self.canonical) + int(garde.sum())
+        if fin > len(self._signatures):
+            # buffer grown by doubling
+            plus = np.zeros((max(fin, 2 * len(self._signatures)), self.num_perm), dtype=np.uint32)
+            plus[:debut] = self._signatures[:debut]
+            self._signatures = plus
+        self._signatures[debut:fin] = sigs[garde]
+        self.canonical.extend(canon[garde].tolist())
+        return garde
+
+    def find(self, sigs, keys, sig, positions, first_id):
+        # representative most similar to sig (at least threshold), -1 if none;
+        # representatives of this batch (ids from first_id) are read in sigs
+        candidats = set()
+        for key in keys:
+            reps = self.buckets.get(key)
+            if isinstance(reps, int):
+                candidats.add(reps)
+            elif reps is not None:
+                candidats.update(reps)
+        if not candidats:
+            return -1
+        candidats = sorted(candidats)
+        cand_sigs = np.array([self._signatures[c] if c < first_id else sigs[positions[c - first_id]]
+                              for c in candidats])
+        sim = (cand_sigs == sig).mean(axis=1)
+        best = int(np.argmax(sim))
+        return candidats[best] if sim[best] >= self.threshold else -1
+
+    # ---------------------- accès ----------------------
+    def similarity(self, doc_a, doc_b):
+        # estimated Jaccard similarity of the shingles of two documents
+        return float((self._signatures[doc_a] == self._signatures[doc_b]).mean())
+
+    def clusters(self):
+        # representative → doc ids of its cluster (clusters of 2 documents or more)
+        canon = np.asarray(self.canonical, dtype=np.int64)
+        dups = np.flatnonzero(canon != np.arange(canon.size))
+        groupes = {}
+        for d in dups.tolist():
+            groupes.setdefault(int(canon[d]), [int(canon[d])]).append(d)
+        return groupes
+
+    def stats(self):
+        canon = np.asarray(self.canonical, dtype=np.int64)
+        nb_dups = int(np.count_nonzero(canon != np.arange(canon.size)))
+        return {"documents": int(canon.size), "duplicates": nb_dups,
+                "clusters": int(np.unique(canon[canon != np.arange(canon.size)]).size),
+                "dropped": self.dropped}
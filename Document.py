@@ -1,7 +1,8 @@
 # Document.py
 # Base Document class and its two subclasses.
 # This module defines: a generic document structure, a Reddit-specific
-# document (with comment count), and an arXiv document (with multiple authors).
+# document (with comment count), an arXiv document (with multiple authors)
+# and a speech sentence (with the speech it comes from).
 
 class Document:
     def __init__(self, titre, auteur, date, url, texte):
@@ -43,4 +44,22 @@ class ArxivDocument(Document):
 
     def __str__(self):
         # Custom display for arXiv documents
-        return f"Arxiv : {self.titre} ({len(self.coAuteurs)} auteurs)"
\ No newline at end of file
+        return f"Arxiv : {self.titre} ({len(self.coAuteurs)} auteurs)"
+
+
+class SpeechDocument(Document):
+    def __init__(self, titre, auteur, date, url, texte, parent=-1, debut=0, fin=None, parent_texte=None):
+        # One sentence of a speech: parent is the id of the speech it comes
+        # from, debut / fin the character offsets of the sentence in it.
+        # A sentence added alone to a corpus only keeps its speech if
+        # parent_texte (the full text of the speech) is given.
+        super().__init__(titre, auteur, date, url, texte)
+        self.parent = parent
+        self.parent_texte = parent_texte
+        self.debut = debut
+        self.fin = debut + len(texte) if fin is None else fin
+        self.type = "Speech"
+
+    def __str__(self):
+        # Custom display for speech sentences
+        return f"Discours : {self.titre} ({self.auteur}, {self.date})"
\ No newline at end of file
@@ -0,0 +1,385 @@
+# DocumentStore.py
+# Columnar storage of the corpus documents.
+# Instead of keeping one Document object (with its own __dict__) per record,
+# every field is stored in a parallel column: titles and URLs in lists,
+# authors as interned ids, dates as int64 microseconds, type codes, and the
+# texts end to end in large string blocks addressed by offsets.
+# The store behaves like the former id2doc dict (doc_id → document): documents
+# are handed out as small DocumentView objects (__slots__), built on access,
+# that expose the usual Document API (titre, auteur, date, url, texte,
+# getType(), nbComments / coAuteurs, str()).
+# Speech sentences (add_speeches) do not copy their text: every speech is
+# stored once and its sentences are (parent speech, offsets) into it.
+# select() evaluates author / type / date-range filters on precomputed
+# per-value doc id lists and a date-sorted column (see SearchEngine.search).
+
+from array import array
+from bisect import bisect_right
+from collections.abc import Mapping
+import datetime
+import numpy as np
+import pandas as pd
+from Document import Document, RedditDocument, ArxivDocument, SpeechDocument
+
+
+EPOCH = datetime.datetime(1970, 1, 1)
+NO_DATE = -(2 ** 63)
+TEXT_BLOCK = 1 << 20        # texts are sealed into blocks of about 1M characters
+
+# Display of each document type (see DocumentView.__str__)
+DISPLAY = {"generic": Document, "Reddit": RedditDocument, "Arxiv": ArxivDocument,
+           "Speech": SpeechDocument}
+
+
+class DocumentStore(Mapping):
+    def __init__(self):
+        self.titres = []
+        self.urls = []
+        self.auteurs = array("i")         # author id of every document
+        self.dates = array("q")           # microseconds since 1970, NO_DATE if unknown
+        self.types = array("b")           # type code of every document
+        self.comments = array("q")        # Reddit comment count, -1 otherwise
+        self.coauteurs_ptr = array("q", [0])
+        self.coauteurs = array("i")       # co-author ids, doc i → [ptr[i]:ptr[i+1]]
+        self.parents = array("i")         # speech id of every sentence, -1 otherwise
+        self.debuts = array("q")          # offset of the text in its speech (0 otherwise)
+
+        self.author_names = []            # author id → name
+        self.author_ids = {}              # name → author id
+        self.type_names = []              # type code → getType() value
+        self.type_codes = {}
+
+        # texts: doc i is blocks[text_block[i]][text_start[i]:text_end[i]]
+        self.text_block = array("i")
+        self.text_start = array("q")
+        self.text_end = array("q")
+        self._blocks = []
+        self._pending = []           # texts not yet joined into a block
+        self._pending_starts = array("q")   # offset of every pending text in its future block
+        self._pending_len = 0
+
+        # speech texts (add_speeches), same addressing as the documents
+        self.speech_block = array("i")
+        self.speech_start = array("q")
+        self.speech_end = array("q")
+
+        self._filters_ndoc = -1      # number of docs when the filter columns were built
+
+    # ---------------------- ajout ----------------------
+    def intern_author(self, name):
+        a = self.author_ids.get(name)
+        if a is None:
+            a = self.author_ids[name] = len(self.author_names)
+            self.author_names.append(name)
+        return a
+
+    def intern_type(self, nom):
+        t = self.type_codes.get(nom)
+        if t is None:
+            t = self.type_codes[nom] = len(self.type_names)
+            self.type_names.append(nom)
+        return t
+
+    def add(self, doc):
+        # Copy the fields of a document object into the columns → doc id
+        doc_id = len(self.titres)
+        self.titres.append(doc.titre)
+        self.urls.append(doc.url)
+        self.auteurs.append(self.intern_author(doc.auteur))
+        self.dates.append(to_micro(getattr(doc, "date", None)))
+        self.types.append(self.intern_type(doc.getType()))
+        self.comments.append(getattr(doc, "nbComments", -1))
+
+        co = getattr(doc, "coAuteurs", None) or []
+        self.coauteurs.extend(self.intern_author(a) for a in co)
+        self.coauteurs_ptr.append(len(self.coauteurs))
+        # the parent id given with a single document is not a speech of this
+        # store: its speech text (e.g. a sentence of another corpus) is stored
+        # with it, otherwise the sentence has no parent
+        parent_texte = getattr(doc, "parent_texte", None)
+        self.parents.append(-1 if parent_texte is None else self.add_speech_text(str(parent_texte)))
+        self.debuts.append(getattr(doc, "debut", 0))
+
+        self.add_text(str(doc.texte))
+        return doc_id
+
+    def add_text(self, texte):
+        b, debut = self._add_piece(texte)
+        self.text_block.append(b)
+        self.text_start.append(debut)
+        self.text_end.append(debut + len(texte))
+
+    def add_speech_text(self, texte):
+        # store the full text of a speech → speech id
+        b, debut = self._add_piece(texte)
+        self.speech_block.append(b)
+        self.speech_start.append(debut)
+        self.speech_end.append(debut + len(texte))
+        return len(self.speech_block) - 1
+
+    def add_speeches(self, titres, auteurs, dates, urls, textes, parent, debut, fin, nom="Speech"):
+        # Bulk add of speech sentences. Every speech (titres[i], auteurs[i],
+        # dates[i], urls[i], textes[i]) is stored once; sentence s is
+        # textes[parent[s]][debut[s]:fin[s]] → doc id of the first sentence
+        first = len(self.titres)
+        parent = np.asarray(parent, dtype=np.int64)
+        debut = np.asarray(debut, dtype=np.int64)
+        fin = np.asarray(fin, dtype=np.int64)
+        n = parent.size
+
+        speech_ids = np.array([self.add_speech_text(str(texte)) for texte in textes], dtype=np.int64)
+        blocks = np.asarray(self.speech_block, dtype=np.int64)[speech_ids][parent]
+        bases = np.asarray(self.speech_start, dtype=np.int64)[speech_ids][parent]
+
+        self.titres.extend(titres[p] for p in parent.tolist())
+        self.urls.extend(urls[p] for p in parent.tolist())
+        extend(self.auteurs, np.array([self.intern_author(a) for a in auteurs], dtype=np.int64)[parent])
+        extend(self.dates, np.array([to_micro(d) for d in dates], dtype=np.int64)[parent])
+        extend(self.types, np.full(n, self.intern_type(nom)))
+        extend(self.comments, np.full(n, -1))
+        extend(self.coauteurs_ptr, np.full(n, len(self.coauteurs)))
+        extend(self.parents, speech_ids[parent])
+        extend(self.debuts, debut)
+        extend(self.text_block, blocks)
+        extend(self.text_start, bases + debut)
+        extend(self.text_end, bases + fin)
+        return first
+
+    def _add_piece(self, texte):
+        # append a text to the pending block → (block, offset in the block)
+        b, debut = len(self._blocks), self._pending_len
+        self._pending.append(texte)
+        self._pending_starts.append(debut)
+        self._pending_len += len(texte)
+        if self._pending_len >= TEXT_BLOCK:
+            self._seal()
+        return b, debut
+
+    def _seal(self):
+        # join the pending texts into one block
+        self._blocks.append("".join(self._pending))
+        self._pending = []
+        self._pending_starts = array("q")
+        self._pending_len = 0
+
+    # ---------------------- accès ----------------------
+    def texte(self, doc_id):
+        return self._text(self.text_block[doc_id], self.text_start[doc_id], self.text_end[doc_id])
+
+    def speech_texte(self, speech_id):
+        return self._text(self.speech_block[speech_id], self.speech_start[speech_id],
+                          self.speech_end[speech_id])
+
+    def _text(self, b, debut, fin):
+        if b == len(self._blocks):
+            # pending text containing [debut, fin)
+            i = bisect_right(self._pending_starts, debut) - 1
+            s = self._pending_starts[i]
+            return self._pending[i][debut - s:fin - s]
+        return self._blocks[b][debut:fin]
+
+    def date(self, doc_id):
+        return from_micro(self.dates[doc_id])
+
+    # ---------------------- filtres ----------------------
+    def select(self, auteurs=None, types=None, date_min=None, date_max=None):
+        # Sorted doc ids (int32) matching every given filter, None if there is
+        # no filter. auteurs / types (getType(), any case): one value or a
+        # list of values; date_min / date_max: inclusive bounds (a day given
+        # as a date or "YYYY-MM-DD" string includes all of that day).
+        self._build_filters()
+        parts = []
+        if auteurs is not None:
+            parts.append(self._lookup(self._by_author, self.author_ids, auteurs))
+        if types is not None:
+            codes = {nom.lower(): t for nom, t in self.type_codes.items()}
+            parts.append(self._lookup(self._by_type, codes, [str(t).lower() for t in as_list(types)]))
+        if date_min is not None or date_max is not None:
+            # undated documents come first in the sorted column: never selected
+            lo = np.searchsorted(self._dates_sorted, NO_DATE, side="right")
+            hi = self._dates_sorted.size
+            if date_min is not None:
+                lo = max(lo, np.searchsorted(self._dates_sorted, to_micro(day_start(date_min)), side="left"))
+            if date_max is not None:
+                hi = np.searchsorted(self._dates_sorted, to_micro(day_end(date_max)), side="left")
+            parts.append(np.sort(self._date_order[lo:max(lo, hi)]))
+
+        if not parts:
+            return None
+        parts.sort(key=len)
+        docs = parts[0]
+        for p in parts[1:]:
+            docs = np.intersect1d(docs, p, assume_unique=True)
+        return docs
+
+    def _lookup(self, groupes, codes, valeurs):
+        # doc ids of all the given values (author ids / type codes)
+        order, ptr = groupes
+        ids = [codes[v] for v in as_list(valeurs) if v in codes]
+        if not ids:
+            return np.empty(0, dtype=np.int32)
+        return np.sort(np.concatenate([order[ptr[i]:ptr[i + 1]] for i in ids]))
+
+    def _build_filters(self):
+        # doc ids grouped by author and by type, doc ids sorted by date;
+        # rebuilt when documents were added
+        n = len(self.titres)
+        if self._filters_ndoc == n:
+            return
+        self._by_author = group(np.array(self.auteurs, dtype=np.int32), len(self.author_names))
+        self._by_type = group(np.array(self.types, dtype=np.int32), len(self.type_names))
+        dates = np.array(self.dates, dtype=np.int64)
+        self._date_order = np.argsort(dates, kind="stable").astype(np.int32)
+        self._dates_sorted = dates[self._date_order]
+        self._filters_ndoc = n
+
+    def __getitem__(self, doc_id):
+        if not 0 <= doc_id < len(self.titres):
+            raise KeyError(doc_id)
+        return DocumentView(self, doc_id)
+
+    def __len__(self):
+        return len(self.titres)
+
+    def __iter__(self):
+        return iter(range(len(self.titres)))
+
+
+class DocumentView:
+    # Lightweight read-only document, reading its fields from a DocumentStore
+    __slots__ = ("store", "doc_id")
+
+    def __init__(self, store, doc_id):
+        self.store = store
+        self.doc_id = doc_id
+
+    @property
+    def titre(self):
+        return self.store.titres[self.doc_id]
+
+    @property
+    def auteur(self):
+        return self.store.author_names[self.store.auteurs[self.doc_id]]
+
+    @property
+    def date(self):
+        return self.store.date(self.doc_id)
+
+    @property
+    def url(self):
+        return self.store.urls[self.doc_id]
+
+    @property
+    def texte(self):
+        return self.store.texte(self.doc_id)
+
+    @property
+    def type(self):
+        return self.store.type_names[self.store.types[self.doc_id]]
+
+    @property
+    def parent(self):
+        return self.store.parents[self.doc_id]
+
+    @property
+    def debut(self):
+        return self.store.debuts[self.doc_id]
+
+    @property
+    def fin(self):
+        s = self.store
+        return s.debuts[self.doc_id] + s.text_end[self.doc_id] - s.text_start[self.doc_id]
+
+    @property
+    def parent_texte(self):
+        # full text of the speech of a sentence, None if there is none
+        p = self.store.parents[self.doc_id]
+        if not 0 <= p < len(self.store.speech_block):
+            return None
+        return self.store.speech_texte(p)
+
+    @property
+    def nbComments(self):
+        return self.store.comments[self.doc_id]
+
+    @property
+    def coAuteurs(self):
+        s = self.store
+        ids = s.coauteurs[s.coauteurs_ptr[self.doc_id]:s.coauteurs_ptr[self.doc_id + 1]]
+        return [s.author_names[a] for a in ids]
+
+    def getType(self):
+        return self.type
+
+    def __str__(self):
+        # same display as the Document subclass of this type
+        return DISPLAY.get(self.type, Document).__str__(self)
+
+    def __eq__(self, other):
+        return (isinstance(other, DocumentView) and other.store is self.store
+                and other.doc_id == self.doc_id)
+
+    def __hash__(self):
+        return hash((id(self.store), self.doc_id))
+
+
+def to_micro(date):
+    # date of a document → microseconds since 1970 (NO_DATE if unknown).
+    # Naive datetimes are taken as they are; anything else goes through
+    # pd.Timestamp: dates at midnight, "YYYY-MM-DD..." strings, aware
+    # datetimes converted to UTC.
+    if date is None or date != date:      # None / NaT / NaN
+        return NO_DATE
+    if isinstance(date, datetime.datetime) and date.tzinfo is None:
+        return (date - EPOCH) // datetime.timedelta(microseconds=1)
+    try:
+        ts = pd.Timestamp(date)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid document date: {date!r}") from e
+    if ts is pd.NaT:
+        return NO_DATE
+    return ts.value // 1000               # nanoseconds since 1970 (UTC if aware)
+
+
+def extend(colonne, valeurs):
+    # append a numpy array to an array.array column (same item type)
+    colonne.frombytes(np.ascontiguousarray(valeurs, dtype=colonne.typecode).tobytes())
+
+
+def group(valeurs, n):
+    # (doc ids sorted by value, start of each value) : value v → order[ptr[v]:ptr[v+1]]
+    order = np.argsort(valeurs, kind="stable").astype(np.int32)
+    ptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(valeurs, minlength=n), out=ptr[1:])
+    return order, ptr
+
+
+def as_list(valeurs):
+    if isinstance(valeurs, (list, tuple, set)):
+        return list(valeurs)
+    return [valeurs]
+
+
+def day_start(date):
+    # datetime, date or "YYYY-MM-DD[ HH:MM...]" → datetime
+    if isinstance(date, datetime.datetime):
+        return date
+    if isinstance(date, datetime.date):
+        return datetime.datetime(date.year, date.month, date.day)
+    return datetime.datetime.fromisoformat(str(date))
+
+
+def day_end(date):
+    # exclusive upper bound: a bare day includes the whole day
+    fin = day_start(date)
+    if isinstance(date, datetime.datetime):
+        return fin + datetime.timedelta(microseconds=1)
+    if isinstance(date, datetime.date) or len(str(date)) <= 10:
+        return fin + datetime.timedelta(days=1)
+    return fin + datetime.timedelta(microseconds=1)
+
+
+def from_micro(micro):
+    if micro == NO_DATE:
+        return None
+    return EPOCH + datetime.timedelta(microseconds=micro)
@@ -1,8 +1,8 @@
 # Factory.py
 # Simple factory class used to create the correct type of Document object
-# (RedditDocument or ArxivDocument) based on a string identifier.
+# (RedditDocument, ArxivDocument or SpeechDocument) based on a string identifier.
 
-from Document import RedditDocument, ArxivDocument
+from Document import RedditDocument, ArxivDocument, SpeechDocument
 
 
 class factoryClass:
@@ -17,6 +17,9 @@ class factoryClass:
         elif doc_type.lower() == "arxiv":
             return ArxivDocument(*args, **kwargs)
 
+        elif doc_type.lower() == "speech":
+            return SpeechDocument(*args, **kwargs)
+
         else:
             # If the type does not match any known document type
             raise ValueError(f"Unknown document type: {doc_type}")
\ No newline at end of file
@@ -0,0 +1,124 @@
+# IndexStore.py
+# On-disk format of the search engine index.
+# An index is a directory of .npy files (one per NumPy array) plus a
+# meta.json file. Arrays are reopened with np.load(mmap_mode="r"): opening an
+# index only maps the files, and several processes reading the same index
+# share the same pages of the OS cache instead of holding private copies.
+#
+# meta.json stores a fingerprint of the source CSV and of the analyser
+# settings, so a stale index (CSV changed, tokenizer changed) is detected.
+# The size and modification time of the CSV are stored with it: the file is
+# only hashed again when they changed, not on every opening.
+
+import hashlib
+import json
+import os
+import numpy as np
+from TokenStore import TOKEN_RE
+
+
+FORMAT_VERSION = 2
+META_FILE = "meta.json"
+
+
+SETTINGS = f"format={FORMAT_VERSION};token_re={TOKEN_RE.pattern};lower=1"
+
+
+def fingerprint(source=None):
+    # Hash of the source file content + analyser settings
+    h = hashlib.sha1()
+    h.update(SETTINGS.encode("utf-8"))
+    if source is not None:
+        with open(source, "rb") as f:
+            for bloc in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloc)
+    return h.hexdigest()
+
+
+def source_stat(source=None):
+    # [size, mtime in ns] of the source file (None without source)
+    if source is None:
+        return None
+    st = os.stat(source)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def terms_hash(terms):
+    # Hash of a list of words in id order ("\n"-joined; words never contain "\n"):
+    # an index only fits a corpus whose term ids are the same
+    return hashlib.sha1("\n".join(terms).encode("utf-8")).hexdigest()
+
+
+def save_index(dossier, arrays, meta, source=None):
+    # Write every array as <name>.npy, then meta.json last: an index
+    # directory without meta.json is an interrupted write and is ignored.
+    os.makedirs(dossier, exist_ok=True)
+    meta_path = os.path.join(dossier, META_FILE)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    for nom, arr in arrays.items():
+        np.save(os.path.join(dossier, nom + ".npy"), np.ascontiguousarray(arr))
+
+    meta = dict(meta, version=FORMAT_VERSION, fingerprint=fingerprint(source),
+                settings=SETTINGS, source_stat=source_stat(source), arrays=sorted(arrays))
+    write_meta(dossier, meta)
+
+
+def write_meta(dossier, meta):
+    with open(os.path.join(dossier, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+
+def read_meta(dossier):
+    meta_path = os.path.join(dossier, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def matches_source(dossier, meta, source=None):
+    # True if the index of meta was built from this source / analyser. The
+    # source is hashed only if its size or modification time changed (the
+    # new ones are then saved when the content is the same, e.g. a copy).
+    stat = source_stat(source)
+    if source is not None and meta.get("source_stat") == stat:
+        return meta.get("settings") == SETTINGS
+    if meta.get("fingerprint") != fingerprint(source):
+        return False
+    if source is not None:
+        try:
+            write_meta(dossier, dict(meta, settings=SETTINGS, source_stat=stat))
+        except OSError:
+            pass    # read-only index: hashed again next time
+    return True
+
+
+def is_fresh(dossier, source=None):
+    # True if the index exists and was built from this source / analyser
+    meta = read_meta(dossier)
+    return (meta is not None and meta.get("version") == FORMAT_VERSION
+            and matches_source(dossier, meta, source))
+
+
+def load_index(dossier, source=None):
+    # Memory-map every array of the index → (arrays, meta)
+    meta = read_meta(dossier)
+    if meta is None:
+        raise FileNotFoundError(f"No index found in {dossier}")
+    if meta.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported index format version: {meta.get('version')}")
+    if source is not None and not matches_source(dossier, meta, source):
+        raise ValueError(f"Index {dossier} was not built from {source}")
+
+    arrays = {nom: _map(os.path.join(dossier, nom + ".npy")) for nom in meta["arrays"]}
+    return arrays, meta
+
+
+def _map(path):
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:
+        # empty arrays cannot be memory-mapped
+        return np.load(path)
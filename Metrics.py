@@ -0,0 +1,157 @@
+# Metrics.py
+# Instrumentation of the corpus and the search engine: per-phase timers,
+# counters and optional cProfile hooks, reached through a registry.
+#
+# The engines report to the module-level `registry` unless they are given
+# their own Metrics object. It is disabled by default; a disabled registry
+# hands out one shared no-op context manager and ignores counts, so the
+# instrumented code costs a method call per phase.
+#
+#     from Metrics import registry
+#     registry.enable()
+#     registry.subscribe(print_event)        # or any callback(kind, name, value)
+#     registry.profile("query.topk")         # cProfile of a phase
+#     engine.search("tax cuts")
+#     registry.snapshot()                    # {"timers": {...}, "counters": {...}}
+#     registry.profile_stats("query.topk").sort_stats("cumtime").print_stats(10)
+#
+# Phases: analyze (corpus texts), dedup (near-duplicates), build.tf, build.idf, build.tfidf,
+# build.postings, query.analyze (parsing), query.vector, query.filters,
+# query.constraints, query.score (search_many), query.topk, query.results.
+# Counters: queries, postings (entries read), docs_scored, cache.hits,
+# cache.misses.
+
+import contextlib
+import cProfile
+import pstats
+import threading
+import time
+
+
+NULL_TIMER = contextlib.nullcontext()
+
+
+class Timer:
+    # Context manager timing one phase
+    __slots__ = ("metrics", "name", "start", "profiler")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.profiler = None
+
+    def __enter__(self):
+        self.profiler = self.metrics._start_profile(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duree = time.perf_counter() - self.start
+        if self.profiler is not None:
+            self.metrics._stop_profile(self.profiler)
+        self.metrics.record(self.name, duree)
+        return False
+
+
+class Metrics:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.timers = {}          # phase → [number of calls, total seconds]
+        self.counters = {}        # name → value
+        self.callbacks = []       # callback(kind, name, value), kind: "timer" / "count" / "event"
+        self.profiled = set()     # phases run under cProfile ("*" = all)
+        self.profiles = {}        # phase → cProfile.Profile
+        self._profiling = False   # cProfile cannot nest
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    # ---------------------- timers / compteurs ----------------------
+    def timer(self, name):
+        if not self.enabled:
+            return NULL_TIMER
+        return Timer(self, name)
+
+    def record(self, name, duree):
+        with self._lock:
+            t = self.timers.setdefault(name, [0, 0.0])
+            t[0] += 1
+            t[1] += duree
+        for callback in self.callbacks:
+            callback("timer", name, duree)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+        for callback in self.callbacks:
+            callback("count", name, n)
+
+    def event(self, message):
+        # progress message (formerly printed)
+        if not self.enabled:
+            return
+        for callback in self.callbacks:
+            callback("event", message, None)
+
+    # ---------------------- consommateurs ----------------------
+    def subscribe(self, callback):
+        self.callbacks.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        self.callbacks.remove(callback)
+
+    def snapshot(self):
+        with self._lock:
+            timers = {name: {"count": n, "total_s": total, "mean_ms": 1000 * total / n}
+                      for name, (n, total) in self.timers.items()}
+            return {"timers": timers, "counters": dict(self.counters)}
+
+    def reset(self):
+        with self._lock:
+            self.timers.clear()
+            self.counters.clear()
+            self.profiles.clear()
+
+    # ---------------------- cProfile ----------------------
+    def profile(self, *phases):
+        # run these phases (all of them with "*") under cProfile
+        self.profiled.update(phases or ("*",))
+
+    def profile_stats(self, phase):
+        # pstats.Stats of a profiled phase, None if it never ran
+        profiler = self.profiles.get(phase)
+        return pstats.Stats(profiler) if profiler is not None else None
+
+    def _start_profile(self, name):
+        if not self.profiled or not ("*" in self.profiled or name in self.profiled):
+            return None
+        with self._lock:
+            if self._profiling:
+                return None
+            self._profiling = True
+            profiler = self.profiles.setdefault(name, cProfile.Profile())
+        profiler.enable()
+        return profiler
+
+    def _stop_profile(self, profiler):
+        profiler.disable()
+        with self._lock:
+            self._profiling = False
+
+
+def print_event(kind, name, value):
+    # Callback printing the progress messages and timings
+    if kind == "event":
+        print(name)
+    elif kind == "timer":
+        print(f"{name} : {1000 * value:.2f} ms")
+
+
+registry = Metrics()
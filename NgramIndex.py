@@ -0,0 +1,171 @@
+# NgramIndex.py
+# Character n-gram index over the vocabulary, used to expand wildcard terms
+# (comput*, *ology, c*ter) and fuzzy terms (freedon~, comptuer~2) without a
+# linear scan of the terms.
+# Every term is padded as "$term$" and cut into overlapping n-grams; each
+# distinct n-gram has the sorted ids of the terms containing it (CSR arrays,
+# n-grams packed as uint64 codes). Wildcard candidates are the intersection
+# of the lists of the n-grams of the pattern pieces; fuzzy candidates share
+# enough n-grams with the word (an edit changes at most n + 1 of them), have
+# a close length and few characters the word lacks (a 64-bit mask of the
+# characters of every term). Candidates are then checked exactly: a regular
+# expression for wildcards, a vectorised edit distance (with transpositions)
+# for fuzzy terms, computed for all the candidates at once.
+
+import re
+import numpy as np
+
+
+PAD = "$"
+
+
+def gram_codes(texte, n):
+    # distinct n-grams of a string → sorted uint64 codes (21 bits per character)
+    codes = np.frombuffer(texte.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    if codes.size < n:
+        return np.empty(0, dtype=np.uint64)
+    g = np.zeros(codes.size - n + 1, dtype=np.uint64)
+    for i in range(n):
+        g = (g << np.uint64(21)) | codes[i:codes.size - n + 1 + i]
+    return np.unique(g)
+
+
+def char_mask(codes):
+    # one bit (code point modulo 64) per character
+    return np.uint64(1) << (codes.astype(np.uint64) % np.uint64(64))
+
+
+class NgramIndex:
+    def __init__(self, terms, n=3):
+        self.n = n
+        self.nterms = len(terms)
+        self.words = list(terms)
+        self.text = "\n".join(self.words)     # one term per line (patterns with no n-gram)
+
+        # code points of all the terms end to end; term j is codes[starts[j]:starts[j+1]]
+        self.lengths = np.fromiter(map(len, terms), dtype=np.int64, count=len(terms))
+        self.starts = np.concatenate([[0], np.cumsum(self.lengths)])
+        self.codes = np.frombuffer("".join(terms).encode("utf-32-le"), dtype=np.uint32)
+        self.masks = np.zeros(len(terms), dtype=np.uint64)     # characters of every term
+        pleins = np.flatnonzero(self.lengths > 0)
+        if pleins.size:
+            self.masks[pleins] = np.bitwise_or.reduceat(char_mask(self.codes), self.starts[pleins])
+
+        # n-grams of every padded term, one pass over the padded code points
+        padded = np.frombuffer("".join(PAD + t + PAD for t in terms).encode("utf-32-le"),
+                               dtype=np.uint32).astype(np.uint64)
+        owner = np.repeat(np.arange(len(terms), dtype=np.int32), self.lengths + 2)
+        m = max(padded.size - n + 1, 0)
+        g = np.zeros(m, dtype=np.uint64)
+        for i in range(n):
+            g = (g << np.uint64(21)) | padded[i:m + i]
+        dedans = owner[:m] == owner[n - 1:n - 1 + m]        # n-grams inside one term
+        g, owner = g[dedans], owner[:m][dedans]
+
+        # distinct (n-gram, term) pairs sorted by n-gram, then term id
+        ordre = np.lexsort((owner, g))
+        g, owner = g[ordre], owner[ordre]
+        garde = np.ones(g.size, dtype=bool)
+        garde[1:] = (g[1:] != g[:-1]) | (owner[1:] != owner[:-1])
+        g, self.term_ids = g[garde], owner[garde]
+        debuts = np.flatnonzero(np.append(True, g[1:] != g[:-1])) if g.size else np.empty(0, dtype=np.int64)
+        self.grams = g[debuts]
+        self.indptr = np.append(debuts, g.size)
+
+        # term ids by length (ranges of lengths for short fuzzy words)
+        self.by_length = np.argsort(self.lengths, kind="stable").astype(np.int32)
+        self.length_ptr = np.searchsorted(self.lengths[self.by_length],
+                                          np.arange(self.lengths.max(initial=0) + 2))
+
+    # ---------------------- accès ----------------------
+    def postings(self, gram):
+        # sorted ids of the terms containing an n-gram code
+        i = np.searchsorted(self.grams, gram)
+        if i == self.grams.size or self.grams[i] != gram:
+            return np.empty(0, dtype=np.int32)
+        return self.term_ids[self.indptr[i]:self.indptr[i + 1]]
+
+    def with_length(self, lo, hi):
+        # ids of the terms of length lo..hi
+        lo, hi = max(lo, 0), min(hi + 1, self.length_ptr.size - 1)
+        if lo >= hi:
+            return np.empty(0, dtype=np.int32)
+        return np.sort(self.by_length[self.length_ptr[lo]:self.length_ptr[hi]])
+
+    def term(self, j):
+        return self.words[j]
+
+    # ---------------------- jokers ----------------------
+    def wildcard(self, motif):
+        # ids of the terms matching a pattern with "*" (any characters)
+        pieces = list(map(re.escape, motif.split("*")))
+        grams = np.concatenate([gram_codes(piece, self.n) for piece in (PAD + motif + PAD).split("*")])
+        if grams.size == 0:
+            # no piece long enough (e.g. "*ab*"): one scan of all the terms
+            regex = re.compile("^" + "[^\n]*".join(pieces) + "$", re.MULTILINE)
+            debuts = np.array([m.start() for m in regex.finditer(self.text)], dtype=np.int64)
+            return np.searchsorted(self.starts[:-1] + np.arange(self.nterms), debuts).astype(np.int32)
+
+        ids = None
+        for gram in np.unique(grams):
+            p = self.postings(gram)
+            ids = p if ids is None else np.intersect1d(ids, p, assume_unique=True)
+            if ids.size == 0:
+                return ids
+        regex = re.compile(".*".join(pieces), re.DOTALL)
+        words = self.words
+        return ids[np.fromiter((regex.fullmatch(words[j]) is not None for j in ids.tolist()),
+                               dtype=bool, count=ids.size)]
+
+    def fuzzy(self, mot, distance):
+        # (ids, distances) of the terms within `distance` edits of mot
+        # (insertions, deletions, substitutions, transpositions)
+        # an edit changes at most n n-grams, a transposition n + 1
+        grams = gram_codes(PAD + mot + PAD, self.n)
+        minimum = grams.size - (self.n + 1) * distance
+        if minimum > 0:
+            postings = [self.postings(g) for g in grams]
+            counts = np.bincount(np.concatenate(postings), minlength=self.nterms) if postings else \
+                np.zeros(self.nterms, dtype=np.int64)
+            ids = np.flatnonzero(counts >= minimum).astype(np.int32)
+            ids = ids[np.abs(self.lengths[ids] - len(mot)) <= distance]
+        else:
+            # short word: too few n-grams to filter, close lengths only
+            ids = self.with_length(len(mot) - distance, len(mot) + distance)
+
+        # every edit adds at most one character missing from the other word
+        q = np.frombuffer(mot.encode("utf-32-le"), dtype=np.uint32)
+        masque = np.bitwise_or.reduce(char_mask(q)) if q.size else np.uint64(0)
+        m = self.masks[ids]
+        ids = ids[(np.bitwise_count(m & ~masque) <= distance) & (np.bitwise_count(masque & ~m) <= distance)]
+        d = self.distances(mot, ids)
+        garde = d <= distance
+        return ids[garde], d[garde]
+
+    def distances(self, mot, ids):
+        # edit distance (optimal string alignment) between mot and the terms
+        # ids, one row of the dynamic programme at a time for all terms:
+        # cur[j] = min(prev[j] + 1, prev[j-1] + cost, cur[j-1] + 1), the last
+        # (insertion) chain being a running minimum of cur[j] - j
+        if ids.size == 0:
+            return np.empty(0, dtype=np.int64)
+        lengths = self.lengths[ids]
+        w = int(lengths.max())
+        cols = np.arange(w)
+        pos = self.starts[ids][:, None] + cols
+        c = np.where(cols < lengths[:, None], self.codes[np.minimum(pos, max(self.codes.size - 1, 0))], 0)
+        q = np.frombuffer(mot.encode("utf-32-le"), dtype=np.uint32)
+
+        j = np.arange(w + 1)
+        prev2 = None
+        prev = np.broadcast_to(j, (ids.size, w + 1)).copy()
+        for i in range(1, q.size + 1):
+            cur = np.empty_like(prev)
+            cur[:, 0] = i
+            cur[:, 1:] = np.minimum(prev[:, 1:] + 1, prev[:, :-1] + (c != q[i - 1]))
+            if prev2 is not None and w > 1:
+                swap = (c[:, :-1] == q[i - 1]) & (c[:, 1:] == q[i - 2])
+                cur[:, 2:] = np.where(swap, np.minimum(cur[:, 2:], prev2[:, :-2] + 1), cur[:, 2:])
+            cur = np.minimum.accumulate(cur - j, axis=1) + j
+            prev2, prev = prev, cur
+        return prev[np.arange(ids.size), lengths]
@@ -0,0 +1,78 @@
+# Query.py
+# Parsing of search queries.
+# Besides plain keywords, a query may contain:
+#   "middle class"       exact phrase: the words must follow each other
+#   "tax cuts"~5         proximity: the words must occur within 5 words
+#   comput*  *ology      wildcard: the words of the vocabulary matching the
+#                        pattern ("*": any characters)
+#   freedon~  freedon~2  fuzzy: the words within 1 or 2 edits (insertion,
+#                        deletion, substitution, swap); "~" alone allows none
+#                        up to 2 letters, 1 up to 5 letters, 2 beyond
+# Every word of the query (inside quotes or not) is used for the ranking;
+# phrases and proximity groups only restrict which documents can match.
+# Wildcard and fuzzy terms (outside quotes) are expanded over the vocabulary
+# by the SearchEngine (TermDictionary.wildcard / fuzzy), each expansion
+# counting as a query word.
+
+import re
+from TokenStore import analyser
+
+
+GROUP_RE = re.compile(r'"([^"]*)"(?:~(\d+))?')
+JOKER_RE = re.compile(r'(?<!\S)([^\s"]*\*[^\s"]*|[^\s"*~]+~[12]?)(?!\S)')
+QUERY_RE = re.compile(GROUP_RE.pattern + "|" + JOKER_RE.pattern)
+
+
+def fuzzy_distance(mot):
+    # edits allowed by "~" alone
+    return 0 if len(mot) <= 2 else 1 if len(mot) <= 5 else 2
+
+
+class Query:
+    def __init__(self, texte):
+        self.jokers = []         # ("*", pattern) / ("~", word, edits), see TermDictionary
+        self.texte = QUERY_RE.sub(self.extract_joker, str(texte))
+        self.mots = analyser(GROUP_RE.sub(lambda m: " " + m.group(1) + " ", self.texte))
+        self.phrases = []        # lists of words that must appear in sequence
+        self.proximites = []     # (words, n): words within n words of each other
+
+        for m in GROUP_RE.finditer(self.texte):
+            mots = analyser(m.group(1))
+            if not mots:
+                continue
+            if m.group(2) is None:
+                self.phrases.append(mots)
+            else:
+                self.proximites.append((mots, int(m.group(2))))
+
+    def extract_joker(self, m):
+        # wildcard / fuzzy term → self.jokers (removed from the text);
+        # phrases are kept, and so are the words of a term that analyses to
+        # several words (e.g. new-york*)
+        if m.group(3) is None:
+            return m.group(0)
+        terme = m.group(3)
+        if "*" in terme:
+            pieces = [analyser(p) for p in re.split(r"\*+", terme)]
+            if any(len(p) > 1 for p in pieces):
+                return " " + " ".join(mot for p in pieces for mot in p) + " "
+            motif = "*".join(p[0] if p else "" for p in pieces)
+            if motif.strip("*"):
+                self.jokers.append(("*", motif))
+        else:
+            mot, _, d = terme.partition("~")
+            mots = analyser(mot)
+            if len(mots) != 1:
+                return " " + " ".join(mots) + " "
+            self.jokers.append(("~", mots[0], int(d) if d else fuzzy_distance(mots[0])))
+        return " "
+
+    def has_constraints(self):
+        return bool(self.phrases or self.proximites)
+
+    def key(self):
+        # Normalised form of the analysed query (same key → same results)
+        return (tuple(sorted(self.mots)),
+                tuple(tuple(p) for p in self.phrases),
+                tuple((tuple(m), n) for m, n in self.proximites),
+                tuple(sorted(self.jokers)))
@@ -0,0 +1,66 @@
+# QueryCache.py
+# Bounded LRU / TTL cache of search results.
+# Entries are keyed on the normalised analysed query (Query.key()), so
+# "Tax  cuts" and "cuts tax" share an entry, and hold a ranked top-N list of
+# (doc_id, score). A request for k <= N is answered from the first k items.
+# Every entry remembers the index generation it was computed for
+# (SearchEngine.generation): once the index changes, old entries are misses.
+
+from collections import OrderedDict
+import threading
+import time
+
+
+class QueryCache:
+    def __init__(self, max_entries=256, ttl=None, depth=10, clock=time.monotonic):
+        self.max_entries = max_entries   # 0 disables the cache
+        self.ttl = ttl                   # seconds, None = no expiry
+        self.depth = depth               # results kept at least, to serve larger k later
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()    # key → (generation, time, n, top)
+        self._lock = threading.Lock()
+
+    def get(self, key, k, generation):
+        # top-k list, or None if it has to be computed
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                gen, t, n, top = entry
+                expired = self.ttl is not None and self.clock() - t > self.ttl
+                if gen != generation or expired:
+                    del self._entries[key]
+                # fewer results than requested: the list is complete
+                elif k <= n or len(top) < n:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return top[:k]
+            self.misses += 1
+            return None
+
+    def size(self, k):
+        # number of results to compute on a miss
+        return max(k, self.depth)
+
+    def put(self, key, n, generation, top):
+        # top: the best n results (or all of them if there are fewer)
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (generation, self.clock(), n, list(top))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0}
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,134 @@
+# Scorer.py
+# Ranking functions of the SearchEngine.
+# A scorer only reads the raw TF postings of the engine (main index +
+# segments) and derives its own statistics from them, so switching scorers
+# (SearchEngine.set_scorer) never rebuilds the postings. Every scorer ranks
+# with a sum over the query words j:
+#     score(q, d) = sum_j query_weight(j) × posting_weight(j, d) / query_norm(q)
+# which lets SearchEngine.top_k prune with per-word upper bounds (MaxScore),
+# or walk impact-ordered postings and stop early (impact_ordered = True).
+#
+#   CosineScorer   TF × log(N/df) cosine similarity (the historical ranking)
+#   BM25Scorer     Okapi BM25 with tunable k1 / b, using the document lengths
+#                  and the average length computed when the index is built
+
+from abc import ABC, abstractmethod
+import math
+import numpy as np
+from SparseMatrix import SparseMatrix
+
+
+class Scorer(ABC):
+    # Interface; impact_ordered: top-k walks postings by decreasing weight
+    name = "scorer"
+    impact_ordered = False
+
+    def prepare(self, engine):
+        # (re)compute the statistics after the index changed
+        self._impact = None
+
+    @abstractmethod
+    def query_weights(self, engine, q_ids, counts):
+        pass
+
+    def query_norm(self, q_weights):
+        return 1.0
+
+    @abstractmethod
+    def posting_weights(self, engine, j, doc_ids, tf):
+        # j: a word id, or the word id of every posting
+        pass
+
+    @abstractmethod
+    def bounds(self, engine, q_ids):
+        # upper bound of posting_weights() for each word
+        pass
+
+    def impact_postings(self, engine):
+        # words × docs matrix of the posting weights, each row sorted by
+        # decreasing weight (doc id ascending among ties); built on first use
+        if self._impact is None:
+            nb_mots = len(engine.vocab)
+            mots, docs, poids = [], [], []
+            for inv in [engine.index] + [seg.inverted(nb_mots) for seg in engine.segments]:
+                rows = inv.row_ids()
+                mots.append(rows)
+                docs.append(inv.indices)
+                poids.append(self.posting_weights(engine, rows, inv.indices, inv.data))
+            mots, docs, poids = np.concatenate(mots), np.concatenate(docs), np.concatenate(poids)
+            ordre = np.lexsort((docs, -poids, mots))
+            indptr = np.zeros(nb_mots + 1, dtype=np.int64)
+            np.cumsum(np.bincount(mots, minlength=nb_mots), out=indptr[1:])
+            self._impact = SparseMatrix(indptr, docs[ordre], poids[ordre], (nb_mots, engine.ndoc))
+        return self._impact
+
+
+class CosineScorer(Scorer):
+    # Cosine similarity of the TF-IDF vectors (doc norms: SearchEngine.compute_norms)
+    name = "cosine"
+
+    def __init__(self, impact_ordered=False):
+        self.impact_ordered = impact_ordered
+        self._impact = None
+
+    def query_weights(self, engine, q_ids, counts):
+        return counts * engine.idf[q_ids]
+
+    def query_norm(self, q_weights):
+        return math.sqrt(float(np.dot(q_weights, q_weights)))
+
+    def posting_weights(self, engine, j, doc_ids, tf):
+        norms = engine.doc_norms[doc_ids]
+        return np.divide(tf * engine.idf[j], norms, out=np.zeros(norms.size), where=norms > 0)
+
+    def bounds(self, engine, q_ids):
+        return engine.idf[q_ids] * engine.max_impact[q_ids]
+
+
+class BM25Scorer(Scorer):
+    # Okapi BM25:
+    #   idf(j) × tf × (k1 + 1) / (tf + k1 × (1 - b + b × len(d) / avg_len))
+    name = "bm25"
+
+    def __init__(self, k1=1.2, b=0.75, impact_ordered=False):
+        self.k1 = k1
+        self.b = b
+        self.impact_ordered = impact_ordered
+        self._impact = None
+
+    def prepare(self, engine):
+        self._impact = None
+        nb_mots = len(engine.vocab)
+        forwards = [engine.mat_TF] + [seg.forward(nb_mots) for seg in engine.segments]
+
+        # document lengths (tokens) and average length
+        self.doc_lengths = np.concatenate([np.bincount(m.row_ids(), weights=m.data,
+                                                       minlength=m.shape[0]) for m in forwards])
+        self.avg_length = float(self.doc_lengths.mean()) if self.doc_lengths.size else 0.0
+        if self.avg_length > 0:
+            self.len_norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / self.avg_length)
+        else:
+            self.len_norm = np.full(self.doc_lengths.size, self.k1)
+
+        N = engine.ndoc
+        df = np.asarray(engine.doc_occ, dtype=np.float64)
+        self.idf = np.log(1 + (N - df + 0.5) / (df + 0.5))
+
+        # largest weight of every word over its postings
+        self.max_weight = np.zeros(nb_mots, dtype=np.float64)
+        for inv in [engine.index] + [seg.inverted(nb_mots) for seg in engine.segments]:
+            poids = self.posting_weights(engine, inv.row_ids(), inv.indices, inv.data)
+            non_vides = np.flatnonzero(inv.row_lengths())
+            if non_vides.size:
+                m = np.maximum.reduceat(poids, inv.indptr[non_vides])
+                self.max_weight[non_vides] = np.maximum(self.max_weight[non_vides], m)
+
+    def query_weights(self, engine, q_ids, counts):
+        return np.asarray(counts, dtype=np.float64)
+
+    def posting_weights(self, engine, j, doc_ids, tf):
+        tf = np.asarray(tf, dtype=np.float64)
+        return self.idf[j] * tf * (self.k1 + 1) / (tf + self.len_norm[doc_ids])
+
+    def bounds(self, engine, q_ids):
+        return self.max_weight[q_ids]
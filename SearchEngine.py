@@ -1,151 +1,862 @@
 # SearchEngine.py
 # TD7 : moteur de recherche basé sur TF, IDF, TF-IDF et similarité cosinus
+# Les matrices TF et TF-IDF sont stockées en format creux (CSR, voir SparseMatrix.py)
 
 from collections import Counter
-import math
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import heapq
+import threading
+import numpy as np
 import pandas as pd
-from tqdm import tqdm
+from SparseMatrix import SparseMatrix
+from Segment import Segment, merge_rows
+import IndexStore
+from Query import Query
+from QueryCache import QueryCache
+from Scorer import CosineScorer
+from Semantic import SemanticIndex
+from TermDictionary import TermDictionary
+from Metrics import registry
+
+
+def in_sorted(valeurs, tries):
+    # masque : valeurs présentes dans le tableau trié tries
+    if tries.size == 0:
+        return np.zeros(len(valeurs), dtype=bool)
+    pos = np.searchsorted(tries, valeurs)
+    pos[pos == tries.size] = 0
+    return tries[pos] == valeurs
+
+
+def filter_key(filtres):
+    # clé de cache (hashable) d'un tuple de filtres (auteur, doc_type, date_min, date_max)
+    cle = []
+    for v in filtres:
+        if isinstance(v, (list, tuple, set)):
+            cle.append(tuple(sorted(map(str, v))))
+        else:
+            cle.append(None if v is None else str(v))
+    return tuple(cle)
+
+
+def row_or_empty(mat, i):
+    # ligne i d'une matrice creuse, vide si i dépasse (vocabulaire agrandi depuis)
+    if i < mat.shape[0]:
+        return mat.row(i)
+    return np.empty(0, dtype=np.int32), np.empty(0, dtype=mat.data.dtype)
+
+
+def tf_rows(tokens, debut, fin, nb_mots):
+    # matrice TF (CSR) des documents debut..fin-1, lignes numérotées à partir de 0
+    offsets = tokens.offsets[debut:fin + 1]
+    return count_rows(tokens.ids[offsets[0]:offsets[-1]], offsets - offsets[0], nb_mots)
+
+
+def count_rows(ids, offsets, nb_mots):
+    # matrice TF (CSR) d'une tranche : ids des mots de ses documents mis bout
+    # à bout, offsets[d] = début du document d (exécuté aussi dans un processus)
+    nb_docs = len(offsets) - 1
+    docs = np.repeat(np.arange(nb_docs, dtype=np.int32), np.diff(offsets))
+    return SparseMatrix.from_coo(docs, ids, np.ones(len(ids), dtype=np.int32), (nb_docs, nb_mots))
 
 
 class SearchEngine:
 
-    def __init__(self, corpus):
+    def __init__(self, corpus, merge_threshold=1000, workers=None, cache_size=256, cache_ttl=None,
+                 scorer=None, metrics=None):
         self.corpus = corpus
         self.vocab = corpus.vocab()    # Partie 1.1 TD7
 
+        # timers / compteurs (voir Metrics.py), registre global par défaut
+        self.metrics = metrics or registry
+
         self.mat_TF = None
+        self.total_occ = None
+        self.doc_occ = None
         self.idf = None
         self.mat_TFxIDF = None
+        self.index = None
+        self.doc_norms = None
+        self.max_impact = None
 
-        # Partie 1.2 + 1.3
-        self.build_TF_matrix()
+        # Partie 1.2 + 1.3 (workers > 1 : matrice TF construite par tranches en parallèle)
+        with self.metrics.timer("build.tf"):
+            self.build_TF_matrix(workers)
 
         # Partie 1.4
-        self.build_IDF()
-        self.build_TF_IDF_matrix()
-
-
-    # ---------------------- PARTIE 1.2 + 1.3 : TF ----------------------
-    def build_TF_matrix(self):
-        nb_docs = self.corpus.ndoc
-        nb_mots = len(self.vocab)
-
-        # matrice TF : docs × mots
-        self.mat_TF = [[0 for _ in range(nb_mots)] for _ in range(nb_docs)]
+        with self.metrics.timer("build.idf"):
+            self.build_IDF()
+        with self.metrics.timer("build.tfidf"):
+            self.build_TF_IDF_matrix()
 
-        id_mot = {mot: info["id"] for mot, info in self.vocab.items()}
+        # index inversé + normes des documents
+        with self.metrics.timer("build.postings"):
+            self.build_index()
 
-        total_occ = [0] * nb_mots
-        doc_occ = [0] * nb_mots
+        # indexation incrémentale des documents ajoutés ensuite au corpus
+        self.init_segments(merge_threshold)
 
-        for doc_id, doc in self.corpus.id2doc.items():
-            texte = self.corpus.nettoyer_texte(str(doc.texte))
-            mots = texte.split()
+        # cache des résultats (voir QueryCache.py), invalidé dès que generation change
+        self.cache = QueryCache(cache_size, cache_ttl)
+        self.semantic = None         # couche LSA optionnelle (build_semantic)
 
-            freq = Counter(mots)
-            uniques = set(mots)
+        # fonction de classement (voir Scorer.py), cosinus TF-IDF par défaut
+        self.scorer = scorer or CosineScorer()
+        self.scorer.prepare(self)
 
-            for mot, c in freq.items():
-                j = id_mot[mot]
-                self.mat_TF[doc_id][j] = c
-                total_occ[j] += c
 
-            for mot in uniques:
-                j = id_mot[mot]
-                doc_occ[j] += 1
-
-        # mettre à jour vocab
-        for mot, info in self.vocab.items():
-            j = info["id"]
-            info["total_occ"] = total_occ[j]
-            info["doc_occ"] = doc_occ[j]
+    # ---------------------- PARTIE 1.2 + 1.3 : TF ----------------------
+    def build_TF_matrix(self, workers=None):
+        nb_docs = self.corpus.ndoc
+        self.ndoc = nb_docs
+        nb_mots = len(self.vocab)
 
-        print("Matrice TF construite.")
+        # matrice TF creuse (CSR) : docs × mots, seules les cases non nulles
+        # sont stockées. Construite directement à partir des ids de mots déjà
+        # analysés par le corpus (TokenStore), sans re-nettoyer les textes.
+        tokens = self.corpus.tokens
+        if workers and workers > 1 and nb_docs > 1:
+            # tranches de documents consécutifs (autant de mots dans chacune)
+            # comptées par un pool de processus, comme TokenStore.add_many,
+            # puis empilées dans l'ordre
+            offsets = tokens.offsets[:nb_docs + 1]
+            cibles = np.linspace(0, offsets[-1], workers + 1)
+            bornes = np.unique(np.concatenate([[0, nb_docs], np.searchsorted(offsets, cibles[1:-1])]))
+            tranches = [(tokens.ids[offsets[a]:offsets[b]], offsets[a:b + 1] - offsets[a], nb_mots)
+                        for a, b in zip(bornes[:-1].tolist(), bornes[1:].tolist())]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(count_rows, *zip(*tranches)))
+            self.mat_TF = merge_rows(parts[0], parts[1:], nb_mots)
+        else:
+            self.mat_TF = tf_rows(tokens, 0, nb_docs, nb_mots)
+
+        # comptes tenus à jour par le TokenStore (les mêmes documents)
+        self.total_occ = tokens.term_counts()
+        self.doc_occ = tokens.doc_counts()
+
+        # statistiques du vocabulaire (tableaux parallèles, par id de mot)
+        self.vocab.set_stats(self.total_occ, self.doc_occ)
+
+        self.metrics.event("Matrice TF construite.")
 
 
     # ---------------------- PARTIE 1.4 : IDF ---------------------------
     def build_IDF(self):
-        N = self.corpus.ndoc
-        nb_mots = len(self.vocab)
+        self.compute_IDF()
+        self.metrics.event("IDF calculé.")
 
-        self.idf = [0.0] * nb_mots
 
-        for mot, info in self.vocab.items():
-            j = info["id"]
-            df = info["doc_occ"]
-            if df > 0:
-                self.idf[j] = math.log(N / df)
-            else:
-                self.idf[j] = 0.0
+    def compute_IDF(self):
+        N = self.ndoc
+        df = self.doc_occ.astype(np.float64)
+
+        self.idf = np.zeros(df.size, dtype=np.float64)
+        np.log(N / df, out=self.idf, where=df > 0)
 
-        print("IDF calculé.")
+
+    def use_global_IDF(self, idf):
+        # IDF imposée de l'extérieur (index partitionné, voir ShardedSearch.py) :
+        # calculée sur tout le corpus pour que les scores des partitions soient
+        # comparables. Recalculée localement au prochain ajout de document.
+        with self.lock:
+            self.refresh()
+            self.idf = np.asarray(idf, dtype=np.float64)
+            self._weight_TF()
+            self.compute_norms()
+            self.scorer.prepare(self)
+            self.generation += 1
 
 
     # ----------------- PARTIE 1.4 : matrice TF-IDF ---------------------
     def build_TF_IDF_matrix(self):
-        nb_docs = self.corpus.ndoc
-        nb_mots = len(self.vocab)
+        self._weight_TF()
+        self.metrics.event("Matrice TF-IDF construite.")
 
-        self.mat_TFxIDF = [[0.0 for _ in range(nb_mots)] for _ in range(nb_docs)]
 
-        for i in range(nb_docs):
-            for j in range(nb_mots):
-                tf = self.mat_TF[i][j]
-                if tf != 0:
-                    self.mat_TFxIDF[i][j] = tf * self.idf[j]
+    def _weight_TF(self):
+        # matrice TF-IDF à partir de la matrice TF et de l'IDF courante :
+        # même structure creuse que la matrice TF, seules les valeurs changent
+        tf = self.mat_TF.data.astype(np.float64)
+        self.mat_TFxIDF = self.mat_TF.with_data(tf * self.idf[self.mat_TF.indices])
 
-        print("Matrice TF-IDF construite.")
 
+    # ----------------- Index inversé + normes -------------------------
+    def build_index(self):
+        # index inversé : mot → postings (doc_id triés, nombre d'occurrences).
+        # C'est la transposée de la matrice TF ; le poids TF-IDF d'un posting
+        # est tf × idf[mot], calculé à la lecture (voir postings()).
+        self.index = self.mat_TF.transpose()
+        self.segments = []
 
-    # ----------------- Vecteur de requête TF-IDF -----------------------
-    def build_query_vector(self, query):
-        nb_mots = len(self.vocab)
-        q_vec = [0.0] * nb_mots
+        # normes des documents calculées une seule fois à l'indexation
+        self.compute_norms()
 
-        texte = self.corpus.nettoyer_texte(str(query))
+        self.metrics.event("Index inversé construit.")
+
+
+    def compute_norms(self):
+        # normes TF-IDF de tous les documents (index principal + segments)
+        nb_mots = len(self.vocab)
+        forwards = [self.mat_TF] + [seg.forward(nb_mots) for seg in self.segments]
+        sq = [np.bincount(m.row_ids(), weights=(m.data * self.idf[m.indices]) ** 2,
+                          minlength=m.shape[0]) for m in forwards]
+        self.doc_norms = np.sqrt(np.concatenate(sq))
+
+        # borne supérieure par mot : max sur ses postings de tf / norme(doc).
+        # Contribution maximale du mot j au cosinus : q_j × idf[j] × max_impact[j] / |q|
+        self.max_impact = np.zeros(nb_mots, dtype=np.float64)
+        for inv in [self.index] + [seg.inverted(nb_mots) for seg in self.segments]:
+            norms = self.doc_norms[inv.indices]
+            impact = np.divide(inv.data, norms, out=np.zeros(norms.size), where=norms > 0)
+            non_vides = np.flatnonzero(inv.row_lengths())
+            if non_vides.size:
+                m = np.maximum.reduceat(impact, inv.indptr[non_vides])
+                self.max_impact[non_vides] = np.maximum(self.max_impact[non_vides], m)
+
+
+    def postings_tf(self, j):
+        # (doc_ids triés, tf) du mot d'id j, index principal + segments
+        parts = [row_or_empty(self.index, j)]
+        for seg in self.segments:
+            parts.append(row_or_empty(seg.inverted(len(self.vocab)), j))
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate([d for d, _ in parts]), np.concatenate([tf for _, tf in parts])
+
+
+    def postings(self, j):
+        # (doc_ids, poids TF-IDF) des documents contenant le mot d'id j
+        doc_ids, tf = self.postings_tf(j)
+        return doc_ids, tf * self.idf[j]
+
+
+    # ----------------- Indexation incrémentale -------------------------
+    def init_segments(self, merge_threshold=1000):
+        # Les documents ajoutés au corpus après la construction vont dans un
+        # petit segment en mémoire ; IDF et normes sont recalculées à la
+        # prochaine recherche, et les segments sont fusionnés dans l'index
+        # principal en tâche de fond dès qu'ils dépassent merge_threshold docs.
+        self.segments = []
+        self.merge_threshold = merge_threshold
+        self.generation = 0          # incrémenté à chaque modification de l'index
+        self.stale = False           # IDF / normes à recalculer
+        self.lock = threading.RLock()
+        self.merge_thread = None
+        self.corpus.listeners.add(self)
+
+
+    def close(self):
+        # Détache le moteur du corpus : il n'indexe plus les documents ajoutés
+        # (les moteurs qui ne sont plus référencés sont aussi oubliés)
+        self.merge(wait=True)
+        self.corpus.listeners.discard(self)
+
+
+    def document_added(self, doc_id):
+        # Appelé par Corpus.add_document
+        with self.lock:
+            for d in range(self.ndoc, doc_id + 1):
+                self.index_document(d)
+
+
+    def index_document(self, doc_id):
+        # ids des mots du TokenStore (mêmes ids que le vocabulaire) ; les mots
+        # apparus avec ce document sont ajoutés au vocabulaire, dans l'ordre
+        tokens = self.corpus.tokens
+        ids = tokens.doc_ids(doc_id)
+        nb_mots = len(self.vocab)
+        if ids.size and int(ids.max()) >= nb_mots:
+            self.vocab.extend(tokens.terms[nb_mots:int(ids.max()) + 1])
+
+        term_ids, tf = np.unique(ids, return_counts=True)
+
+        if not self.segments or self.segments[-1].frozen:
+            self.segments.append(Segment(self.ndoc))
+        self.segments[-1].add(term_ids, tf)
+
+        self.ndoc += 1
+        self.stale = True
+        self.generation += 1
+
+        if self.segments[-1].ndoc >= self.merge_threshold:
+            self.merge()
+
+
+    def refresh(self):
+        # Met à jour DF, IDF, normes et bornes si des documents ont été ajoutés
+        with self.lock:
+            if not self.stale:
+                return
+            nb_mots = len(self.vocab)
+            forwards = [self.mat_TF] + [seg.forward(nb_mots) for seg in self.segments]
+            indices = np.concatenate([m.indices for m in forwards])
+            data = np.concatenate([m.data for m in forwards])
+            self.doc_occ = np.bincount(indices, minlength=nb_mots)
+            self.total_occ = np.bincount(indices, weights=data, minlength=nb_mots).astype(np.int64)
+            self.vocab.set_stats(self.total_occ, self.doc_occ)
+
+            self.compute_IDF()
+            self._weight_TF()
+            self.compute_norms()
+            self.scorer.prepare(self)
+            self.stale = False
+
+
+    def set_scorer(self, scorer):
+        # Change de fonction de classement : seules les statistiques du scorer
+        # sont calculées, les postings (TF brutes) restent les mêmes
+        with self.lock:
+            self.refresh()
+            scorer.prepare(self)
+            self.scorer = scorer
+            self.generation += 1
+
+
+    def merge(self, wait=False):
+        # Fusionne les segments dans l'index principal (LSM). Le calcul se fait
+        # dans un thread ; seul l'échange final des tableaux prend le verrou.
+        with self.lock:
+            running = self.merge_thread is not None and self.merge_thread.is_alive()
+            if not running:
+                frozen = [seg for seg in self.segments]
+                if frozen:
+                    for seg in frozen:
+                        seg.frozen = True
+                    nb_mots = len(self.vocab)
+                    base = self.mat_TF
+                    forwards = [seg.forward(nb_mots) for seg in frozen]
+
+                    def travail():
+                        merged = merge_rows(base, forwards, nb_mots)
+                        inverted = merged.transpose()
+                        with self.lock:
+                            self.mat_TF = merged
+                            self.index = inverted
+                            self.segments = [s for s in self.segments if s not in frozen]
+                            self.stale = True
+
+                    self.merge_thread = threading.Thread(target=travail, daemon=True)
+                    self.merge_thread.start()
+            thread = self.merge_thread
+
+        if wait and thread is not None:
+            thread.join()
+            if running:
+                # une fusion était déjà en cours : fusionner aussi le reste
+                self.merge(wait=True)
+
+
+    # ----------------- Sauvegarde / ouverture de l'index ----------------
+    def save(self, dossier, source=None):
+        # Écrit l'index sur disque (voir IndexStore.py). source : chemin du CSV
+        # dont est issu le corpus, utilisé pour l'empreinte de l'index.
+        self.merge(wait=True)
+        self.refresh()
+
+        arrays = {
+            "total_occ": self.total_occ,
+            "doc_occ": self.doc_occ,
+            "idf": self.idf,
+            "doc_norms": self.doc_norms,
+            "max_impact": self.max_impact,
+            "tf_indptr": self.mat_TF.indptr,
+            "tf_indices": self.mat_TF.indices,
+            "tf_data": self.mat_TF.data,
+            "tfidf_data": self.mat_TFxIDF.data,
+            "index_indptr": self.index.indptr,
+            "index_indices": self.index.indices,
+            "index_data": self.index.data,
+        }
+        arrays.update(self.vocab.arrays())
+        meta = {"ndoc": self.mat_TF.shape[0], "nterms": self.mat_TF.shape[1],
+                "terms_hash": IndexStore.terms_hash(self.corpus.tokens.terms), "block": self.vocab.block}
+        IndexStore.save_index(dossier, arrays, meta, source)
+
+
+    @classmethod
+    def open(cls, dossier, corpus, source=None, merge_threshold=1000, cache_size=256, cache_ttl=None,
+             scorer=None, metrics=None):
+        # Rouvre un index sauvegardé par save() sans rien recalculer : les
+        # tableaux sont projetés en mémoire (mmap) et partagés entre processus.
+        arrays, meta = IndexStore.load_index(dossier, source)
+        if meta["ndoc"] != corpus.ndoc:
+            raise ValueError(f"Index {dossier} has {meta['ndoc']} documents, corpus has {corpus.ndoc}")
+        if not cls.fits(meta, corpus):
+            raise ValueError(f"Index {dossier} was built on another vocabulary than the corpus")
+
+        engine = cls.__new__(cls)
+        engine.corpus = corpus
+        engine.metrics = metrics or registry
+        shape = (meta["ndoc"], meta["nterms"])
+
+        engine.total_occ = arrays["total_occ"]
+        engine.doc_occ = arrays["doc_occ"]
+        engine.vocab = TermDictionary.from_arrays(arrays, meta["block"])
+        engine.vocab.set_stats(engine.total_occ, engine.doc_occ)
+
+        engine.idf = arrays["idf"]
+        engine.doc_norms = arrays["doc_norms"]
+        engine.max_impact = arrays["max_impact"]
+        engine.mat_TF = SparseMatrix(arrays["tf_indptr"], arrays["tf_indices"], arrays["tf_data"], shape)
+        engine.mat_TFxIDF = engine.mat_TF.with_data(arrays["tfidf_data"])
+        engine.index = SparseMatrix(arrays["index_indptr"], arrays["index_indices"],
+                                    arrays["index_data"], (shape[1], shape[0]))
+        engine.ndoc = shape[0]
+        engine.init_segments(merge_threshold)
+        engine.cache = QueryCache(cache_size, cache_ttl)
+        engine.semantic = None
+        engine.scorer = scorer or CosineScorer()
+        engine.scorer.prepare(engine)
+        return engine
+
+
+    @classmethod
+    def load_or_build(cls, corpus, dossier, source=None):
+        # Ouvre l'index s'il est à jour pour ce CSV, sinon le construit et le sauvegarde
+        if IndexStore.is_fresh(dossier, source):
+            meta = IndexStore.read_meta(dossier)
+            if meta["ndoc"] == corpus.ndoc and cls.fits(meta, corpus):
+                return cls.open(dossier, corpus)
+
+        engine = cls(corpus)
+        engine.save(dossier, source)
+        return engine
+
+
+    @staticmethod
+    def fits(meta, corpus):
+        # l'index a les mêmes mots, avec les mêmes ids, que le corpus
+        terms = corpus.tokens.terms
+        return meta["nterms"] == len(terms) and meta.get("terms_hash") == IndexStore.terms_hash(terms)
+
+
+    # ----------------- Vecteur de requête -----------------------------
+    def build_query_vector(self, query, scorer=None):
+        # vecteur requête creux : (ids des mots, poids), ids triés.
+        # Poids TF-IDF avec le cosinus, nombre d'occurrences avec BM25
+        # (poids d'un autre scorer que celui du moteur si scorer est donné).
+        # query : texte ou Query ; ses jokers (comput*, freedon~) comptent
+        # pour chacun des mots du vocabulaire qu'ils désignent.
+        q = query if isinstance(query, Query) else Query(query)
+        texte = self.corpus.nettoyer_texte(q.texte)
         mots = texte.split()
 
         freq = Counter(mots)
 
+        comptes = {}
         for mot, c in freq.items():
-            if mot in self.vocab:
-                j = self.vocab[mot]["id"]
-                q_vec[j] = c * self.idf[j]
-
-        return q_vec
-
-
-    # ----------------- Similarité cosinus ------------------------------
-    def cosine(self, A, B):
-        num = sum(a*b for a, b in zip(A, B))
-        normA = math.sqrt(sum(a*a for a in A))
-        normB = math.sqrt(sum(b*b for b in B))
-        if normA == 0 or normB == 0:
-            return 0.0
-        return num / (normA * normB)
-
-
-    # ----------------- Fonction search (Partie 2 + 3) ------------------
-    def search(self, query, k=5):
+            j = self.vocab.id_of(mot)
+            if j >= 0:
+                comptes[j] = comptes.get(j, 0) + c
+        for j, c in self.vocab.expand(q.jokers):
+            comptes[j] = comptes.get(j, 0) + c
+
+        q_ids = np.array(sorted(comptes), dtype=np.int32)
+        counts = np.array([comptes[j] for j in q_ids.tolist()], dtype=np.float64)
+        return q_ids, (scorer or self.scorer).query_weights(self, q_ids, counts)
+
+
+    # ----------------- Complétion ---------------------------------------
+    def complete(self, texte, n=10):
+        # complétions du dernier mot en cours de frappe (rien si texte finit
+        # par un espace) : [(mot, nb de documents)], les plus fréquents d'abord
+        if not texte or texte[-1].isspace():
+            return []
+        mots = self.corpus.nettoyer_texte(texte).split()
+        if not mots:
+            return []
+        with self.lock:
+            self.refresh()
+            return self.vocab.complete(mots[-1], n)
+
+
+    # ----------------- Scores des documents ----------------------------
+    def score_documents(self, q_ids, q_weights):
+        # Score (cosinus ou autre scorer) calculé uniquement sur les postings
+        # des mots de la requête : (doc_ids, scores) des documents ayant un score > 0
+        q_norm = self.scorer.query_norm(q_weights)
+        if q_norm == 0 or len(q_ids) == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+
+        all_docs = []
+        all_contrib = []
+        for j, w in zip(q_ids, q_weights):
+            doc_ids, tf = self.postings_tf(j)
+            all_docs.append(doc_ids)
+            all_contrib.append(w / q_norm * self.scorer.posting_weights(self, j, doc_ids, tf))
+
+        doc_ids, inverse = np.unique(np.concatenate(all_docs), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(all_contrib), minlength=doc_ids.size)
+        self.metrics.count("postings", inverse.size)
+        self.metrics.count("docs_scored", doc_ids.size)
+
+        keep = scores > 0
+        return doc_ids[keep], scores[keep]
+
+
+    # ----------------- Top-k avec élagage (MaxScore) -------------------
+    def top_k(self, q_ids, q_weights, k, allowed=None, q_norm=None):
         """
-        Retourne un DataFrame avec les k documents les plus pertinents :
-        colonnes : doc_id, titre, auteur, date, url, score
+        Retourne les k meilleurs (doc_id, score), triés par score décroissant
+        puis doc_id croissant : même résultat que score_documents() + tri complet.
+        allowed : tableau trié des doc_id autorisés (None = tous).
+        q_norm : norme de la requête si elle contient des mots absents de
+        cet index (partitions de ShardedSearch), sinon calculée ici.
+
+        Les mots sont parcourus par borne supérieure décroissante. Dès que la
+        somme des bornes des mots restants est inférieure au k-ième score
+        partiel, aucun nouveau document ne peut entrer dans le top-k : on ne
+        fait plus que compléter les candidats déjà vus (recherche dichotomique
+        dans les postings) et on écarte ceux qui ne peuvent plus y arriver.
+        Les bornes par mot et les poids des postings viennent du scorer ; si
+        celui-ci est impact_ordered, voir top_k_impact().
         """
-        q_vec = self.build_query_vector(query)
-
-        scores = []
-        nb_docs = self.corpus.ndoc
-
-        # Similarité cosinus pour chaque document
-        for doc_id in tqdm(range(nb_docs), desc="Recherche"):
-            d_vec = self.mat_TFxIDF[doc_id]
-            score = self.cosine(q_vec, d_vec)
-            scores.append((doc_id, score))
-            
-        scores = sorted(scores, key=lambda x: x[1], reverse=True)
-        scores = [s for s in scores if s[1] > 0]
-        top = scores[:k]
-
+        scorer = self.scorer
+        if q_norm is None:
+            q_norm = scorer.query_norm(q_weights)
+        if q_norm == 0 or k <= 0 or len(q_ids) == 0:
+            return []
+        q_weights = np.asarray(q_weights, dtype=np.float64) / q_norm
+        if allowed is not None and 4 * allowed.size < int(self.doc_occ[q_ids].sum()):
+            return self.top_k_selective(q_ids, q_weights, k, allowed)
+        if scorer.impact_ordered:
+            return self.top_k_impact(q_ids, q_weights, k, allowed)
+
+        bornes = q_weights * scorer.bounds(self, q_ids)
+        ordre = np.argsort(-bornes, kind="stable")
+        # reste[i] = somme des bornes des mots ordre[i:]
+        reste = np.append(np.cumsum(bornes[ordre][::-1])[::-1], 0.0)
+
+        cand_ids = np.empty(0, dtype=np.int32)
+        cand_scores = np.empty(0, dtype=np.float64)
+        seuil = 0.0
+        admission = True
+        nb_postings = nb_scores = 0
+
+        for i, t in enumerate(ordre):
+            j, w = q_ids[t], q_weights[t]
+            doc_ids, tf = self.postings_tf(j)
+            nb_postings += doc_ids.size
+            if allowed is not None:
+                garde = in_sorted(doc_ids, allowed)
+                doc_ids, tf = doc_ids[garde], tf[garde]
+
+            if admission:
+                contrib = w * scorer.posting_weights(self, j, doc_ids, tf)
+                cand_ids, inverse = np.unique(np.concatenate([cand_ids, doc_ids]), return_inverse=True)
+                cand_scores = np.bincount(inverse, weights=np.concatenate([cand_scores, contrib]),
+                                          minlength=cand_ids.size)
+                nb_scores = cand_ids.size
+            elif cand_ids.size and doc_ids.size:
+                # saut direct vers les candidats dans la liste triée
+                # (liste vide si le filtre ne laisse aucun document du mot)
+                pos = np.searchsorted(doc_ids, cand_ids)
+                pos[pos == doc_ids.size] = 0
+                trouve = doc_ids[pos] == cand_ids
+                d = cand_ids[trouve]
+                cand_scores[trouve] += w * scorer.posting_weights(self, j, d, tf[pos[trouve]])
+
+            if cand_ids.size >= k:
+                seuil = float(np.partition(cand_scores, cand_ids.size - k)[cand_ids.size - k])
+
+            # petite marge pour rester exact malgré les arrondis flottants
+            if seuil > 0 and reste[i + 1] < seuil * (1 - 1e-9):
+                admission = False
+                garde = cand_scores + reste[i + 1] >= seuil * (1 - 1e-9)
+                cand_ids, cand_scores = cand_ids[garde], cand_scores[garde]
+
+        self.metrics.count("postings", nb_postings)
+        self.metrics.count("docs_scored", nb_scores)
+
+        garde = cand_scores > 0
+        if seuil > 0:
+            garde &= cand_scores >= seuil * (1 - 1e-9)
+
+        # tas borné de taille k : score décroissant, doc_id croissant
+        meilleurs = heapq.nlargest(k, zip(cand_scores[garde].tolist(), (-cand_ids[garde]).tolist()))
+        return [(-neg_id, score) for score, neg_id in meilleurs]
+
+
+    def top_k_impact(self, q_ids, q_weights, k, allowed=None):
+        """
+        Top-k sur les postings triés par poids décroissant (Scorer.impact_postings),
+        poids de requête déjà divisés par la norme. Les listes des mots sont
+        lues par blocs de taille croissante ; chaque nouveau document reçoit
+        son score complet (recherche dichotomique dans les postings). Tout
+        document pas encore vu a un score inférieur à la somme des poids
+        courants des listes : dès que le k-ième score la dépasse, on s'arrête.
+        """
+        impact = self.scorer.impact_postings(self)
+        listes = []
+        for j in q_ids:
+            docs, poids = row_or_empty(impact, j)
+            if allowed is not None:
+                garde = in_sorted(docs, allowed)
+                docs, poids = docs[garde], poids[garde]
+            listes.append((docs, poids))
+
+        cand_ids = np.empty(0, dtype=np.int32)
+        cand_scores = np.empty(0, dtype=np.float64)
+        debut, bloc = 0, max(k, 64)
+        while True:
+            fin = debut + bloc
+            nouveaux = np.unique(np.concatenate([docs[debut:fin] for docs, _ in listes]))
+            nouveaux = nouveaux[~in_sorted(nouveaux, cand_ids)]
+            if nouveaux.size:
+                cand_ids = np.concatenate([cand_ids, nouveaux])
+                cand_scores = np.concatenate([cand_scores, self.doc_scores(q_ids, q_weights, nouveaux)])
+                ordre = np.argsort(cand_ids)
+                cand_ids, cand_scores = cand_ids[ordre], cand_scores[ordre]
+
+            # borne des documents pas encore vus
+            restant = sum(w * poids[fin] for w, (_, poids) in zip(q_weights, listes) if fin < poids.size)
+            if restant == 0:
+                break
+            if cand_ids.size >= k:
+                seuil = float(np.partition(cand_scores, cand_ids.size - k)[cand_ids.size - k])
+                # petite marge pour rester exact malgré les arrondis flottants
+                if seuil > restant * (1 + 1e-9):
+                    break
+            debut, bloc = fin, 2 * bloc
+
+        self.metrics.count("postings", sum(min(fin, docs.size) for docs, _ in listes))
+        self.metrics.count("docs_scored", cand_ids.size)
+
+        garde = cand_scores > 0
+        if cand_ids.size > k:
+            seuil = float(np.partition(cand_scores, cand_ids.size - k)[cand_ids.size - k])
+            garde &= cand_scores >= seuil
+        meilleurs = heapq.nlargest(k, zip(cand_scores[garde].tolist(), (-cand_ids[garde]).tolist()))
+        return [(-neg_id, score) for score, neg_id in meilleurs]
+
+
+    def top_k_selective(self, q_ids, q_weights, k, allowed):
+        """
+        Top-k d'un filtre sélectif (peu de documents autorisés devant la
+        taille des postings) : au lieu de parcourir les postings, chaque
+        document autorisé reçoit directement son score complet.
+        """
+        scores = self.doc_scores(q_ids, q_weights, allowed)
+        self.metrics.count("postings", allowed.size * len(q_ids))
+        self.metrics.count("docs_scored", allowed.size)
+        garde = scores > 0
+        if garde.sum() > k:
+            seuil = float(np.partition(scores[garde], garde.sum() - k)[garde.sum() - k])
+            garde &= scores >= seuil
+        meilleurs = heapq.nlargest(k, zip(scores[garde].tolist(), (-allowed[garde]).tolist()))
+        return [(-neg_id, score) for score, neg_id in meilleurs]
+
+
+    def top_k_collapsed(self, q_ids, q_weights, k, allowed=None):
+        """
+        Top-k sans quasi-doublons : seul le premier document de chaque
+        groupe (Corpus.duplicates.canonical) est gardé. Le top-k est élargi
+        (×4) tant qu'il ne contient pas k groupes différents.
+        """
+        canon = self.corpus.duplicates.canonical
+        m = 2 * k
+        while True:
+            top = self.top_k(q_ids, q_weights, m, allowed)
+            vus, garde = set(), []
+            for d, s in top:
+                c = canon[d] if d < len(canon) else d
+                if c not in vus:
+                    vus.add(c)
+                    garde.append((d, s))
+            if len(garde) >= k or len(top) < m:
+                return garde[:k]
+            m *= 4
+
+
+    def doc_scores(self, q_ids, q_weights, doc_ids):
+        # score complet des documents doc_ids (triés), mot par mot
+        scores = np.zeros(doc_ids.size, dtype=np.float64)
+        for j, w in zip(q_ids, q_weights):
+            p_docs, tf = self.postings_tf(j)
+            if p_docs.size == 0:
+                continue
+            pos = np.searchsorted(p_docs, doc_ids)
+            pos[pos == p_docs.size] = 0
+            trouve = p_docs[pos] == doc_ids
+            scores[trouve] += w * self.scorer.posting_weights(self, j, doc_ids[trouve], tf[pos[trouve]])
+        return scores
+
+
+    # ----------------- Recherche par lots --------------------------------
+    def search_many(self, queries, k=5, workers=None, chunk_size=256, frames=True,
+                    auteur=None, doc_type=None, date_min=None, date_max=None):
+        """
+        Recherche de nombreuses requêtes d'un coup (évaluation, alertes...).
+        Toutes les requêtes sont analysées ensemble en une matrice requêtes ×
+        mots creuse, multipliée par l'index (produit creux × creux vectorisé).
+        Les paquets de chunk_size requêtes peuvent être répartis sur un pool
+        de workers threads (NumPy libère le GIL pendant les tris).
+        Retourne une liste de DataFrames (frames=False : listes de (doc_id, score)),
+        dans l'ordre des requêtes, identiques à search(query, k, ...).
+        Les filtres (auteur, doc_type, date_min, date_max) s'appliquent à
+        toutes les requêtes, voir search().
+        """
+        m = self.metrics
+        with m.timer("query.analyze"):
+            queries = [Query(q) for q in queries]
+        m.count("queries", len(queries))
+        filtres = (auteur, doc_type, date_min, date_max)
+        cles = [self.cache_key(q, filtres) for q in queries]
+        with self.lock:
+            self.refresh()
+            # seules les requêtes absentes du cache sont calculées
+            tops = [self.cache.get(cle, k, self.generation) for cle in cles]
+            manquantes = [i for i, top in enumerate(tops) if top is None]
+            n = self.cache.size(k)
+            m.count("cache.hits", len(queries) - len(manquantes))
+            m.count("cache.misses", len(manquantes))
+
+            allowed = None
+            if manquantes:
+                with m.timer("query.filters"):
+                    allowed = self.filter_docs(*filtres)
+
+            a_calculer = [queries[i] for i in manquantes]
+            paquets = [a_calculer[i:i + chunk_size] for i in range(0, len(a_calculer), chunk_size)]
+            if workers and workers > 1 and len(paquets) > 1:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    resultats = list(pool.map(lambda p: self.top_k_batch(p, n, allowed), paquets))
+            else:
+                resultats = [self.top_k_batch(p, n, allowed) for p in paquets]
+
+            for i, top in zip(manquantes, (top for paquet in resultats for top in paquet)):
+                self.cache.put(cles[i], n, self.generation, top)
+                tops[i] = top[:k]
+        if not frames:
+            return tops
+        with m.timer("query.results"):
+            return [self.build_results(top) for top in tops]
+
+
+    def top_k_batch(self, queries, k, allowed=None):
+        # top-k de chaque requête d'un paquet (liste de Query),
+        # allowed : tableau trié des doc_id autorisés (None = tous)
+        nb_q = len(queries)
+        if nb_q == 0 or k <= 0 or (allowed is not None and allowed.size == 0):
+            return [[] for _ in range(nb_q)]
+        m = self.metrics
+
+        # matrice requêtes × mots (COO), poids normalisés par |q|
+        q_rows, q_cols, q_vals = [], [], []
+        with m.timer("query.vector"):
+            for qi, q in enumerate(queries):
+                ids, weights = self.build_query_vector(q)
+                norm = self.scorer.query_norm(weights)
+                if norm > 0 and ids.size:
+                    q_rows.append(np.full(ids.size, qi))
+                    q_cols.append(ids)
+                    q_vals.append(weights / norm)
+        if not q_rows:
+            return [[] for _ in range(nb_q)]
+        q_rows, q_cols, q_vals = np.concatenate(q_rows), np.concatenate(q_cols), np.concatenate(q_vals)
+
+        with m.timer("query.score"):
+            # postings des mots utilisés, poids tf × idf / norme(doc)
+            mots, q_local = np.unique(q_cols, return_inverse=True)
+            p_docs, p_vals, longueurs = [], [], []
+            for j in mots:
+                doc_ids, tf = self.postings_tf(j)
+                if allowed is not None:
+                    garde = in_sorted(doc_ids, allowed)
+                    doc_ids, tf = doc_ids[garde], tf[garde]
+                p_docs.append(doc_ids)
+                p_vals.append(self.scorer.posting_weights(self, j, doc_ids, tf))
+                longueurs.append(doc_ids.size)
+            p_docs, p_vals = np.concatenate(p_docs), np.concatenate(p_vals)
+            p_ptr = np.concatenate([[0], np.cumsum(longueurs)]).astype(np.int64)
+
+            # produit creux × creux : chaque case (requête, mot) déroule les
+            # postings du mot, puis les contributions sont sommées par (requête, doc)
+            debut = p_ptr[q_local]
+            nb = p_ptr[q_local + 1] - debut
+            ligne = np.repeat(np.arange(nb.size), nb)
+            pos = np.arange(ligne.size) - np.repeat(np.cumsum(nb) - nb, nb) + debut[ligne]
+
+            cles = q_rows[ligne].astype(np.int64) * self.ndoc + p_docs[pos]
+            contrib = q_vals[ligne] * p_vals[pos]
+            cles, inverse = np.unique(cles, return_inverse=True)
+            scores = np.bincount(inverse, weights=contrib, minlength=cles.size)
+            qis, docs = cles // self.ndoc, cles % self.ndoc
+        m.count("postings", pos.size)
+        m.count("docs_scored", cles.size)
+
+        # phrases / proximité éventuelles
+        garde = scores > 0
+        with m.timer("query.constraints"):
+            for qi, q in enumerate(queries):
+                if q.has_constraints():
+                    dans_q = qis == qi
+                    garde[dans_q] &= in_sorted(docs[dans_q], self.constraint_docs(q))
+        qis, docs, scores = qis[garde], docs[garde], scores[garde]
+
+        # top-k par requête : tri (requête, score décroissant, doc croissant)
+        with m.timer("query.topk"):
+            ordre = np.lexsort((docs, -scores, qis))
+            qis, docs, scores = qis[ordre], docs[ordre], scores[ordre]
+            debut_q = np.searchsorted(qis, np.arange(nb_q))
+            fin_q = np.minimum(np.searchsorted(qis, np.arange(nb_q), side="right"), debut_q + k)
+            return [list(zip(docs[a:b].tolist(), scores[a:b].tolist()))
+                    for a, b in zip(debut_q, fin_q)]
+
+
+    # ----------------- Phrases et proximité ----------------------------
+    def constraint_docs(self, query):
+        # doc_id (triés) qui respectent toutes les phrases / proximités de la
+        # requête, via les positions des mots stockées dans le TokenStore
+        tokens = self.corpus.tokens
+        docs = None
+        for mots in query.phrases:
+            trouves = tokens.phrase_docs(mots)
+            docs = trouves if docs is None else docs[in_sorted(docs, trouves)]
+        for mots, n in query.proximites:
+            trouves = tokens.near_docs(mots, n)
+            docs = trouves if docs is None else docs[in_sorted(docs, trouves)]
+        return docs[docs < self.ndoc]
+
+
+    # ----------------- Filtres -------------------------------------------
+    def filter_docs(self, auteur=None, doc_type=None, date_min=None, date_max=None):
+        # doc_id (triés) qui passent les filtres, None sans filtre ; évalués
+        # sur les colonnes précalculées du DocumentStore (DocumentStore.select)
+        docs = self.corpus.id2doc.select(auteur, doc_type, date_min, date_max)
+        if docs is None:
+            return None
+        return docs[docs < self.ndoc]
+
+    def cache_key(self, q, filtres):
+        if all(v is None for v in filtres):
+            return q.key()
+        return (q.key(), filter_key(filtres))
+
+
+    # ----------------- Couche sémantique (LSA) ---------------------------
+    def build_semantic(self, dim=100, **options):
+        # SVD tronquée de la matrice TF-IDF : vecteurs float32 des documents
+        # (voir Semantic.py), construite à la demande
+        self.semantic = SemanticIndex(self, dim, **options).build()
+        return self.semantic
+
+    def similar_to(self, doc_id, k=5, **filtres):
+        # "more like this" : les k documents les plus proches de doc_id
+        if self.semantic is None:
+            self.build_semantic()
+        return self.semantic.similar_to(doc_id, k, **filtres)
+
+    def search_hybrid(self, query, k=5, alpha=0.5, **filtres):
+        # (1 - alpha) × score lexical + alpha × similarité dans l'espace latent
+        if self.semantic is None:
+            self.build_semantic()
+        return self.semantic.search(query, k, alpha, **filtres)
+
+
+    # ----------------- Résultats -----------------------------------------
+    def build_results(self, top):
+        # DataFrame des résultats à partir d'une liste de (doc_id, score)
         rows = []
         for doc_id, score in top:
             doc = self.corpus.id2doc[doc_id]
@@ -158,4 +869,59 @@ class SearchEngine:
                 "score": score
             })
 
-        return pd.DataFrame(rows)
\ No newline at end of file
+        return pd.DataFrame(rows)
+
+
+    # ----------------- Fonction search (Partie 2 + 3) ------------------
+    def search(self, query, k=5, auteur=None, doc_type=None, date_min=None, date_max=None,
+               collapse=False):
+        """
+        Retourne un DataFrame avec les k documents les plus pertinents :
+        colonnes : doc_id, titre, auteur, date, url, score
+
+        La requête peut contenir des phrases exactes ("middle class"), des
+        contraintes de proximité ("tax cuts"~5 : à moins de 5 mots) et des
+        jokers (comput*, *ology, freedon~ : mots à 1 ou 2 fautes près), voir Query.py.
+
+        Filtres (appliqués pendant le calcul du top-k, pas après) :
+        auteur, doc_type (getType() : "Reddit", "Arxiv"...) : une valeur ou
+        une liste ; date_min / date_max : bornes incluses (datetime, date ou
+        "AAAA-MM-JJ").
+
+        collapse=True : un seul document (le mieux classé) par groupe de
+        quasi-doublons, si le corpus les détecte (Corpus.detect_duplicates).
+        """
+        m = self.metrics
+        m.count("queries")
+        with m.timer("query.analyze"):
+            q = Query(query)
+        filtres = (auteur, doc_type, date_min, date_max)
+        collapse = collapse and self.corpus.duplicates is not None
+        cle = self.cache_key(q, filtres)
+        if collapse:
+            cle = ("collapse", cle)
+        with self.lock:
+            self.refresh()
+            top = self.cache.get(cle, k, self.generation)
+            if top is None:
+                m.count("cache.misses")
+                n = self.cache.size(k)
+                with m.timer("query.vector"):
+                    q_ids, q_weights = self.build_query_vector(q)
+                with m.timer("query.filters"):
+                    allowed = self.filter_docs(*filtres)
+                if q.has_constraints():
+                    with m.timer("query.constraints"):
+                        trouves = self.constraint_docs(q)
+                        allowed = trouves if allowed is None else trouves[in_sorted(trouves, allowed)]
+                with m.timer("query.topk"):
+                    if collapse:
+                        top = self.top_k_collapsed(q_ids, q_weights, n, allowed)
+                    else:
+                        top = self.top_k(q_ids, q_weights, n, allowed)
+                self.cache.put(cle, n, self.generation, top)
+                top = top[:k]
+            else:
+                m.count("cache.hits")
+        with m.timer("query.results"):
+            return self.build_results(top)
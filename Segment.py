@@ -0,0 +1,63 @@
+# Segment.py
+# Small in-memory index segment used for incremental indexing.
+# Documents added to the Corpus after its SearchEngine was built go into a
+# Segment instead of forcing a full rebuild. Segments hold consecutive doc
+# ids, right after the main (merged) index, and are merged into it in the
+# background once they grow large enough (LSM-style).
+
+import numpy as np
+from SparseMatrix import SparseMatrix
+
+
+class Segment:
+    def __init__(self, first_doc):
+        self.first_doc = first_doc   # global id of the segment's first document
+        self.rows = []               # (sorted term ids, tf) for every document
+        self.frozen = False          # frozen segments are being merged, no more adds
+        self._forward = None
+        self._inverted = None
+
+    @property
+    def ndoc(self):
+        return len(self.rows)
+
+    def add(self, term_ids, tf):
+        self.rows.append((np.asarray(term_ids, dtype=np.int32), np.asarray(tf, dtype=np.int32)))
+        self._forward = None
+        self._inverted = None
+
+    def forward(self, n_terms):
+        # docs × terms TF matrix of the segment (local row ids)
+        if self._forward is None or self._forward.shape[1] != n_terms:
+            lengths = [ids.size for ids, _ in self.rows]
+            indptr = np.zeros(len(self.rows) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=indptr[1:])
+            indices = np.concatenate([ids for ids, _ in self.rows]) if self.rows else []
+            data = np.concatenate([tf for _, tf in self.rows]) if self.rows else []
+            self._forward = SparseMatrix(indptr, indices, np.asarray(data, dtype=np.int32),
+                                         (len(self.rows), n_terms))
+        return self._forward
+
+    def inverted(self, n_terms):
+        # terms × docs postings of the segment, with global doc ids
+        if self._inverted is None or self._inverted.shape[0] != n_terms:
+            inv = self.forward(n_terms).transpose()
+            self._inverted = SparseMatrix(inv.indptr, inv.indices + self.first_doc, inv.data,
+                                          (n_terms, self.first_doc + self.ndoc))
+        return self._inverted
+
+
+def merge_rows(base, forwards, n_terms):
+    # Stack the TF matrix of the main index and the segments' TF matrices
+    # (in doc id order) into a single CSR matrix with n_terms columns.
+    mats = [base] + list(forwards)
+    indptr = [base.indptr]
+    offset = base.indptr[-1]
+    for m in forwards:
+        indptr.append(m.indptr[1:] + offset)
+        offset += m.indptr[-1]
+
+    return SparseMatrix(np.concatenate(indptr),
+                        np.concatenate([m.indices for m in mats]),
+                        np.concatenate([m.data for m in mats]).astype(np.int32),
+                        (sum(m.shape[0] for m in mats), n_terms))
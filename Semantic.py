@@ -0,0 +1,197 @@
+# Semantic.py
+# Latent semantic layer of the SearchEngine (LSA).
+# A truncated SVD of the normalised TF-IDF matrix (docs × terms), computed
+# on CPU with a randomized range finder (Halko et al.): only sparse × dense
+# products and small dense decompositions, never a dense docs × terms matrix.
+#     A ≈ U S Vt   →   document vectors U S = A V, term vectors V
+# Documents are stored as unit-length float32 vectors, so similarities are a
+# single matrix × vector product. Queries and documents added after the SVD
+# are folded in through the term vectors (words unknown to the SVD are
+# ignored); build() again for a fresh decomposition.
+#
+#     sem = SemanticIndex(engine, dim=100).build()
+#     sem.similar_to(42, k=5)                      # "more like this"
+#     sem.search("tax cuts", k=5, alpha=0.5)       # lexical + semantic
+#     sem.save("corpus.lsa"); SemanticIndex.open("corpus.lsa", engine)   # mmap
+
+import heapq
+import numpy as np
+from SparseMatrix import SparseMatrix
+from Segment import merge_rows
+from Query import Query
+from Scorer import CosineScorer
+import IndexStore
+
+
+TFIDF = CosineScorer()      # query weights of the latent space (TF × IDF)
+
+
+class SemanticIndex:
+    def __init__(self, engine, dim=100, oversample=10, n_iter=2, seed=0):
+        self.engine = engine
+        self.dim = dim                   # number of latent dimensions
+        self.oversample = oversample     # extra random directions of the range finder
+        self.n_iter = n_iter             # power iterations (better accuracy on flat spectra)
+        self.seed = seed
+        self.doc_vectors = None          # ndoc × dim, float32, unit rows
+        self.term_vectors = None         # nterms × dim, float32 (V)
+        self.singular_values = None
+
+    # ---------------------- construction ----------------------
+    def build(self):
+        engine = self.engine
+        with engine.lock:
+            engine.refresh()
+            A = self.weights(0)
+        AT = A.transpose()
+        dim = max(1, min(self.dim, A.shape[0], A.shape[1]))
+        l = min(dim + self.oversample, A.shape[0], A.shape[1])
+
+        # orthonormal basis Q of the range of A (randomized, with power
+        # iterations); sparse products in float32, orthonormalisation in float64
+        rng = np.random.default_rng(self.seed)
+        Q = orthonormal(A.matmul(rng.standard_normal((A.shape[1], l)).astype(np.float32)))
+        for _ in range(self.n_iter):
+            Z = orthonormal(AT.matmul(Q.astype(np.float32)))
+            Q = orthonormal(A.matmul(Z.astype(np.float32)))
+
+        # SVD of the small l × nterms matrix B = Qt A
+        B = AT.matmul(Q.astype(np.float32)).T.astype(np.float64)
+        Ub, S, Vt = np.linalg.svd(B, full_matrices=False)
+        self.singular_values = S[:dim]
+        self.term_vectors = np.ascontiguousarray(Vt[:dim].T, dtype=np.float32)
+        self.doc_vectors = unit_rows((Q @ Ub[:, :dim]) * S[:dim])
+        return self
+
+    def weights(self, debut):
+        # normalised TF-IDF rows (cosine weights) of the documents debut..ndoc-1
+        engine = self.engine
+        nb_mots = len(engine.vocab)
+        tf = merge_rows(engine.mat_TF, [seg.forward(nb_mots) for seg in engine.segments], nb_mots)
+        tf = tf.rows(debut, tf.shape[0])
+        norms = engine.doc_norms[debut + tf.row_ids()]
+        data = np.divide(tf.data * engine.idf[tf.indices], norms, out=np.zeros(norms.size),
+                         where=norms > 0)
+        return SparseMatrix(tf.indptr, tf.indices, data.astype(np.float32), tf.shape)
+
+    def update(self):
+        # fold in the documents added since the SVD (call with engine.lock held)
+        engine = self.engine
+        engine.refresh()
+        n = self.doc_vectors.shape[0]
+        if n >= engine.ndoc:
+            return
+        A = self.weights(n)
+        known = A.indices < self.term_vectors.shape[0]
+        A = SparseMatrix(A.indptr, np.where(known, A.indices, 0), np.where(known, A.data, 0),
+                         (A.shape[0], self.term_vectors.shape[0]))
+        self.doc_vectors = np.concatenate([self.doc_vectors, unit_rows(A.matmul(self.term_vectors))])
+
+    def query_vector(self, q_ids, q_weights):
+        # unit latent vector of a query (ids, weights from build_query_vector)
+        q_ids = np.asarray(q_ids, dtype=np.int64)
+        known = q_ids < self.term_vectors.shape[0]
+        v = np.asarray(q_weights, dtype=np.float32)[known] @ self.term_vectors[q_ids[known]]
+        norm = np.linalg.norm(v)
+        return v / norm if norm > 0 else v
+
+    # ---------------------- requêtes ----------------------
+    def similar_to(self, doc_id, k=5, **filtres):
+        # DataFrame of the k documents closest to doc_id (itself excluded);
+        # filtres: auteur / doc_type / date_min / date_max, see SearchEngine.search
+        engine = self.engine
+        with engine.lock:
+            self.update()
+            scores = self.doc_vectors @ self.doc_vectors[doc_id]
+            scores[doc_id] = -np.inf
+            top = top_k_dense(scores, k, engine.filter_docs(**filtres))
+        return engine.build_results(top)
+
+    def search(self, query, k=5, alpha=0.5, **filtres):
+        # Hybrid ranking: (1 - alpha) × lexical + alpha × semantic score.
+        # Lexical scores come from the engine's scorer, rescaled to [0, 1];
+        # semantic scores are cosines in the latent space. alpha=1 finds
+        # documents sharing no word with the query. Phrases / proximity
+        # constraints and filters restrict the candidates as in search().
+        engine = self.engine
+        q = Query(query)
+        with engine.lock:
+            self.update()
+            q_ids, q_weights = engine.build_query_vector(q)
+            scores = np.zeros(engine.ndoc, dtype=np.float32)
+            if alpha > 0 and len(q_ids):
+                q_tfidf = engine.build_query_vector(q, TFIDF)[1]
+                scores += alpha * (self.doc_vectors @ self.query_vector(q_ids, q_tfidf))
+            if alpha < 1 and len(q_ids):
+                docs, lex = engine.score_documents(q_ids, q_weights)
+                if lex.size and lex.max() > 0:
+                    scores[docs] += (1 - alpha) * lex / lex.max()
+
+            allowed = engine.filter_docs(**filtres)
+            if q.has_constraints():
+                trouves = engine.constraint_docs(q)
+                allowed = trouves if allowed is None else np.intersect1d(allowed, trouves)
+            top = top_k_dense(scores, k, allowed)
+        return engine.build_results([(d, s) for d, s in top if s > 0])
+
+    # ---------------------- sauvegarde ----------------------
+    def save(self, dossier, source=None):
+        with self.engine.lock:
+            self.update()
+        arrays = {"doc_vectors": self.doc_vectors, "term_vectors": self.term_vectors,
+                  "singular_values": self.singular_values}
+        meta = {"ndoc": int(self.doc_vectors.shape[0]), "nterms": int(self.term_vectors.shape[0]),
+                "dim": int(self.term_vectors.shape[1])}
+        IndexStore.save_index(dossier, arrays, meta, source)
+
+    @classmethod
+    def open(cls, dossier, engine, source=None):
+        # reopen saved vectors, memory-mapped (read-only until documents are added)
+        arrays, meta = IndexStore.load_index(dossier, source)
+        if meta["ndoc"] > engine.ndoc:
+            raise ValueError(f"{dossier} has {meta['ndoc']} documents, the index has {engine.ndoc}")
+        sem = cls(engine, dim=meta["dim"])
+        sem.doc_vectors = arrays["doc_vectors"]
+        sem.term_vectors = arrays["term_vectors"]
+        sem.singular_values = arrays["singular_values"]
+        return sem
+
+
+def orthonormal(Y):
+    # orthonormal basis of the columns of a tall matrix: Cholesky QR, done
+    # twice for accuracy (a few small products instead of a Householder QR);
+    # rank-deficient inputs fall back to np.linalg.qr
+    Y = np.asarray(Y, dtype=np.float64)
+    for _ in range(2):
+        try:
+            L = np.linalg.cholesky(Y.T @ Y)
+        except np.linalg.LinAlgError:
+            return np.linalg.qr(Y)[0]
+        Y = Y @ np.linalg.inv(L).T
+    return Y
+
+
+def unit_rows(M):
+    # rows scaled to unit length (zero rows stay zero), as float32
+    M = np.asarray(M, dtype=np.float32)
+    norms = np.linalg.norm(M, axis=1, keepdims=True)
+    return np.divide(M, norms, out=np.zeros_like(M), where=norms > 0)
+
+
+def top_k_dense(scores, k, allowed=None):
+    # k best (doc_id, score) of a dense score vector: score desc, doc_id asc
+    if allowed is not None:
+        ids = np.asarray(allowed, dtype=np.int64)
+        scores = scores[ids]
+    else:
+        ids = np.arange(scores.size)
+    garde = np.isfinite(scores)
+    ids, scores = ids[garde], scores[garde]
+    if k <= 0 or ids.size == 0:
+        return []
+    if ids.size > k:
+        seuil = scores[np.argpartition(scores, ids.size - k)[ids.size - k]]
+        garde = scores >= seuil
+        ids, scores = ids[garde], scores[garde]
+    meilleurs = heapq.nlargest(k, zip(scores.tolist(), (-ids).tolist()))
+    return [(-neg_id, score) for score, neg_id in meilleurs]
@@ -0,0 +1,228 @@
+# ShardedSearch.py
+# Sharded (scatter-gather) search across several worker processes.
+# The corpus is partitioned into N shards, each one held by its own local
+# process with its own Corpus, TokenStore and SearchEngine, so the corpus is
+# no longer capped by one interpreter's memory and one core's throughput.
+#
+# The coordinator keeps no documents, only the global statistics: the
+# document frequencies of every shard are summed into a global IDF which is
+# pushed back to the shards (SearchEngine.use_global_IDF), and the query
+# vector and its norm are computed once with it. Every shard then returns its
+# own top-k (MaxScore, SearchEngine.top_k) with global doc ids, and the lists
+# are merged: the result is the same as a single SearchEngine on the whole
+# corpus (score desc, doc_id asc). Wildcard and fuzzy terms (comput*,
+# freedon~) are expanded by the coordinator over the merged vocabulary of the
+# shards (a TermDictionary with the global document frequencies).
+#
+# Everything runs on one machine (multiprocessing + pipes):
+#     with ShardedSearch(4) as shards:
+#         shards.load("corpus.csv")
+#         print(shards.search("tax cuts", k=5))
+
+from collections import Counter
+import heapq
+import math
+import multiprocessing
+import threading
+import numpy as np
+import pandas as pd
+import loaders
+from Query import Query
+from TermDictionary import TermDictionary
+
+
+def shard_worker(conn, nom):
+    # Main loop of a shard process: (command, *args) → ("ok", result) / ("error", message)
+    import Corpus
+    from SearchEngine import SearchEngine
+
+    Corpus.Corpus._instance = None       # forked from the coordinator: start a fresh singleton
+    corpus = Corpus.Corpus(nom)
+    global_ids = []                      # local doc id → global doc id
+    state = {"engine": None, "sent": 0}
+
+    def engine():
+        if state["engine"] is None:
+            state["engine"] = SearchEngine(corpus)
+        return state["engine"]
+
+    def add(ids, docs):
+        global_ids.extend(ids)
+        corpus.add_documents(docs)
+
+    def stats():
+        # new words since the last call, df and occurrences of every word,
+        # number of documents
+        e = engine()
+        e.refresh()
+        terms = corpus.tokens.terms[state["sent"]:len(e.vocab)]
+        state["sent"] += len(terms)
+        return terms, np.asarray(e.doc_occ), np.asarray(e.total_occ), e.ndoc
+
+    def search(mots, weights, q_norm, texte, k):
+        e = engine()
+        with e.lock:
+            e.refresh()
+            ids, w = [], []
+            for mot, poids in zip(mots, weights):
+                j = e.vocab.id_of(mot)
+                if j >= 0:
+                    ids.append(j)
+                    w.append(poids)
+            ordre = np.argsort(ids)
+            q = Query(texte)
+            allowed = e.constraint_docs(q) if q.has_constraints() else None
+            top = e.top_k(np.array(ids, dtype=np.int32)[ordre], np.array(w, dtype=np.float64)[ordre],
+                          k, allowed, q_norm)
+
+        rows = []
+        for doc_id, score in top:
+            doc = corpus.id2doc[doc_id]
+            rows.append((global_ids[doc_id], score, doc.titre, doc.auteur, doc.date, doc.url))
+        return rows
+
+    commands = {"add": add, "stats": stats, "idf": lambda idf: engine().use_global_IDF(idf),
+                "search": search}
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message[0] == "close":
+            conn.send(("ok", None))
+            break
+        try:
+            conn.send(("ok", commands[message[0]](*message[1:])))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+    conn.close()
+
+
+class ShardedSearch:
+    def __init__(self, n_shards=2, start_method=None):
+        ctx = multiprocessing.get_context(start_method)
+        self.conns = []
+        self.processes = []
+        for s in range(n_shards):
+            parent, child = ctx.Pipe()
+            p = ctx.Process(target=shard_worker, args=(child, f"shard {s}"), daemon=True)
+            p.start()
+            child.close()
+            self.conns.append(parent)
+            self.processes.append(p)
+
+        self.ndoc = 0                                   # documents across all shards
+        self.shard_terms = [[] for _ in range(n_shards)]  # local term id → word, per shard
+        self.idf = {}                                   # word → global IDF
+        self.vocab = TermDictionary()                   # all the words (wildcard / fuzzy terms)
+        self.stale = False                              # global IDF to recompute
+        self.next_shard = 0
+        self.lock = threading.Lock()
+
+    @property
+    def n_shards(self):
+        return len(self.conns)
+
+    # ---------------------- communication ----------------------
+    def call(self, shards, *message):
+        # Send message to the given shards (all at once), then collect the replies
+        for s in shards:
+            self.conns[s].send(message)
+        replies = [self.conns[s].recv() for s in shards]
+        for status, result in replies:
+            if status == "error":
+                raise RuntimeError(f"Shard error: {result}")
+        return [result for _, result in replies]
+
+    # ---------------------- ajout ----------------------
+    def add_documents(self, docs):
+        # A batch of documents goes to one shard (round-robin); global doc ids
+        # follow the order of addition, as in Corpus.add_document
+        docs = list(docs)
+        if not docs:
+            return
+        with self.lock:
+            ids = list(range(self.ndoc, self.ndoc + len(docs)))
+            self.call([self.next_shard], "add", ids, docs)
+            self.next_shard = (self.next_shard + 1) % self.n_shards
+            self.ndoc += len(docs)
+            self.stale = True
+
+    def load(self, chemin="corpus.csv", chunksize=10000, sep=None):
+        # Stream a corpus CSV into the shards, one chunk per shard in turn
+        for docs in loaders.iter_documents(chemin, chunksize, sep):
+            self.add_documents(docs)
+
+    # ---------------------- statistiques globales ----------------------
+    def sync(self):
+        # Global IDF: sum of the shards' document frequencies, sent back to every shard
+        with self.lock:
+            if not self.stale:
+                return
+            shards = range(self.n_shards)
+            stats = self.call(shards, "stats")
+
+            df, occ = Counter(), Counter()
+            for s, (terms, doc_occ, total_occ, _) in zip(shards, stats):
+                self.shard_terms[s].extend(terms)
+                df.update(dict(zip(self.shard_terms[s], doc_occ.tolist())))
+                occ.update(dict(zip(self.shard_terms[s], total_occ.tolist())))
+            N = sum(n for _, _, _, n in stats)
+            nouveaux = dict.fromkeys(mot for terms, _, _, _ in stats for mot in terms)
+            self.vocab.extend([mot for mot in nouveaux if mot not in self.vocab])
+            mots = self.vocab.terms()
+            self.vocab.set_stats(np.array([occ[mot] for mot in mots], dtype=np.int64),
+                                 np.array([df[mot] for mot in mots], dtype=np.int64))
+            self.idf = {mot: math.log(N / d) for mot, d in df.items() if d > 0}
+
+            for s in shards:
+                self.conns[s].send(("idf", np.array([self.idf.get(mot, 0.0)
+                                                     for mot in self.shard_terms[s]])))
+            for s in shards:
+                status, result = self.conns[s].recv()
+                if status == "error":
+                    raise RuntimeError(f"Shard error: {result}")
+            self.stale = False
+
+    # ---------------------- recherche ----------------------
+    def search(self, query, k=5):
+        # Same result as SearchEngine.search on the whole corpus
+        self.sync()
+        q = Query(query)
+        freq = Counter(q.mots)
+        for j, c in self.vocab.expand(q.jokers):
+            freq[self.vocab.term(j)] += c
+        mots = [mot for mot in freq if mot in self.idf]
+        weights = [freq[mot] * self.idf[mot] for mot in mots]
+        q_norm = math.sqrt(sum(w * w for w in weights))
+
+        top = []
+        if q_norm > 0 and k > 0:
+            with self.lock:
+                hits = self.call(range(self.n_shards), "search", mots, weights, q_norm, q.texte, k)
+            top = heapq.nlargest(k, (h for shard in hits for h in shard),
+                                 key=lambda h: (h[1], -h[0]))
+
+        return pd.DataFrame([{"doc_id": doc_id, "titre": titre, "auteur": auteur,
+                              "date": date, "url": url, "score": score}
+                             for doc_id, score, titre, auteur, date, url in top])
+
+    # ---------------------- arrêt ----------------------
+    def close(self):
+        for conn, p in zip(self.conns, self.processes):
+            if p.is_alive():
+                try:
+                    conn.send(("close",))
+                    conn.recv()
+                except (EOFError, OSError):
+                    pass
+            conn.close()
+            p.join(timeout=5)
+        self.conns, self.processes = [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,100 @@
+# SparseMatrix.py
+# Minimal CSR (Compressed Sparse Row) matrix backed by NumPy arrays.
+# The search engine stores its TF and TF-IDF matrices in this format so that
+# memory and build time grow with the number of tokens, not docs × vocabulary.
+#
+# Row i is described by indices[indptr[i]:indptr[i+1]] (column ids, sorted)
+# and data[indptr[i]:indptr[i+1]] (the matching non-zero values).
+
+import numpy as np
+
+
+class SparseMatrix:
+    def __init__(self, indptr, indices, data, shape):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.data = np.asarray(data)
+        self.shape = tuple(shape)
+
+    @classmethod
+    def from_coo(cls, rows, cols, data, shape):
+        # Build a CSR matrix from (row, col, value) triplets.
+        # Duplicate (row, col) pairs are summed.
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        data = np.asarray(data)
+        n_rows, n_cols = shape
+
+        if rows.size:
+            keys = rows * n_cols + cols
+            uniq, inverse = np.unique(keys, return_inverse=True)
+            data = np.bincount(inverse, weights=data, minlength=uniq.size).astype(data.dtype)
+            rows = uniq // n_cols
+            cols = uniq % n_cols
+
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+        return cls(indptr, cols, data, shape)
+
+    # ---------------------- accès ----------------------
+    @property
+    def nnz(self):
+        return int(self.indices.size)
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes + self.data.nbytes
+
+    def row(self, i):
+        # (column ids, values) of row i
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def row_ids(self):
+        # Row id of every stored value (same length as indices / data)
+        return np.repeat(np.arange(self.shape[0], dtype=np.int32), np.diff(self.indptr))
+
+    def row_lengths(self):
+        return np.diff(self.indptr)
+
+    def __len__(self):
+        return self.shape[0]
+
+    # ---------------------- opérations ----------------------
+    def with_data(self, data):
+        # Same sparsity pattern, new values
+        return SparseMatrix(self.indptr, self.indices, data, self.shape)
+
+    def matmul(self, dense, block=1 << 22):
+        # Matrix × dense matrix. Rows are processed in slices of about
+        # block / dense.shape[1] stored values, so memory stays bounded.
+        dense = np.asarray(dense)
+        n_rows, width = self.shape[0], dense.shape[1]
+        out = np.zeros((n_rows, width), dtype=np.result_type(self.data, dense))
+        pas = max(1, block // max(width, 1))
+        debut = 0
+        while debut < n_rows:
+            fin = int(np.searchsorted(self.indptr, self.indptr[debut] + pas, side="right")) - 1
+            fin = min(max(fin, debut + 1), n_rows)
+            s, e = self.indptr[debut], self.indptr[fin]
+            if e > s:
+                contrib = self.data[s:e, None] * dense[self.indices[s:e]]
+                non_vides = np.flatnonzero(np.diff(self.indptr[debut:fin + 1]))
+                out[debut + non_vides] = np.add.reduceat(contrib, self.indptr[debut + non_vides] - s)
+            debut = fin
+        return out
+
+    def rows(self, debut, fin):
+        # CSR of rows debut..fin-1
+        s, e = self.indptr[debut], self.indptr[fin]
+        return SparseMatrix(self.indptr[debut:fin + 1] - s, self.indices[s:e], self.data[s:e],
+                            (fin - debut, self.shape[1]))
+
+    def transpose(self):
+        # CSR of the transposed matrix (i.e. the CSC view of this one).
+        # The stable sort keeps row ids sorted inside every new row.
+        order = np.argsort(self.indices, kind="stable")
+        indptr = np.zeros(self.shape[1] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=self.shape[1]), out=indptr[1:])
+        return SparseMatrix(indptr, self.row_ids()[order], self.data[order],
+                            (self.shape[1], self.shape[0]))
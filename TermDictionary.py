@@ -0,0 +1,313 @@
+# TermDictionary.py
+# Compact term dictionary of the SearchEngine (formerly a dict of per-term
+# dicts). Terms are kept sorted and front coded: by blocks of `block` terms,
+# the first term of a block is stored whole and every next one as (length of
+# the prefix shared with the previous term, remaining bytes), all in one
+# UTF-8 byte string. Term ids (order of first appearance, as in TokenStore)
+# map to sorted positions through two int32 arrays, and the statistics
+# (doc_occ, total_occ) are parallel integer arrays indexed by term id.
+#
+# A lookup is a binary search over the block heads plus the decoding of one
+# block. The terms starting with a prefix are a range of sorted positions, so
+# completions ranked by document frequency are a partial selection over that
+# range. Terms added after construction (incremental indexing) wait in a
+# small unsorted tail until the next compaction.
+# Wildcard (comput*) and fuzzy (freedon~) terms go through a character n-gram
+# index of the terms (NgramIndex.py), built on first use; their expansions
+# are capped to the terms found in the most documents.
+#
+#     vocab = TermDictionary(corpus.tokens.terms)
+#     vocab.id_of("america")        # term id, -1 if unknown
+#     vocab["america"]              # {"id": ..., "total_occ": ..., "doc_occ": ...}
+#     vocab.complete("amer", 5)     # [("america", 812), ("american", 301), ...]
+#     vocab.wildcard("*ology")      # term ids
+#     vocab.fuzzy("freedon", 1)     # [(term id, edits)]
+#     vocab.expand(Query("comput* freedon~").jokers)   # [(term id, count)]
+
+from array import array
+import bisect
+import numpy as np
+from NgramIndex import NgramIndex
+
+
+BLOCK = 16            # terms per front-coded block
+PREFIX_WIDTH = 32     # bytes compared at once when computing shared prefixes
+TAIL = 1024           # unsorted new terms kept before a compaction
+MAX_EXPANSIONS = 50   # terms a wildcard / fuzzy term expands to
+
+
+class TermDictionary:
+    def __init__(self, terms=(), block=BLOCK):
+        self.block = block
+        self.doc_occ = np.zeros(0, dtype=np.int64)      # term id → number of documents
+        self.total_occ = np.zeros(0, dtype=np.int64)    # term id → number of occurrences
+        self._ngrams = None                              # NgramIndex of the terms (jokers)
+        self._build(list(terms))
+
+    def _build(self, terms):
+        # sort and front-code all the terms (ids = positions in terms)
+        n = len(terms)
+        encodes = [t.encode("utf-8") for t in terms]
+        ordre = sorted(range(n), key=encodes.__getitem__)
+        tri = [encodes[j] for j in ordre]
+
+        self.sorted_ids = np.array(ordre, dtype=np.int32)      # sorted position → term id
+        self.ranks = np.empty(n, dtype=np.int32)                # term id → sorted position
+        self.ranks[self.sorted_ids] = np.arange(n, dtype=np.int32)
+
+        # prefix shared with the previous term: first PREFIX_WIDTH bytes
+        # compared at once, the (rare) longer prefixes byte by byte
+        lcp = np.zeros(n, dtype=np.int64)
+        if n > 1:
+            octets = np.array(tri, dtype=f"S{PREFIX_WIDTH}").view(np.uint8).reshape(n, PREFIX_WIDTH)
+            diff = octets[1:] != octets[:-1]
+            lcp[1:] = np.where(diff.any(axis=1), diff.argmax(axis=1), PREFIX_WIDTH)
+            for p in np.flatnonzero(lcp == PREFIX_WIDTH).tolist():
+                a, b = tri[p - 1], tri[p]
+                l = PREFIX_WIDTH
+                while l < min(len(a), len(b)) and a[l] == b[l]:
+                    l += 1
+                lcp[p] = l
+        lcp[::self.block] = 0                                   # block heads are whole
+        lcp = np.minimum(lcp, 0xFFFF)
+
+        self._lcp = array("H", lcp.tolist())
+        self._blob = b"".join(t[l:] for t, l in zip(tri, lcp.tolist()))
+        longueurs = np.fromiter(map(len, tri), dtype=np.int64, count=n) - lcp
+        self._starts = array("I", np.concatenate([[0], np.cumsum(longueurs)]).tolist())
+        self._heads = tri[::self.block]    # first term of every block (binary search)
+        self._n = n
+        self._tail = []            # terms added since the last compaction (ids _n...)
+        self._tail_ids = {}        # word → id of these terms
+
+    # ---------------------- sauvegarde ----------------------
+    def arrays(self):
+        # front-coded arrays of the dictionary (after a compaction), saved
+        # with the index (SearchEngine.save) and reopened by from_arrays
+        self.compact()
+        return {"dict_lcp": np.frombuffer(self._lcp, dtype=np.uint16),
+                "dict_blob": np.frombuffer(self._blob, dtype=np.uint8),
+                "dict_starts": np.frombuffer(self._starts, dtype=np.uint32),
+                "dict_sorted_ids": self.sorted_ids,
+                "dict_ranks": self.ranks}
+
+    @classmethod
+    def from_arrays(cls, arrays, block=BLOCK):
+        # dictionary of saved arrays: copied as they are, nothing re-sorted;
+        # only the block heads (one term in `block`) are sliced out
+        d = cls.__new__(cls)
+        d.block = block
+        d.doc_occ = np.zeros(0, dtype=np.int64)
+        d.total_occ = np.zeros(0, dtype=np.int64)
+        d._ngrams = None
+        d.sorted_ids = np.asarray(arrays["dict_sorted_ids"], dtype=np.int32)
+        d.ranks = np.asarray(arrays["dict_ranks"], dtype=np.int32)
+        d._lcp = array("H", np.asarray(arrays["dict_lcp"], dtype=np.uint16).tobytes())
+        d._blob = np.asarray(arrays["dict_blob"], dtype=np.uint8).tobytes()
+        d._starts = array("I", np.asarray(arrays["dict_starts"], dtype=np.uint32).tobytes())
+        d._n = d.sorted_ids.size
+        d._heads = [d._blob[d._starts[p]:d._starts[p + 1]] for p in range(0, d._n, block)]
+        d._tail = []
+        d._tail_ids = {}
+        return d
+
+    # ---------------------- décodage ----------------------
+    def _decode(self, b, fin=None):
+        # terms (bytes) of block b, in sorted order (up to position fin excluded)
+        debut = b * self.block
+        fin = min(debut + self.block, self._n) if fin is None else fin
+        lcp, starts, blob = self._lcp, self._starts, self._blob
+        mots, prec = [], b""
+        for p in range(debut, fin):
+            prec = prec[:lcp[p]] + blob[starts[p]:starts[p + 1]]
+            mots.append(prec)
+        return mots
+
+    def _at(self, p):
+        # term (bytes) at sorted position p
+        return self._decode(p // self.block, p + 1)[-1]
+
+    def _lower_bound(self, cle):
+        # first sorted position whose term is >= cle (bytes), and that term
+        b = bisect.bisect_right(self._heads, cle) - 1
+        if b < 0:
+            return 0, self._heads[0] if self._heads else None
+        bloc = self._decode(b)
+        i = bisect.bisect_left(bloc, cle)
+        if i < len(bloc):
+            return b * self.block + i, bloc[i]
+        suivant = self._heads[b + 1] if b + 1 < len(self._heads) else None
+        return b * self.block + i, suivant
+
+    # ---------------------- accès ----------------------
+    def __len__(self):
+        return self._n + len(self._tail)
+
+    def __contains__(self, mot):
+        return self.id_of(mot) >= 0
+
+    def __iter__(self):
+        return iter(self.terms())
+
+    def id_of(self, mot):
+        # term id of a word, -1 if unknown
+        cle = mot.encode("utf-8")
+        p, trouve = self._lower_bound(cle)
+        if trouve == cle:
+            return int(self.sorted_ids[p])
+        return self._tail_ids.get(mot, -1)
+
+    def __getitem__(self, mot):
+        # {"id", "total_occ", "doc_occ"} of a word (KeyError if unknown)
+        j = self.id_of(mot)
+        if j < 0:
+            raise KeyError(mot)
+        return {"id": j, "total_occ": self.stat(self.total_occ, j), "doc_occ": self.stat(self.doc_occ, j)}
+
+    def get(self, mot, default=None):
+        try:
+            return self[mot]
+        except KeyError:
+            return default
+
+    def items(self):
+        # (word, {"id", "total_occ", "doc_occ"}) of every term, in id order
+        for j, mot in enumerate(self.terms()):
+            yield mot, {"id": j, "total_occ": self.stat(self.total_occ, j),
+                        "doc_occ": self.stat(self.doc_occ, j)}
+
+    def term(self, j):
+        # word of a term id
+        if j >= self._n:
+            return self._tail[j - self._n]
+        return self._at(int(self.ranks[j])).decode("utf-8")
+
+    def terms(self):
+        # all the words, in id order
+        tries = [t.decode("utf-8") for b in range(-(-self._n // self.block)) for t in self._decode(b)]
+        mots = [None] * self._n
+        for j, mot in zip(self.sorted_ids.tolist(), tries):
+            mots[j] = mot
+        return mots + self._tail
+
+    @staticmethod
+    def stat(valeurs, j):
+        return int(valeurs[j]) if j < len(valeurs) else 0
+
+    def doc_freqs(self, ids):
+        # doc_occ of an array of term ids (0 before the first set_stats)
+        df = np.zeros(len(ids), dtype=np.int64)
+        connus = ids < len(self.doc_occ)
+        df[connus] = self.doc_occ[ids[connus]]
+        return df
+
+    # ---------------------- ajout ----------------------
+    def extend(self, mots):
+        # new words (not in the dictionary yet), ids given in order
+        for mot in mots:
+            self._tail_ids[mot] = len(self)
+            self._tail.append(mot)
+        if len(self._tail) > max(TAIL, self._n // 8):
+            self.compact()
+
+    def compact(self):
+        # merge the tail into the sorted, front-coded terms
+        if self._tail:
+            self._build(self.terms())
+
+    def set_stats(self, total_occ, doc_occ):
+        self.total_occ = total_occ
+        self.doc_occ = doc_occ
+
+    # ---------------------- préfixes ----------------------
+    def prefix_range(self, prefix):
+        # sorted positions [lo, hi) of the terms starting with prefix
+        cle = prefix.encode("utf-8")
+        # 0xFF never occurs in UTF-8: every term starting with cle is < cle + 0xFF
+        return self._lower_bound(cle)[0], self._lower_bound(cle + b"\xff")[0]
+
+    def prefix(self, prefix):
+        # words starting with prefix, in alphabetical order
+        lo, hi = self.prefix_range(prefix)
+        for b in range(lo // self.block, -(-hi // self.block)):
+            debut = b * self.block
+            for p, t in enumerate(self._decode(b), debut):
+                if lo <= p < hi:
+                    yield t.decode("utf-8")
+        yield from sorted(t for t in self._tail if t.startswith(prefix))
+
+    def complete(self, prefix, n=10):
+        # the n words starting with prefix found in the most documents:
+        # [(word, doc_occ)], by doc_occ descending, then alphabetical
+        lo, hi = self.prefix_range(prefix)
+        positions = np.arange(lo, hi)
+        ids = self.sorted_ids[lo:hi]
+        df = self.doc_freqs(ids)
+
+        if ids.size > n > 0:
+            seuil = df[np.argpartition(df, ids.size - n)[ids.size - n]]
+            garde = df >= seuil
+            positions, df = positions[garde], df[garde]
+        ordre = np.lexsort((positions, -df))[:max(n, 0)]
+        resultats = [(self._at(p).decode("utf-8"), d) for p, d in
+                     zip(positions[ordre].tolist(), df[ordre].tolist())]
+
+        # new words of the tail, merged in
+        for t in self._tail:
+            if t.startswith(prefix):
+                resultats.append((t, self.stat(self.doc_occ, self._tail_ids[t])))
+        if len(resultats) > ordre.size:
+            resultats.sort(key=lambda r: (-r[1], r[0]))
+        return resultats[:max(n, 0)]
+
+    # ---------------------- jokers ----------------------
+    def ngrams(self):
+        # n-gram index of the terms; rebuilt once TAIL terms were added since
+        # (the newer ones go through a small index of their own, see _recent)
+        if self._ngrams is None or len(self) - self._ngrams.nterms > TAIL:
+            self._ngrams = NgramIndex(self.terms())
+        return self._ngrams
+
+    def _recent(self, ix):
+        # n-gram index of the terms added after ix (ids ix.nterms...)
+        return NgramIndex([self.term(j) for j in range(ix.nterms, len(self))])
+
+    def wildcard(self, motif, limit=MAX_EXPANSIONS):
+        # ids of the terms matching a pattern ("*": any characters), at most
+        # limit of them: the ones found in the most documents
+        prefixe = motif.rstrip("*")
+        if "*" not in prefixe:
+            # comput*: a range of sorted positions (+ the tail)
+            lo, hi = self.prefix_range(prefixe)
+            ids = np.concatenate([self.sorted_ids[lo:hi],
+                                  np.array([self._tail_ids[t] for t in self._tail if t.startswith(prefixe)],
+                                           dtype=np.int32)])
+        else:
+            ix = self.ngrams()
+            ids = ix.wildcard(motif)
+            if len(self) > ix.nterms:
+                ids = np.concatenate([ids, self._recent(ix).wildcard(motif) + ix.nterms])
+        ordre = np.lexsort((ids, -self.doc_freqs(ids)))[:max(limit, 0)]
+        return ids[ordre].tolist()
+
+    def fuzzy(self, mot, distance, limit=MAX_EXPANSIONS):
+        # [(term id, edits)] of the terms within distance edits of mot, at most
+        # limit of them: the closest, then the ones found in the most documents
+        ix = self.ngrams()
+        ids, d = ix.fuzzy(mot, distance)
+        if len(self) > ix.nterms:
+            ids_r, d_r = self._recent(ix).fuzzy(mot, distance)
+            ids, d = np.concatenate([ids, ids_r + ix.nterms]), np.concatenate([d, d_r])
+        ordre = np.lexsort((ids, -self.doc_freqs(ids), d))[:max(limit, 0)]
+        return list(zip(ids[ordre].tolist(), d[ordre].tolist()))
+
+    def expand(self, jokers):
+        # [(term id, count)] of the jokers of a Query: a "*" joker counts 1
+        # for every matching term, a "~" joker 1 / (1 + edits)
+        resultats = []
+        for joker in jokers:
+            if joker[0] == "*":
+                resultats += [(j, 1.0) for j in self.wildcard(joker[1])]
+            else:
+                resultats += [(j, 1.0 / (1 + d)) for j, d in self.fuzzy(joker[1], joker[2])]
+        return resultats
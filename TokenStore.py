@@ -0,0 +1,272 @@
+# TokenStore.py
+# Tokenized view of the corpus: every document is analysed once, when it is
+# added, and stored as a compact array of term ids. The vocabulary, the TF
+# matrix of the search engine, the corpus statistics and the per-document
+# top words are all computed from these arrays instead of re-cleaning texts.
+# Corpus-wide term / document counts are kept up to date incrementally: only
+# the tokens added since the last request are counted.
+
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import os
+import re
+import numpy as np
+
+
+# Same result as Corpus.nettoyer_texte(texte).split() in a single regex pass:
+# a token is a maximal run of (lower-case) letters.
+TOKEN_RE = re.compile(r"[a-zàâäçéèêëîïôöùûüÿñæœ]+")
+
+
+def analyser(texte):
+    # Text → list of cleaned words
+    return TOKEN_RE.findall(str(texte).lower())
+
+
+def analyse_shard(textes):
+    # Worker side of TokenStore.add_many: analyse a shard of documents with a
+    # local vocabulary → (local words in order of first appearance,
+    # local term ids of every token, number of tokens of every document)
+    return index_words([analyser(texte) for texte in textes])
+
+
+def index_words(mots):
+    # Same as analyse_shard for documents already analysed (lists of words)
+    tous = list(itertools.chain.from_iterable(mots))
+    local = {mot: j for j, mot in enumerate(dict.fromkeys(tous))}
+    ids = np.fromiter(map(local.__getitem__, tous), dtype=np.int32, count=len(tous))
+    longueurs = np.fromiter(map(len, mots), dtype=np.int64, count=len(mots))
+    return list(local), ids, longueurs
+
+
+class TokenStore:
+    def __init__(self):
+        self.term2id = {}      # word → term id (ids given in order of first appearance)
+        self.terms = []        # term id → word
+
+        # All documents' term ids end to end; document i is
+        # _ids[_offsets[i]:_offsets[i+1]]. Buffers grow by doubling.
+        self._ids = np.empty(1024, dtype=np.int32)
+        self._offsets = np.zeros(1024, dtype=np.int64)
+        self.ndoc = 0
+        self.ntokens = 0
+        self._positions = None
+
+        self._counted = 0                                # documents included in the counts
+        self._term_counts = np.zeros(0, dtype=np.int64)
+        self._doc_counts = np.zeros(0, dtype=np.int64)
+
+    def add(self, texte):
+        # Analyse a document, register new words and store its term ids
+        return self.add_words(analyser(texte))
+
+    def add_words(self, mots):
+        # Store a document already analysed (list of words)
+        term2id = self.term2id
+        nb_mots = len(term2id)
+        ids = [term2id.setdefault(mot, len(term2id)) for mot in mots]
+        if len(term2id) > nb_mots:
+            # new words, in order of first appearance
+            for mot, j in zip(mots, ids):
+                if j == len(self.terms):
+                    self.terms.append(mot)
+
+        self._append(ids, [len(ids)])
+        return self.ndoc - 1
+
+    def add_many(self, textes, workers=None, pool=None):
+        # Analyse a batch of documents. The batch is analysed with a local
+        # vocabulary and merged: term ids and token arrays are identical to
+        # add(). With several workers (or a process pool), it is split into
+        # shards by document range, analysed in parallel and merged in order.
+        textes = [str(t) for t in textes]
+        if pool is None and (not workers or workers <= 1 or len(textes) < 2):
+            self._merge([analyse_shard(textes)])
+            return
+
+        nb_shards = 4 * (workers or os.cpu_count() or 1)
+        bornes = np.linspace(0, len(textes), min(nb_shards, len(textes)) + 1).astype(int)
+        shards = [textes[a:b] for a, b in zip(bornes[:-1], bornes[1:])]
+        if pool is None:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                resultats = list(pool.map(analyse_shard, shards))
+        else:
+            resultats = list(pool.map(analyse_shard, shards))
+        self._merge(resultats)
+
+    def add_words_many(self, mots):
+        # Store a batch of documents already analysed (lists of words)
+        self._merge([index_words(mots)])
+
+    def _merge(self, resultats):
+        # store analysed shards (analyse_shard), in order
+        term2id = self.term2id
+        for mots, ids, longueurs in resultats:
+            nb_mots = len(self.terms)
+            table = np.array([term2id.setdefault(mot, len(term2id)) for mot in mots], dtype=np.int32)
+            # new words keep their order of first appearance
+            self.terms.extend(mot for mot, j in zip(mots, table.tolist()) if j >= nb_mots)
+            self._append(table[ids] if ids.size else ids, longueurs)
+
+    def _append(self, ids, longueurs):
+        # store the term ids of one or more documents
+        n = len(ids)
+        if self.ntokens + n > self._ids.size:
+            self._ids = np.resize(self._ids, max(2 * self._ids.size, self.ntokens + n))
+        if self.ndoc + len(longueurs) + 1 > self._offsets.size:
+            self._offsets = np.resize(self._offsets, max(2 * self._offsets.size,
+                                                         self.ndoc + len(longueurs) + 1))
+
+        self._ids[self.ntokens:self.ntokens + n] = ids
+        self._offsets[self.ndoc + 1:self.ndoc + len(longueurs) + 1] = self.ntokens + np.cumsum(longueurs)
+        self.ntokens += n
+        self.ndoc += len(longueurs)
+        self._positions = None
+
+    # ---------------------- accès ----------------------
+    @property
+    def ids(self):
+        # term ids of every token, document after document
+        return self._ids[:self.ntokens]
+
+    @property
+    def offsets(self):
+        # document i → ids[offsets[i]:offsets[i+1]]
+        return self._offsets[:self.ndoc + 1]
+
+    def doc_ids(self, doc_id):
+        return self._ids[self._offsets[doc_id]:self._offsets[doc_id + 1]]
+
+    def doc_starts(self, texte):
+        # character offset of every token of a document's text (recomputed on
+        # demand: only the concordancer needs them, for the documents it shows)
+        return [m.start() for m in TOKEN_RE.finditer(str(texte).lower())]
+
+    def doc_words(self, doc_id):
+        return [self.terms[j] for j in self.doc_ids(doc_id)]
+
+    def doc_lengths(self):
+        return np.diff(self.offsets)
+
+    def token_docs(self):
+        # document id of every token (same length as ids)
+        return np.repeat(np.arange(self.ndoc, dtype=np.int32), self.doc_lengths())
+
+    def term_counts(self):
+        # number of occurrences of every term in the corpus (read-only)
+        self._update_counts()
+        return self._term_counts
+
+    def doc_counts(self):
+        # number of documents containing every term (read-only)
+        self._update_counts()
+        return self._doc_counts
+
+    def _update_counts(self):
+        # add the documents stored since the last update to the counts
+        if self._counted == self.ndoc and self._term_counts.size == len(self.terms):
+            return
+        tc, dc = self.counts_of(np.arange(self._counted, self.ndoc))
+        tc[:self._term_counts.size] += self._term_counts
+        dc[:self._doc_counts.size] += self._doc_counts
+        tc.flags.writeable = dc.flags.writeable = False
+        self._term_counts, self._doc_counts = tc, dc
+        self._counted = self.ndoc
+
+    def counts_of(self, doc_ids):
+        # (occurrences, number of documents) of every term in some documents
+        nb_mots = len(self.terms)
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        debut = self._offsets[doc_ids]
+        longueurs = self._offsets[doc_ids + 1] - debut
+        # token indices of the documents, end to end
+        pos = np.arange(longueurs.sum()) + np.repeat(debut - np.cumsum(longueurs) + longueurs, longueurs)
+        ids = self._ids[pos]
+        tc = np.bincount(ids, minlength=nb_mots).astype(np.int64)
+        paires = np.unique(np.repeat(doc_ids, longueurs) * max(nb_mots, 1) + ids)
+        dc = np.bincount(paires % max(nb_mots, 1), minlength=nb_mots).astype(np.int64)
+        return tc, dc
+
+    def token_doc(self, tokens):
+        # global token index → document id
+        return np.searchsorted(self.offsets, tokens, side="right") - 1
+
+    def positions(self):
+        # Positional index: term j → global indices of its tokens,
+        # tokens[indptr[j]:indptr[j+1]], sorted by document then position.
+        # Built lazily and rebuilt after new documents are added.
+        if self._positions is None:
+            tokens = np.argsort(self.ids, kind="stable").astype(np.int64)
+            indptr = np.zeros(len(self.terms) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.ids, minlength=len(self.terms)), out=indptr[1:])
+            self._positions = (indptr, tokens)
+        return self._positions
+
+    def term_positions(self, j):
+        indptr, tokens = self.positions()
+        return tokens[indptr[j]:indptr[j + 1]]
+
+    # ---------------------- phrases / proximité ----------------------
+    def phrase_docs(self, mots):
+        # Sorted ids of the documents containing the exact sequence of words.
+        # The rarest word anchors the search, then each other word is checked
+        # directly in the token array at the expected offset.
+        ids = [self.lookup(mot) for mot in mots]
+        if not ids or None in ids:
+            return np.empty(0, dtype=np.int64)
+
+        counts = [self.term_positions(j).size for j in ids]
+        r = int(np.argmin(counts))
+        debut = self.term_positions(ids[r]) - r          # candidate phrase starts
+        fin = debut + len(ids) - 1
+        ok = (debut >= 0) & (fin < self.ntokens)
+        debut, fin = debut[ok], fin[ok]
+
+        doc = self.token_doc(debut)
+        ok = doc == self.token_doc(fin)
+        for i, j in enumerate(ids):
+            if i != r:
+                ok &= self.ids[np.minimum(debut + i, self.ntokens - 1)] == j
+        return np.unique(doc[ok])
+
+    def near_docs(self, mots, n):
+        # Sorted ids of the documents where every word occurs within n words
+        # of an occurrence of the rarest one (for two words: "a within n words of b").
+        ids = [self.lookup(mot) for mot in mots]
+        if not ids or None in ids:
+            return np.empty(0, dtype=np.int64)
+
+        counts = [self.term_positions(j).size for j in ids]
+        r = int(np.argmin(counts))
+        ancre = self.term_positions(ids[r])
+        doc = self.token_doc(ancre)
+        offsets = self.offsets
+        bas = np.maximum(ancre - n, offsets[doc])
+        haut = np.minimum(ancre + n, offsets[doc + 1] - 1)
+
+        ok = np.ones(ancre.size, dtype=bool)
+        for i, j in enumerate(ids):
+            if i == r:
+                continue
+            pos = self.term_positions(j)
+            # first occurrence of word j at or after bas, must not pass haut
+            k = np.searchsorted(pos, bas)
+            trouve = k < pos.size
+            ok &= trouve
+            ok[trouve] &= pos[k[trouve]] <= haut[trouve]
+            if j == ids[r]:
+                # the same word twice: needs another occurrence than the anchor
+                ok &= np.searchsorted(pos, haut, side="right") - k >= 2
+        return np.unique(doc[ok])
+
+    def lookup(self, mot):
+        return self.term2id.get(mot)
+
+    def top_terms(self, doc_id, n=10):
+        # Most frequent words of one document, as Counter(words).most_common(n)
+        ids = self.doc_ids(doc_id)
+        if ids.size == 0:
+            return []
+        uniq, first, counts = np.unique(ids, return_index=True, return_counts=True)
+        order = np.lexsort((first, -counts))[:n]
+        return [(self.terms[uniq[i]], int(counts[i])) for i in order]
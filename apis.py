@@ -3,13 +3,15 @@
 #Add your API keys from the website so you can fetch data from these APIs
 
 
-import praw
 import urllib.request
 import xmltodict
 from datetime import datetime
-from config import REDDIT_CLIENT_ID, REDDIT_SECRET, REDDIT_USER_AGENT
 
 def fetch_reddit(keyword, limit=20):
+    # praw and the API keys are only needed here (ingest.py reuses the parsers below)
+    import praw
+    from config import REDDIT_CLIENT_ID, REDDIT_SECRET, REDDIT_USER_AGENT
+
     reddit = praw.Reddit(
         client_id=REDDIT_CLIENT_ID,
         client_secret=REDDIT_SECRET,
@@ -20,25 +22,35 @@ def fetch_reddit(keyword, limit=20):
 
     docs = []
     for post in posts:
+        docs.append(reddit_record(post.title, post.author, post.created_utc, post.url,
+                                  post.selftext, post.num_comments))
+    return docs
 
-        date_str = datetime.utcfromtimestamp(post.created_utc).strftime("%Y-%m-%d")
 
-        docs.append({
-            "titre": post.title,
-            "auteur": str(post.author) if post.author else "Unknown",
-            "date": date_str,
-            "url": post.url,
-            "texte": (post.selftext or "").replace("\n", " "),
-            "type": "Reddit",
-            "extra": post.num_comments
-        })
-    return docs
+def reddit_record(title, author, created_utc, url, selftext, num_comments):
+    # One Reddit post → corpus record
+    date_str = datetime.utcfromtimestamp(created_utc).strftime("%Y-%m-%d")
+
+    return {
+        "titre": title,
+        "auteur": str(author) if author else "Unknown",
+        "date": date_str,
+        "url": url,
+        "texte": (selftext or "").replace("\n", " "),
+        "type": "Reddit",
+        "extra": num_comments
+    }
 
 
 def fetch_arxiv(keyword, max_results=20):
     url = f"http://export.arxiv.org/api/query?search_query=all:{keyword}&start=0&max_results={max_results}"
 
     data = urllib.request.urlopen(url).read()
+    return parse_arxiv(data)
+
+
+def parse_arxiv(data):
+    # arXiv Atom feed (bytes or str) → corpus records
     feed = xmltodict.parse(data)["feed"]
 
     entries = feed.get("entry", [])
@@ -0,0 +1,255 @@
+# benchmark.py
+# Reproducible benchmark of corpus loading, indexing and query latency.
+# Datasets: corpus.csv (API corpus), discours_US.csv as whole speeches and
+# split into sentences (loaders.iter_speeches, as in widget.ipynb), each at
+# scale 1 and in synthetic scale-ups (every record copied N times, with a
+# copy number in its title / URL). Every (dataset, scale) case runs in a fresh Python
+# process so that its peak RSS is its own.
+#
+# Measured: Corpus fill time (load), SearchEngine build time, peak RSS,
+# in-memory and on-disk index size, p50/p95/p99 latency of a fixed query set
+# (cache disabled) and of Corpus.concorde. Results are written as JSON; a
+# previous result file can be given to flag regressions.
+#
+#     python benchmark.py --scales 1 10 --output bench.json
+#     python benchmark.py --compare bench.json --tolerance 0.2
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+
+DATASETS = ["api", "speeches", "sentences"]
+SCALES = [1, 10, 100]
+
+QUERIES = ["america", "freedom", "computer", "tax cuts middle class", "great again",
+           "health care jobs economy", "the people", "climate change energy", "data learning model",
+           '"middle class"', '"tax cuts"~5', '"make america great"', "zzzz"]
+CONCORDE_QUERIES = ["america", "computer", "freedom", "tax"]
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# ---------------------- datasets ----------------------
+def scaled_api_csv(scale, dossier):
+    # corpus.csv copied scale times → path of the CSV to load
+    source = os.path.join(HERE, "corpus.csv")
+    if scale == 1:
+        return source
+    import loaders
+    df = pd.read_csv(source, sep=loaders.sniff_sep(source))
+    copies = []
+    for c in range(scale):
+        copie = df.copy()
+        copie["titre"] = copie["titre"].astype(str) + f" #{c}"
+        copie["url"] = copie["url"].astype(str) + f"#{c}"
+        copies.append(copie)
+    chemin = os.path.join(dossier, f"api_x{scale}.csv")
+    pd.concat(copies, ignore_index=True).to_csv(chemin, sep="\t", index=False)
+    return chemin
+
+
+def speech_documents(scale):
+    # discours_US.csv → documents, one per speech
+    from Document import Document
+    import loaders
+    df = pd.read_csv(os.path.join(HERE, "discours_US.csv"), sep="\t")
+    dates = loaders.parse_dates(df["date"], ["%B %d, %Y", "%d/%m/%Y", "%Y-%m-%d"])
+
+    docs = []
+    for c in range(scale):
+        for speaker, texte, date, link in zip(df["speaker"], df["text"], dates, df["link"]):
+            titre = f"Discours #{c}" if scale > 1 else "Discours"
+            docs.append(Document(titre, speaker, date, str(link), str(texte)))
+    return docs
+
+
+def load_sentences(corpus, scale):
+    # discours_US.csv → one document per sentence (Corpus.add_speeches), scale copies
+    import loaders
+    for c in range(scale):
+        for speeches in loaders.iter_speeches(os.path.join(HERE, "discours_US.csv"), sep="\t"):
+            if scale > 1:
+                speeches["titres"] = [f"{t} #{c}" for t in speeches["titres"]]
+            corpus.add_speeches(**speeches)
+
+
+# ---------------------- one case ----------------------
+def percentiles(durees):
+    ms = np.array(durees) * 1000
+    return {"p50_ms": float(np.percentile(ms, 50)), "p95_ms": float(np.percentile(ms, 95)),
+            "p99_ms": float(np.percentile(ms, 99)), "mean_ms": float(ms.mean())}
+
+
+def dir_size(dossier):
+    return sum(os.path.getsize(os.path.join(dossier, f)) for f in os.listdir(dossier))
+
+
+def run_case(dataset, scale, repeat):
+    import Corpus
+    from SearchEngine import SearchEngine
+
+    with tempfile.TemporaryDirectory() as dossier, contextlib.redirect_stdout(io.StringIO()):
+        Corpus.Corpus._instance = None
+        corpus = Corpus.Corpus(f"{dataset} x{scale}")
+
+        if dataset == "api":
+            chemin = scaled_api_csv(scale, dossier)
+            t = time.perf_counter()
+            corpus.load(chemin)
+            load_s = time.perf_counter() - t
+        elif dataset == "speeches":
+            t = time.perf_counter()
+            corpus.add_documents(speech_documents(scale))
+            load_s = time.perf_counter() - t
+        else:
+            t = time.perf_counter()
+            load_sentences(corpus, scale)
+            load_s = time.perf_counter() - t
+
+        t = time.perf_counter()
+        engine = SearchEngine(corpus, cache_size=0)
+        build_s = time.perf_counter() - t
+
+        engine.save(os.path.join(dossier, "index"))
+        index_disk = dir_size(os.path.join(dossier, "index"))
+        index_memory = engine.mat_TF.nbytes + engine.mat_TFxIDF.data.nbytes + engine.index.nbytes
+
+        for q in QUERIES:                      # warm-up (lazy structures: positions...)
+            engine.search(q)
+        durees = []
+        for _ in range(repeat):
+            for q in QUERIES:
+                t = time.perf_counter()
+                engine.search(q, k=10)
+                durees.append(time.perf_counter() - t)
+
+        durees_concorde = []
+        for _ in range(max(1, repeat // 10)):
+            for motif in CONCORDE_QUERIES:
+                t = time.perf_counter()
+                corpus.concorde(motif, page=0)
+                durees_concorde.append(time.perf_counter() - t)
+
+    return {
+        "dataset": dataset,
+        "scale": scale,
+        "ndoc": corpus.ndoc,
+        "ntokens": int(corpus.tokens.ntokens),
+        "nterms": len(engine.vocab),
+        "load_s": load_s,
+        "build_s": build_s,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "index_memory_bytes": int(index_memory),
+        "index_disk_bytes": int(index_disk),
+        "query": percentiles(durees),
+        "concorde": percentiles(durees_concorde),
+    }
+
+
+# ---------------------- suite ----------------------
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=HERE, capture_output=True,
+                                text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"date": datetime.datetime.now().isoformat(timespec="seconds"), "commit": commit,
+            "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "platform": platform.platform(), "cpus": os.cpu_count(), "queries": QUERIES,
+            "concorde_queries": CONCORDE_QUERIES}
+
+
+def run_suite(datasets, scales, repeat):
+    results = []
+    for dataset in datasets:
+        for scale in scales:
+            # fresh process per case: peak RSS and caches are not shared
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--case", dataset,
+                                  str(scale), "--repeat", str(repeat)],
+                                 cwd=HERE, capture_output=True, text=True)
+            if out.returncode != 0:
+                print(f"{dataset} x{scale} : échec\n{out.stderr}", file=sys.stderr)
+                continue
+            r = json.loads(out.stdout)
+            print(f"{dataset:>9} x{scale:<4} ndoc={r['ndoc']:<8} load={r['load_s']:.2f}s "
+                  f"build={r['build_s']:.2f}s rss={r['peak_rss_mb']:.0f}MB "
+                  f"p50={r['query']['p50_ms']:.2f}ms p99={r['query']['p99_ms']:.2f}ms",
+                  file=sys.stderr)
+            results.append(r)
+    return {"meta": metadata(), "results": results}
+
+
+# Metrics compared by --compare (higher is worse)
+COMPARED = [("load_s",), ("build_s",), ("peak_rss_mb",), ("index_disk_bytes",),
+            ("query", "p50_ms"), ("query", "p95_ms"), ("query", "p99_ms"),
+            ("concorde", "p50_ms"), ("concorde", "p95_ms")]
+
+
+def compare(ancien, nouveau, tolerance):
+    # (case, metric, old, new) of the metrics that got worse by more than tolerance
+    anciens = {(r["dataset"], r["scale"]): r for r in ancien["results"]}
+    regressions = []
+    for r in nouveau["results"]:
+        old = anciens.get((r["dataset"], r["scale"]))
+        if old is None:
+            continue
+        for chemin in COMPARED:
+            a, b = old, r
+            for cle in chemin:
+                a, b = a[cle], b[cle]
+            if a > 0 and b > a * (1 + tolerance):
+                regressions.append((f"{r['dataset']} x{r['scale']}", ".".join(chemin), a, b))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark du moteur de recherche")
+    parser.add_argument("--datasets", nargs="+", default=DATASETS, choices=DATASETS)
+    parser.add_argument("--scales", nargs="+", type=int, default=SCALES)
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the query set")
+    parser.add_argument("--output", help="JSON result file (default: stdout)")
+    parser.add_argument("--compare", help="previous JSON result file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--case", nargs=2, metavar=("DATASET", "SCALE"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        print(json.dumps(run_case(args.case[0], int(args.case[1]), args.repeat)))
+        return 0
+
+    ancien = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            ancien = json.load(f)
+
+    resultats = run_suite(args.datasets, args.scales, args.repeat)
+    texte = json.dumps(resultats, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(texte)
+    else:
+        print(texte)
+
+    if ancien is not None:
+        regressions = compare(ancien, resultats, args.tolerance)
+        for cas, metrique, a, b in regressions:
+            print(f"Régression {cas} {metrique} : {a:.4g} → {b:.4g}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+# ingest.py
+# Concurrent, paginated ingestion of Reddit and arXiv documents.
+# Many keywords and pages are fetched at once by a pool of threads, each
+# thread keeping its own HTTP session (connections are reused between
+# pages). Every source has its own rate limit. Parsed records are streamed
+# straight into a Corpus (and its live SearchEngine) as pages arrive,
+# without the corpus.csv round-trip; an archive CSV (same format as
+# main.build_corpus) is only written if asked.
+#
+# Reddit is read through its public JSON search API (cursor pagination with
+# "after", so the pages of one keyword are sequential), arXiv through its
+# Atom API (offset pagination, pages fetched in parallel). Base URLs can be
+# changed, e.g. to point at a local server replaying recorded payloads.
+#
+#     corpus = Corpus("API Corpus")
+#     Ingestor(corpus, archive="corpus.csv").run(["computer", "linux"], max_results=200)
+
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import threading
+import time
+import pandas as pd
+import requests
+from apis import reddit_record, parse_arxiv
+import loaders
+
+
+REDDIT_URL = "https://www.reddit.com"
+ARXIV_URL = "http://export.arxiv.org"
+USER_AGENT = "Python-Search-Motor/1.0"
+ARCHIVE_COLUMNS = ["id", "titre", "auteur", "date", "url", "texte", "type", "extra"]
+
+
+class RateLimiter:
+    # At most rate requests per second, shared by all threads
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_time)
+            self.next_time = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Ingestor:
+    def __init__(self, corpus, workers=8, page_size=100, reddit_url=REDDIT_URL, arxiv_url=ARXIV_URL,
+                 reddit_rate=1.0, arxiv_rate=1 / 3, timeout=30, user_agent=USER_AGENT, archive=None):
+        self.corpus = corpus
+        self.workers = workers
+        self.page_size = page_size
+        self.reddit_url = reddit_url.rstrip("/")
+        self.arxiv_url = arxiv_url.rstrip("/")
+        self.limits = {"reddit": RateLimiter(reddit_rate), "arxiv": RateLimiter(arxiv_rate)}
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.archive = archive       # CSV path, None = no archive
+
+        self.seen = set()            # URLs already ingested
+        self.archived = 0            # rows written to the archive
+        self.errors = []             # (source, keyword, message) of failed requests
+        self._local = threading.local()
+
+    # ---------------------- HTTP ----------------------
+    def session(self):
+        # one session (connection pool) per thread
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+            self._local.session.headers["User-Agent"] = self.user_agent
+        return self._local.session
+
+    def get(self, source, url, params):
+        self.limits[source].wait()
+        response = self.session().get(url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    # ---------------------- sources ----------------------
+    def reddit_pages(self, keyword, max_results, emit):
+        # pages of one keyword, following the "after" cursor
+        after, total = None, 0
+        while total < max_results:
+            params = {"q": keyword, "limit": min(self.page_size, max_results - total), "sort": "relevance"}
+            if after:
+                params["after"] = after
+            listing = self.get("reddit", f"{self.reddit_url}/search.json", params).json()["data"]
+
+            posts = [child["data"] for child in listing.get("children", [])]
+            emit([reddit_record(p["title"], p.get("author"), p["created_utc"], p["url"],
+                                p.get("selftext"), p.get("num_comments", 0)) for p in posts])
+            total += len(posts)
+            after = listing.get("after")
+            if not posts or not after:
+                break
+
+    def arxiv_page(self, keyword, start, n, emit):
+        params = {"search_query": f"all:{keyword}", "start": start, "max_results": n}
+        emit(parse_arxiv(self.get("arxiv", f"{self.arxiv_url}/api/query", params).content))
+
+    # ---------------------- pipeline ----------------------
+    def run(self, keywords, max_results=100, sources=("reddit", "arxiv")):
+        # Fetch max_results documents per keyword and source; returns the
+        # number of documents added to the corpus
+        pages = queue.Queue()
+        fin = object()
+        nb_errors = len(self.errors)
+
+        def task(source, keyword, fetch, *args):
+            try:
+                fetch(*args, pages.put)
+            except Exception as e:      # one failed page does not stop the others
+                self.errors.append((source, keyword, f"{type(e).__name__}: {e}"))
+            finally:
+                pages.put(fin)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            nb_tasks = 0
+            for keyword in keywords:
+                if "reddit" in sources:
+                    pool.submit(task, "reddit", keyword, self.reddit_pages, keyword, max_results)
+                    nb_tasks += 1
+                if "arxiv" in sources:
+                    for start in range(0, max_results, self.page_size):
+                        n = min(self.page_size, max_results - start)
+                        pool.submit(task, "arxiv", keyword, self.arxiv_page, keyword, start, n)
+                        nb_tasks += 1
+
+            # pages are added to the corpus as they arrive, in this thread
+            added = 0
+            while nb_tasks:
+                records = pages.get()
+                if records is fin:
+                    nb_tasks -= 1
+                else:
+                    added += self.add_records(records)
+
+        for source, keyword, message in self.errors[nb_errors:]:
+            print(f"Erreur {source} ({keyword}) : {message}")
+        print(f"\n{added} documents ajoutés au corpus")
+        return added
+
+    def add_records(self, records):
+        # New records (by URL) → documents in the corpus (+ archive)
+        records = [r for r in records if r["url"] not in self.seen]
+        self.seen.update(r["url"] for r in records)
+        if not records:
+            return 0
+
+        df = pd.DataFrame(records, columns=ARCHIVE_COLUMNS[1:])
+        doc_ids = self.corpus.add_documents(loaders.documents_from_frame(df))
+        # near-duplicates dropped by the corpus (Corpus.detect_duplicates) get no id
+        df = df[[doc_id is not None for doc_id in doc_ids]]
+
+        if self.archive:
+            df.insert(0, "id", [doc_id for doc_id in doc_ids if doc_id is not None])
+            # the archive is rewritten by a new Ingestor, then appended to
+            df.to_csv(self.archive, sep="\t", index=False, mode="a" if self.archived else "w",
+                      header=not self.archived)
+            self.archived += len(df)
+        return len(df)
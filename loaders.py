@@ -0,0 +1,127 @@
+# loaders.py
+# Vectorised, chunked loading of corpus CSV files.
+# The CSV is read in bounded-size chunks, the dates of a whole chunk are
+# parsed in one pass (trying several formats), and the documents of each
+# source type are built in bulk. Chunks are yielded one at a time so they
+# can be streamed straight into a Corpus (and its live SearchEngine).
+# Speech files (discours_US.csv) are segmented into sentences chunk by
+# chunk with one regex pass, as spans of the speech texts (iter_speeches).
+
+import re
+import numpy as np
+import pandas as pd
+from Factory import factoryClass
+
+
+# Formats tried in order for every date that is not parsed yet
+DATE_FORMATS = ["%Y-%m-%d", "%B %d, %Y", "%d/%m/%Y"]
+
+# A sentence as given by re.split(r"[.!?]", texte) then strip(): a run
+# without delimiter, from its first to its last non-blank character
+SENTENCE_RE = re.compile(r"[^.!?\s](?:[^.!?]*[^.!?\s])?")
+
+
+def sniff_sep(chemin, candidats=("\t", ";", ",")):
+    # Guess the column separator from the header line
+    with open(chemin, encoding="utf-8") as f:
+        entete = f.readline()
+    return max(candidats, key=entete.count)
+
+
+def parse_dates(valeurs, formats=DATE_FORMATS):
+    # Series of date strings → list of datetime objects.
+    # Each format is applied (vectorised) to the values still unparsed.
+    valeurs = pd.Series(valeurs).astype(str)
+    dates = pd.Series(pd.NaT, index=valeurs.index, dtype="datetime64[ns]")
+    reste = pd.Series(True, index=valeurs.index)
+
+    for fmt in formats:
+        if not reste.any():
+            break
+        dates[reste] = pd.to_datetime(valeurs[reste], format=fmt, errors="coerce")
+        reste = dates.isna()
+
+    if reste.any():
+        raise ValueError(f"Format de date inconnu : {valeurs[reste].iloc[0]}")
+    return list(dates.dt.to_pydatetime())
+
+
+def read_csv_chunks(chemin, chunksize=10000, sep=None):
+    # DataFrames of at most chunksize rows
+    if sep is None:
+        sep = sniff_sep(chemin)
+    yield from pd.read_csv(chemin, sep=sep, chunksize=chunksize)
+
+
+def documents_from_frame(df):
+    # Build the documents of a chunk (same order as the rows), type by type
+    dates = parse_dates(df["date"])
+    types = df["type"].astype(str).str.lower()
+    # blank texts (Reddit posts without selftext) are read as NaN: keep them
+    # empty instead of the word "nan"
+    textes = df["texte"].fillna("").astype(str)
+    docs = [None] * len(df)
+
+    reddit = (types == "reddit").to_numpy()
+    if reddit.any():
+        sub = df[reddit]
+        nb_comments = pd.to_numeric(sub["extra"]).astype(int)
+        positions = reddit.nonzero()[0]
+        for i, titre, auteur, url, texte, nb in zip(positions, sub["titre"], sub["auteur"],
+                                                    sub["url"], textes[reddit], nb_comments):
+            docs[i] = factoryClass.create("reddit", titre, auteur, dates[i], url, texte, int(nb))
+
+    arxiv = (types == "arxiv").to_numpy()
+    if arxiv.any():
+        sub = df[arxiv]
+        # extra column contains all authors concatenated
+        auteurs = sub["extra"].astype(str).str.split("|")
+        positions = arxiv.nonzero()[0]
+        for i, titre, aut, url, texte in zip(positions, sub["titre"], auteurs,
+                                             sub["url"], textes[arxiv]):
+            aut = [a.strip() for a in aut if a.strip()]
+            docs[i] = factoryClass.create("arxiv", titre, aut, dates[i], url, texte)
+
+    inconnus = ~(reddit | arxiv)
+    if inconnus.any():
+        # let the factory report the unknown type
+        factoryClass.create(df["type"].to_numpy()[inconnus][0])
+    return docs
+
+
+def iter_documents(chemin, chunksize=10000, sep=None):
+    # Stream the documents of a corpus CSV, one list per chunk
+    for df in read_csv_chunks(chemin, chunksize, sep):
+        yield documents_from_frame(df)
+
+
+def segment(textes, min_length=20):
+    # Sentences of at least min_length characters of every text, as spans
+    # → (index of the text, start, end) arrays, in text order.
+    # All the texts are scanned at once, joined by a delimiter.
+    bornes = np.zeros(len(textes) + 1, dtype=np.int64)
+    np.cumsum([len(t) + 1 for t in textes], out=bornes[1:])
+    spans = np.array([m.span() for m in SENTENCE_RE.finditer(".".join(textes))],
+                     dtype=np.int64).reshape(-1, 2)
+    spans = spans[spans[:, 1] - spans[:, 0] >= min_length]
+    parent = np.searchsorted(bornes, spans[:, 0], side="right") - 1
+    return parent, spans[:, 0] - bornes[parent], spans[:, 1] - bornes[parent]
+
+
+def iter_speeches(chemin, chunksize=100, sep=None, min_length=20):
+    # Stream the speeches of a speech CSV (speaker, text, date[, descr, link]),
+    # segmented into sentences: one dict of columns per chunk, the arguments
+    # of Corpus.add_speeches (sentence s = textes[parent[s]][debut[s]:fin[s]])
+    for df in read_csv_chunks(chemin, chunksize, sep):
+        textes = df["text"].astype(str).tolist()
+        parent, debut, fin = segment(textes, min_length)
+        yield {
+            "titres": df["descr"].astype(str).tolist() if "descr" in df else ["Discours"] * len(df),
+            "auteurs": df["speaker"].tolist(),
+            "dates": parse_dates(df["date"]),
+            "urls": df["link"].astype(str).tolist() if "link" in df else [""] * len(df),
+            "textes": textes,
+            "parent": parent,
+            "debut": debut,
+            "fin": fin,
+        }
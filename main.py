@@ -2,10 +2,12 @@
 # TD6 : construction du corpus à partir des APIs
 # TD7 : ajout du moteur de recherche (SearchEngine)
 
+import sys
 import pandas as pd
 from Corpus import Corpus
 from SearchEngine import SearchEngine
 from apis import *
+from ingest import Ingestor
 
 
 def build_corpus(keyword):
@@ -27,21 +29,29 @@ def build_corpus(keyword):
 
 
 if __name__ == "__main__":
-    
-    build_corpus("computer")   # à lancer une fois si besoin
 
     corpus = Corpus("API Corpus")
-    corpus.load("corpus.csv")
+    if "--ingest" in sys.argv:
+        # à lancer une fois si besoin (python main.py --ingest) : documents
+        # récupérés en parallèle (pages et mots-clés), ajoutés directement
+        # au corpus et archivés dans corpus.csv (voir ingest.py)
+        Ingestor(corpus, archive="corpus.csv").run(["computer"], max_results=100)
+    else:
+        corpus.load("corpus.csv")
 
     # TD6 : exemples 
     corpus.show_by_date()
     print(corpus.search("computer"))
     print(corpus.concorde("computer"))
-    corpus.stats(10)
+    print(f"--- Statistiques du Corpus '{corpus.nom}' ---")
+    print(f"Nombre de mots différents (Taille du vocabulaire) : {corpus.vocab_size()}")
+    print("\n--- 10 mots les plus fréquents ---")
+    print(corpus.stats(10))
 
     # TD7 : moteur de recherche
     print("\n---- SearchEngine / TD7 ----\n")
-    engine = SearchEngine(corpus)
+    # index sauvegardé dans corpus.idx/ et réouvert tant que corpus.csv ne change pas
+    engine = SearchEngine.load_or_build(corpus, "corpus.idx", source="corpus.csv")
 
     # test
     df_res = engine.search("computer", k=5)
@@ -3,7 +3,6 @@ from tkinter import ttk, filedialog, messagebox
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import pandas as pd
-from collections import Counter
 import re
 
 # Import de vos classes
@@ -32,10 +31,30 @@ class AdvancedSearchApp:
         self.entry_query = tk.Entry(self.top_frame, width=40)
         self.entry_query.pack(side=tk.LEFT, padx=5)
 
+        # Complétion du dernier mot pendant la frappe (mots présents dans le plus de documents)
+        self.suggested = []
+        self.list_suggestions = tk.Listbox(root, height=8)
+        self.list_suggestions.bind("<<ListboxSelect>>", self.accept_suggestion)
+        self.entry_query.bind("<KeyRelease>", self.update_suggestions)
+        self.entry_query.bind("<Return>", lambda event: self.run_search())
+
         tk.Label(self.top_frame, text="Nbr résultats :", bg="#f0f0f0").pack(side=tk.LEFT, padx=5)
         self.spin_k = tk.Spinbox(self.top_frame, from_=5, to=100, width=5)
         self.spin_k.pack(side=tk.LEFT)
 
+        # Filtres appliqués par le moteur pendant la recherche
+        tk.Label(self.top_frame, text="Source :", bg="#f0f0f0").pack(side=tk.LEFT, padx=5)
+        self.combo_source = ttk.Combobox(self.top_frame, values=["Toutes", "Reddit", "Arxiv"], width=8, state="readonly")
+        self.combo_source.current(0)
+        self.combo_source.pack(side=tk.LEFT)
+
+        tk.Label(self.top_frame, text="Du (AAAA-MM-JJ) :", bg="#f0f0f0").pack(side=tk.LEFT, padx=5)
+        self.entry_date_min = tk.Entry(self.top_frame, width=11)
+        self.entry_date_min.pack(side=tk.LEFT)
+        tk.Label(self.top_frame, text="Au :", bg="#f0f0f0").pack(side=tk.LEFT, padx=5)
+        self.entry_date_max = tk.Entry(self.top_frame, width=11)
+        self.entry_date_max.pack(side=tk.LEFT)
+
         self.btn_search = tk.Button(self.top_frame, text="Rechercher", command=self.run_search, bg="lightblue")
         self.btn_search.pack(side=tk.LEFT, padx=10)
 
@@ -118,32 +137,77 @@ class AdvancedSearchApp:
         
         try:
             # Rechargement propre
+            if self.engine: self.engine.close()
             if Corpus._instance: Corpus._instance = None
             
             self.corpus = Corpus("App Corpus")
             self.corpus.load(path)
             
-            # Init moteur de recherche
-            self.engine = SearchEngine(self.corpus)
+            # Init moteur de recherche (index réouvert depuis <csv>.idx s'il est à jour)
+            self.engine = SearchEngine.load_or_build(self.corpus, path + ".idx", source=path)
             
             messagebox.showinfo("Succès", f"Corpus chargé : {self.corpus.ndoc} documents.\nMoteur indexé.")
         except Exception as e:
             messagebox.showerror("Erreur", str(e))
 
+    def update_suggestions(self, event=None):
+        if event is not None and event.keysym == "Escape":
+            self.list_suggestions.place_forget()
+            return
+        if not self.engine or (event is not None and event.keysym == "Return"):
+            return
+
+        suggestions = self.engine.complete(self.entry_query.get(), 8)
+        self.list_suggestions.delete(0, tk.END)
+        if not suggestions:
+            self.list_suggestions.place_forget()
+            return
+        self.suggested = [mot for mot, _ in suggestions]
+        for mot, nb in suggestions:
+            self.list_suggestions.insert(tk.END, f"{mot}  ({nb} docs)")
+
+        # liste affichée juste sous le champ de recherche
+        x = self.entry_query.winfo_rootx() - self.root.winfo_rootx()
+        y = self.entry_query.winfo_rooty() - self.root.winfo_rooty() + self.entry_query.winfo_height()
+        self.list_suggestions.place(x=x, y=y, width=self.entry_query.winfo_width())
+        self.list_suggestions.lift()
+
+    def accept_suggestion(self, event=None):
+        selection = self.list_suggestions.curselection()
+        if not selection: return
+
+        # le mot en cours de frappe est remplacé par la suggestion
+        texte = self.entry_query.get()
+        debut = re.search(r"\w*$", texte).start()
+        self.entry_query.delete(0, tk.END)
+        self.entry_query.insert(0, texte[:debut] + self.suggested[selection[0]] + " ")
+        self.list_suggestions.place_forget()
+        self.entry_query.focus_set()
+        self.entry_query.icursor(tk.END)
+
     def run_search(self):
+        self.list_suggestions.place_forget()
         if not self.engine:
             messagebox.showwarning("Attention", "Chargez d'abord un corpus.")
             return
 
         query = self.entry_query.get()
         k = int(self.spin_k.get())
+        source = self.combo_source.get()
+        date_min = self.entry_date_min.get().strip() or None
+        date_max = self.entry_date_max.get().strip() or None
 
         # Nettoyer l'interface
         for row in self.tree.get_children():
             self.tree.delete(row)
         
-        # Appel au moteur
-        df_res = self.engine.search(query, k=k)
+        # Appel au moteur (filtres source / dates évalués dans l'index)
+        try:
+            df_res = self.engine.search(query, k=k, doc_type=None if source == "Toutes" else source,
+                                        date_min=date_min, date_max=date_max)
+        except ValueError:
+            messagebox.showerror("Erreur", "Date invalide (format AAAA-MM-JJ).")
+            return
         
         # Stockage des résultats en mémoire
         self.current_results = [] # Reset
@@ -185,11 +249,8 @@ class AdvancedSearchApp:
         self.txt_content.delete("1.0", tk.END)
         self.txt_content.insert(tk.END, str(doc.texte))
 
-        # 2. Calcul des Top Mots pour CE document
-        text_clean = self.corpus.nettoyer_texte(str(doc.texte))
-        words = text_clean.split()
-        counter = Counter(words)
-        common = counter.most_common(10)
+        # 2. Top Mots pour CE document (texte déjà analysé par le corpus)
+        common = self.corpus.tokens.top_terms(doc_id, 10)
 
         # 3. Dessiner le graphe
         self.draw_doc_stats(common)
@@ -0,0 +1,9 @@
+# conftest.py
+# The modules of the repository are flat top-level modules: make them
+# importable from the tests.
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
@@ -0,0 +1,38 @@
+# test_dedup.py
+# Near-duplicate detection of the Corpus: documents without any word (Reddit
+# posts with an empty selftext) are never clustered nor dropped.
+
+import os
+import pytest
+from conftest import ROOT
+from Corpus import Corpus
+
+
+# posts of corpus.csv whose texte column is blank
+EMPTY = [1, 2, 4, 8, 10, 12, 13, 14, 17, 18, 19]
+
+
+@pytest.fixture
+def corpus():
+    Corpus._instance = None
+    corpus = Corpus("API Corpus")
+    yield corpus
+    Corpus._instance = None
+
+
+def test_blank_texts_are_empty(corpus):
+    corpus.load(os.path.join(ROOT, "corpus.csv"))
+    for i in EMPTY:
+        assert corpus.id2doc[i].texte == ""
+        assert corpus.tokens.doc_words(i) == []
+
+
+@pytest.mark.parametrize("mode", ["cluster", "drop"])
+def test_empty_documents_are_not_duplicates(corpus, mode):
+    corpus.detect_duplicates(mode=mode)
+    corpus.load(os.path.join(ROOT, "corpus.csv"))
+    dedup = corpus.duplicates
+    assert dedup.dropped == 0
+    groupes = [set(ids) for ids in dedup.clusters().values()]
+    assert not any(groupe & set(EMPTY) for groupe in groupes)
+    assert [dedup.canonical[i] for i in EMPTY] == EMPTY
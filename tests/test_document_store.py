@@ -0,0 +1,61 @@
+# test_document_store.py
+# Columnar DocumentStore: dates of every accepted form, parent speech texts
+# and offsets of sentences added in bulk or one at a time.
+
+import datetime
+import pandas as pd
+import pytest
+from DocumentStore import DocumentStore
+from Factory import factoryClass
+
+
+DATE = datetime.datetime(2016, 9, 1)
+SPEECH = "Thank you. We will build a stronger economy. Good night."
+
+
+def sentence(texte, **kwargs):
+    return factoryClass.create("speech", "Rally", "SPEAKER", DATE, "u", texte, **kwargs)
+
+
+def test_sentences_added_alone():
+    store = DocumentStore()
+    store.add_speeches(["Rally"], ["SPEAKER"], [DATE], ["u"], [SPEECH], [0, 0], [0, 11], [10, 44])
+
+    # a parent id alone is not a speech of this store
+    doc_id = store.add(sentence("Good night.", parent=0, debut=45))
+    assert store[doc_id].parent == -1 and store[doc_id].parent_texte is None
+
+    # with its speech text, the sentence keeps valid offsets
+    doc_id = store.add(sentence("Good night.", parent=0, debut=45, parent_texte=SPEECH))
+    vue = store[doc_id]
+    assert vue.parent == 1 and vue.parent_texte == SPEECH
+    assert vue.parent_texte[vue.debut:vue.fin] == vue.texte == "Good night."
+
+    # copied from a bulk-added sentence
+    doc_id = store.add(store[1])
+    vue = store[doc_id]
+    assert vue.parent_texte == SPEECH and vue.parent_texte[vue.debut:vue.fin] == store[1].texte
+
+
+@pytest.mark.parametrize("date, attendu", [
+    (datetime.datetime(2020, 1, 1, 12), datetime.datetime(2020, 1, 1, 12)),
+    (datetime.date(2020, 1, 1), datetime.datetime(2020, 1, 1)),
+    ("2020-01-01", datetime.datetime(2020, 1, 1)),
+    ("2020-01-01T05:30:00+02:00", datetime.datetime(2020, 1, 1, 3, 30)),
+    (datetime.datetime(2020, 1, 1, 1, tzinfo=datetime.timezone(datetime.timedelta(hours=1))),
+     datetime.datetime(2020, 1, 1)),
+    (pd.Timestamp("2020-01-01 08:00", tz="US/Eastern"), datetime.datetime(2020, 1, 1, 13)),
+    (None, None),
+    ("", None),
+])
+def test_dates(date, attendu):
+    store = DocumentStore()
+    doc_id = store.add(factoryClass.create("reddit", "t", "a", date, "u", "texte", 0))
+    assert store[doc_id].date == attendu
+    if attendu is not None:
+        assert store.select(date_min="2020-01-01", date_max="2020-01-01").tolist() == [doc_id]
+
+
+def test_invalid_date():
+    with pytest.raises(ValueError):
+        DocumentStore().add(factoryClass.create("reddit", "t", "a", "not a date", "u", "texte", 0))
@@ -0,0 +1,65 @@
+# test_index_store.py
+# Freshness of a saved index: the source CSV is hashed only when its size or
+# modification time changed, and an index only opens on the vocabulary
+# (words and term ids) it was built on.
+
+import datetime
+import os
+import shutil
+import pytest
+import IndexStore
+from conftest import ROOT
+from Corpus import Corpus
+from Factory import factoryClass
+from SearchEngine import SearchEngine
+
+
+def test_source_hashed_only_on_change(tmp_path, monkeypatch):
+    source = str(tmp_path / "corpus.csv")
+    shutil.copy(os.path.join(ROOT, "corpus.csv"), source)
+    dossier = str(tmp_path / "index")
+    IndexStore.save_index(dossier, {"a": [1, 2, 3]}, {"ndoc": 3}, source)
+
+    hashes = []
+    fingerprint = IndexStore.fingerprint
+    monkeypatch.setattr(IndexStore, "fingerprint", lambda s=None: hashes.append(s) or fingerprint(s))
+    assert IndexStore.is_fresh(dossier, source)
+    assert IndexStore.load_index(dossier, source)[1]["ndoc"] == 3
+    assert hashes == []
+
+    # same content, new modification time: hashed once, then trusted again
+    os.utime(source, ns=(1, 1))
+    assert IndexStore.is_fresh(dossier, source)
+    assert IndexStore.is_fresh(dossier, source)
+    assert len(hashes) == 1
+
+    with open(source, "a") as f:
+        f.write("\n")
+    assert not IndexStore.is_fresh(dossier, source)
+
+
+def test_index_of_another_vocabulary_is_rejected(tmp_path):
+    def corpus(textes):
+        Corpus._instance = None
+        c = Corpus("vocabulaire")
+        for texte in textes:
+            c.add_document(factoryClass.create("reddit", "t", "a", datetime.datetime(2020, 1, 1), "u", texte, 0))
+        return c
+
+    dossier = str(tmp_path / "index")
+    try:
+        engine = SearchEngine(corpus(["tax cuts now", "middle class jobs"]))
+        engine.save(dossier)
+        reopened = SearchEngine.open(dossier, engine.corpus)
+        assert reopened.vocab.terms() == engine.vocab.terms()
+        assert reopened.search("jobs", 2)["doc_id"].tolist() == [1]
+
+        # same number of documents, other words / term ids
+        autre = corpus(["middle class jobs", "tax cuts now"])
+        with pytest.raises(ValueError):
+            SearchEngine.open(dossier, autre)
+        rebuilt = SearchEngine.load_or_build(autre, dossier)
+        assert rebuilt.search("jobs", 2)["doc_id"].tolist() == [0]
+        assert SearchEngine.open(dossier, autre).vocab.terms() == autre.tokens.terms
+    finally:
+        Corpus._instance = None
@@ -0,0 +1,114 @@
+# test_ingest.py
+# Ingestor against a local HTTP server replaying recorded Reddit (JSON search
+# listings) and arXiv (Atom feeds) payloads from tests/fixtures:
+#     reddit_<q>[_<after>].json     one page of the Reddit search of q
+#     arxiv_<keyword>_<start>.xml   one page of the arXiv query all:<keyword>
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import threading
+from urllib.parse import parse_qs, urlparse
+import pandas as pd
+import pytest
+from conftest import ROOT
+from Corpus import Corpus
+from ingest import ARCHIVE_COLUMNS, Ingestor
+
+
+FIXTURES = os.path.join(ROOT, "tests", "fixtures")
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    requests = []       # (path, query parameters) of every request received
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        ReplayHandler.requests.append((url.path, params))
+        if url.path == "/search.json":
+            nom = "reddit_" + params["q"] + ("_" + params["after"] if "after" in params else "") + ".json"
+            content_type = "application/json"
+        elif url.path == "/api/query":
+            nom = "arxiv_" + params["search_query"].split(":", 1)[1] + "_" + params["start"] + ".xml"
+            content_type = "application/atom+xml"
+        else:
+            nom = None
+        chemin = os.path.join(FIXTURES, nom) if nom else None
+        if chemin is None or not os.path.exists(chemin):
+            self.send_error(404)
+            return
+        with open(chemin, "rb") as f:
+            corps = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    ReplayHandler.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ReplayHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def corpus():
+    Corpus._instance = None
+    yield Corpus("ingest")
+    Corpus._instance = None
+
+
+def ingestor(corpus, server, **options):
+    return Ingestor(corpus, workers=4, page_size=2, reddit_url=server, arxiv_url=server,
+                    reddit_rate=None, arxiv_rate=None, timeout=5, **options)
+
+
+def test_pagination_dedup_and_archive(corpus, server, tmp_path):
+    archive = str(tmp_path / "archive.csv")
+    ing = ingestor(corpus, server, archive=archive)
+    added = ing.run(["computer", "linux"], max_results=4)
+
+    # Reddit: the "after" cursor of the first page is followed, once
+    reddit = sorted((p["q"], p.get("after", ""), p["limit"]) for path, p in ReplayHandler.requests
+                    if path == "/search.json")
+    assert reddit == [("computer", "", "2"), ("computer", "t3_4d5e6f", "2"), ("linux", "", "2")]
+    # arXiv: one request per offset page
+    arxiv = sorted((p["search_query"], p["start"], p["max_results"]) for path, p in ReplayHandler.requests
+                   if path == "/api/query")
+    assert arxiv == [("all:computer", "0", "2"), ("all:computer", "2", "2"),
+                     ("all:linux", "0", "2"), ("all:linux", "2", "2")]
+
+    # the linux pages only repeat one Reddit post and one arXiv entry
+    assert ing.errors == []
+    assert added == 7 and corpus.ndoc == 7
+    urls = [corpus.id2doc[i].url for i in range(corpus.ndoc)]
+    assert len(set(urls)) == 7
+    types = sorted(corpus.id2doc[i].getType() for i in range(corpus.ndoc))
+    assert types == ["Arxiv"] * 3 + ["Reddit"] * 4
+
+    df = pd.read_csv(archive, sep="\t")
+    assert list(df.columns) == ARCHIVE_COLUMNS
+    assert len(df) == ing.archived == 7
+    assert sorted(df["id"]) == list(range(7)) and set(df["url"]) == set(urls)
+    row = df[df["url"] == "http://arxiv.org/abs/2401.00003v2"].iloc[0]
+    assert row["type"] == "Arxiv" and row["extra"] == "John Backus|Barbara Liskov"
+    assert row["date"] == "2024-01-03"
+    row = df[df["url"].str.contains("7g8h9i")].iloc[0]
+    assert row["auteur"] == "Unknown" and str(row["extra"]) == "4"
+
+
+def test_errors_do_not_stop_the_run(corpus, server):
+    # no recorded payload for this keyword: every request gets a 404
+    ing = ingestor(corpus, server)
+    added = ing.run(["computer", "unrecorded"], max_results=4, sources=("reddit",))
+    assert added == 3
+    assert [(source, keyword) for source, keyword, _ in ing.errors] == [("reddit", "unrecorded")]
@@ -0,0 +1,35 @@
+# test_listeners.py
+# Search engines indexing the documents added to the corpus: closed or
+# dropped engines stop receiving them.
+
+import datetime
+import gc
+import os
+from conftest import ROOT
+from Corpus import Corpus
+from Factory import factoryClass
+from SearchEngine import SearchEngine
+
+
+def test_closed_engines_are_detached(tmp_path):
+    Corpus._instance = None
+    corpus = Corpus("listeners")
+    corpus.load(os.path.join(ROOT, "corpus.csv"))
+    source = os.path.join(ROOT, "corpus.csv")
+    dossier = str(tmp_path / "index")
+    try:
+        SearchEngine(corpus).save(dossier, source)
+        SearchEngine.open(dossier, corpus)
+        engine = SearchEngine.load_or_build(corpus, dossier, source)
+        gc.collect()
+        assert list(corpus.listeners) == [engine]
+
+        engine.close()
+        assert len(corpus.listeners) == 0
+        live = SearchEngine(corpus)
+        doc_id = corpus.add_document(factoryClass.create(
+            "reddit", "t", "a", datetime.datetime(2020, 1, 1), "u", "zyxwv linux", 1))
+        assert live.search("zyxwv", 3)["doc_id"].tolist() == [doc_id]
+        assert engine.ndoc == doc_id
+    finally:
+        Corpus._instance = None
@@ -0,0 +1,115 @@
+# test_search.py
+# The pruned top-k of the SearchEngine (MaxScore, selective filters) must
+# return the same ranking as the exhaustive score_documents + full sort,
+# including when phrase constraints restrict the candidates.
+
+import os
+import numpy as np
+import pytest
+from conftest import ROOT
+from Corpus import Corpus
+from Query import Query
+from Scorer import CosineScorer, Scorer
+from SearchEngine import SearchEngine
+
+
+@pytest.fixture(scope="module")
+def engine():
+    Corpus._instance = None
+    corpus = Corpus("speeches")
+    corpus.load_speeches(os.path.join(ROOT, "discours_US.csv"))
+    corpus.load(os.path.join(ROOT, "corpus.csv"))
+    yield SearchEngine(corpus)
+    Corpus._instance = None
+
+
+def exhaustive(engine, query, k, allowed=None):
+    # k best (doc_id, score) of the full scoring, score desc then doc_id asc
+    q_ids, q_weights = engine.build_query_vector(query)
+    docs, scores = engine.score_documents(q_ids, q_weights)
+    if allowed is not None:
+        garde = np.isin(docs, allowed)
+        docs, scores = docs[garde], scores[garde]
+    ordre = np.lexsort((docs, -scores))[:k]
+    return list(zip(docs[ordre].tolist(), scores[ordre].tolist()))
+
+
+def result_ids(df):
+    # doc ids of a search() result (an empty result has no columns)
+    return df["doc_id"].tolist() if len(df) else []
+
+
+def assert_same(top, ref):
+    assert [d for d, _ in top] == [d for d, _ in ref]
+    assert np.allclose([s for _, s in top], [s for _, s in ref])
+
+
+@pytest.mark.parametrize("texte", [
+    '"middle class" whose',
+    '"united states" system anybody churned',
+    '"health care" families jobs',
+    '"tax cuts"~5 economy',
+])
+def test_phrase_top_k(engine, texte):
+    q = Query(texte)
+    allowed = engine.constraint_docs(q)
+    q_ids, q_weights = engine.build_query_vector(q)
+    for k in (1, 5, 20):
+        assert_same(engine.top_k(q_ids, q_weights, k, allowed), exhaustive(engine, q, k, allowed))
+    assert result_ids(engine.search(texte, 5)) == [d for d, _ in exhaustive(engine, q, 5, allowed)]
+
+
+FILTRES = [
+    {"auteur": "TRUMP"},
+    {"auteur": "CLINTON"},
+    {"auteur": ["TRUMP", "CLINTON"]},
+    {"doc_type": "Speech"},
+    {"doc_type": ["Reddit", "Arxiv"]},
+    {"date_min": "2015-01-01"},
+    {"date_min": "2016-01-01", "date_max": "2016-06-30"},
+    {"date_min": "2016-09-01", "date_max": "2016-09-03"},
+    {"auteur": "TRUMP", "date_max": "2016-03-01"},
+]
+
+
+@pytest.mark.parametrize("filtres", FILTRES)
+def test_filtered_top_k(engine, filtres):
+    # random queries of known words, on both top-k paths: MaxScore (with
+    # allowed) and top_k_selective (each allowed document scored directly)
+    rng = np.random.default_rng(len(str(filtres)))
+    termes = engine.vocab.terms()
+    allowed = engine.filter_docs(**filtres)
+    requetes = ["churned nearly seize strong", "middle class families"]
+    requetes += [" ".join(rng.choice(termes, rng.integers(1, 5))) for _ in range(30)]
+    for texte in requetes:
+        q_ids, q_weights = engine.build_query_vector(texte)
+        ref = exhaustive(engine, texte, 10, allowed)
+        assert_same(engine.top_k(q_ids, q_weights, 10, allowed), ref)
+        norm = engine.scorer.query_norm(q_weights)
+        if norm > 0:
+            assert_same(engine.top_k_selective(q_ids, q_weights / norm, 10, allowed), ref)
+        assert result_ids(engine.search(texte, 10, **filtres)) == [d for d, _ in ref]
+
+
+def test_scorer_is_abstract():
+    # a scorer must define its weights and bounds to be usable
+    class Partial(Scorer):
+        def query_weights(self, engine, q_ids, counts):
+            return counts
+
+    for cls in (Scorer, Partial):
+        with pytest.raises(TypeError):
+            cls()
+    CosineScorer()
+
+
+def test_stats_top_terms(engine, capsys):
+    # stats returns the n most frequent words (ties by word id) and prints nothing
+    corpus = engine.corpus
+    tf, df = corpus.term_frequencies()
+    ref = np.lexsort((np.arange(tf.size), -tf))[:10]
+    top = corpus.stats(10)
+    assert capsys.readouterr().out == ""
+    assert list(top.index) == [corpus.tokens.terms[j] for j in ref]
+    assert top["Document Frequency (DF)"].tolist() == df[ref].tolist()
+    assert corpus.vocab_size() == np.count_nonzero(tf)
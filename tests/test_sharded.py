@@ -0,0 +1,37 @@
+# test_sharded.py
+# ShardedSearch returns the same ranking as one SearchEngine on the whole
+# corpus, wildcard and fuzzy terms included.
+
+import os
+import numpy as np
+import pytest
+from conftest import ROOT
+from Corpus import Corpus
+from SearchEngine import SearchEngine
+from ShardedSearch import ShardedSearch
+import loaders
+
+
+CSV = os.path.join(ROOT, "corpus.csv")
+
+
+@pytest.mark.parametrize("n_shards", [1, 3])
+def test_same_results_as_one_engine(n_shards):
+    Corpus._instance = None
+    corpus = Corpus("sharded")
+    corpus.load(CSV)
+    engine = SearchEngine(corpus)
+    try:
+        with ShardedSearch(n_shards) as shards:
+            for docs in loaders.iter_documents(CSV, 7):
+                shards.add_documents(docs)
+            for texte in ["learning data", "comput*", "*ology", "comptuer~", "learnin~ data",
+                          '"machine learning" comput*', "zzzz* qqqq~"]:
+                a, b = engine.search(texte, 10), shards.search(texte, 10)
+                assert len(a) == len(b), texte
+                if len(a):
+                    assert a["doc_id"].tolist() == b["doc_id"].tolist(), texte
+                    assert np.allclose(a["score"], b["score"]), texte
+            assert len(shards.search("comput*", 10)) > 0
+    finally:
+        Corpus._instance = None